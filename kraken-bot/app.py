@@ -1,68 +1,163 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 from kraken_bot import KrakenBot
-import threading
-import time
-import sass
+from response_cache import ResponseCache
+from metrics import REGISTRY
+from event_stream import EventBroadcaster, BotEventPublisher
+from log_journal import LogJournal
+from portfolio_history import PortfolioHistory
+from state_store import StateStore
+from trade_ledger import TradeLedger
 import os
-from datetime import datetime, timedelta
+import time
+import hashlib
+import threading
+from datetime import datetime
 import logging
-from logging.handlers import RotatingFileHandler
 
 app = Flask(__name__)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
-handler = RotatingFileHandler('kraken_trader.log', maxBytes=10000, backupCount=3)
-logger.addHandler(handler)
+
+# Dashboard clients subscribe to /stream; everything they show is published here once
+broadcaster = EventBroadcaster()
+
+# Numbered log records, kept in memory for /get_logs and written to a rotated JSON-lines file
+log_journal = LogJournal('kraken_trader.jsonl', on_record=lambda entry: broadcaster.publish('log', entry))
+logger.addHandler(log_journal)
 
 # Global variables to store bot state and logs
 bot = None
-bot_thread = None
+bot_events = None  # Publishes the bot's events to the broadcaster
+bot_factory = KrakenBot  # loadtest.py swaps this for a bot wired to the exchange simulator
 bot_running = False
-portfolio_history = []
+portfolio_history = PortfolioHistory('portfolio_history.db')
 bot_start_time = None
 
-def run_bot():
-    global bot_running, portfolio_history
-    while bot_running:
+# Dashboard reads are served from a short-lived cache so polling doesn't turn into exchange load
+response_cache = ResponseCache('dashboard')
+CACHE_TTLS = {
+    'portfolio': 15,
+    'signals': 60,
+}
+PORTFOLIO_SNAPSHOT_INTERVAL = 300  # Seconds between portfolio history points
+HISTORY_HOURS = 24  # Default span of the portfolio chart
+
+# Worker mode: workers.py trades in other processes and this one serves the dashboard from the state store
+WORKER_MODE = os.getenv('KRAKEN_WORKER_MODE', '').lower() in ('1', 'true', 'yes')
+state_store = StateStore(os.getenv('KRAKEN_STATE_DB', 'bot_state.db')) if WORKER_MODE else None
+trade_ledger = TradeLedger('trades.db') if WORKER_MODE else None
+COORDINATOR_TIMEOUT = 30  # Seconds without a status heartbeat before the coordinator counts as offline
+RELAY_INTERVAL = 0.5  # Seconds between checks for new state store events
+relay_thread = None
+relay_lock = threading.Lock()
+
+def invalidate_cache(event, data=None):
+    response_cache.invalidate()
+
+def record_portfolio():
+    portfolio, portfolio_value = bot_events.portfolio()
+    portfolio_history.record(float(portfolio_value))
+    broadcaster.publish('portfolio', portfolio_payload(portfolio, portfolio_value))
+
+def portfolio_payload(portfolio, portfolio_value, hours=HISTORY_HOURS, since=None):
+    return {
+        "portfolio": {k: float(v) for k, v in portfolio.items()},
+        "total_value": float(portfolio_value),
+        "history": portfolio_history.window(hours, since),
+        "start_time": coordinator_status()['start_time'] if state_store else bot_start_time
+    }
+
+def trading_active():
+    """Whether the bot is trading, in this process or, in worker mode, in the coordinator."""
+    if state_store:
+        return coordinator_status()['status'] == 'running'
+    return bot is not None and bot_running
+
+@app.before_request
+def start_relay():
+    global relay_thread
+    if state_store and relay_thread is None:
+        with relay_lock:
+            if relay_thread is None:
+                relay_thread = threading.Thread(target=relay_state, name='state-relay', daemon=True)
+                relay_thread.start()
+
+def relay_state():
+    """Worker mode: push what the coordinator writes to the state store out to dashboard clients."""
+    signals = state_store.get('signals')
+    if signals is not None:
+        broadcaster.publish('signals', signals)
+    broadcaster.publish('trades', {"trades": trade_ledger.recent()})
+    snapshot = state_store.get('portfolio')
+    if snapshot:
+        broadcaster.publish('portfolio', portfolio_payload(snapshot['portfolio'], snapshot['total_value']))
+    after, last_status = state_store.last_seq(), None
+    while True:
         try:
-            bot.rebalance_portfolio()
-            bot.trading_strategy()
-            
-            # Update portfolio history
-            portfolio_value = bot.get_portfolio_value()
-            portfolio_history.append({
-                'timestamp': datetime.now().isoformat(),
-                'value': float(portfolio_value)
-            })
-            
-            # Keep only the last 24 hours of data
-            cutoff_time = datetime.now() - timedelta(hours=24)
-            portfolio_history = [ph for ph in portfolio_history if datetime.fromisoformat(ph['timestamp']) > cutoff_time]
-            
-            time.sleep(bot.check_interval)
+            status_changed = False
+            for seq, event, data in state_store.events(after):
+                after = seq
+                if event == 'log':
+                    # Coordinator log lines join this process's journal, so /get_logs has them too
+                    log_journal.handle(logging.makeLogRecord({
+                        'name': data['logger'], 'levelname': data['level'],
+                        'levelno': logging.getLevelName(data['level']), 'msg': data['message'],
+                        'created': data['time']}))
+                elif event == 'portfolio':
+                    portfolio_history.record(data['total_value'], data['time'])
+                    broadcaster.publish('portfolio', portfolio_payload(data['portfolio'], data['total_value']))
+                elif event in ('signals', 'trades', 'order'):
+                    broadcaster.publish(event, data)
+                elif event == 'status':
+                    status_changed = True
+            status = coordinator_status()
+            if status_changed or status['status'] != last_status:
+                broadcaster.publish('status', status)
+                last_status = status['status']
         except Exception as e:
-            logger.error(f"Error in trading strategy: {str(e)}")
-            time.sleep(60)
+            logger.error(f"Error relaying coordinator state: {str(e)}")
+        time.sleep(RELAY_INTERVAL)
+
+def request_trading(trading):
+    """Worker mode: record whether the dashboard wants the coordinator trading."""
+    state_store.put('control', {'trading': trading}, publish=False)
+    action = 'start' if trading else 'stop'
+    if coordinator_status()['status'] == 'offline':
+        logger.warning(f"Bot {action} requested, but the coordinator is not running")
+        return jsonify({"status": "warning",
+                        "message": f"The coordinator is not running; the bot will {action} once workers.py runs"})
+    logger.info(f"Bot {action} requested")
+    return jsonify({"status": "success", "message": f"Bot {action} requested"})
 
 @app.route('/')
 def index():
-    return render_template('index.html', bot_running=bot_running)
+    return render_template('index.html', bot_running=trading_active())
 
 @app.route('/start_bot', methods=['POST'])
 def start_bot():
-    global bot, bot_thread, bot_running, bot_start_time
+    global bot, bot_events, bot_running, bot_start_time
     logger.debug("Start bot route called")
     try:
+        if state_store:
+            return request_trading(True)
         if not bot_running:
             logger.info("Starting bot")
-            bot = KrakenBot()
+            if bot is None:
+                # The bot is kept across stop/start so its caches, stores and settings stay warm
+                bot = bot_factory()
+                bot_events = BotEventPublisher(bot, broadcaster.publish)
+                bot.add_listener(invalidate_cache)
+                bot.add_listener(bot_events)
+                bot.scheduler.add('portfolio_snapshot', record_portfolio, PORTFOLIO_SNAPSHOT_INTERVAL)
+            response_cache.invalidate()
+            bot_start_time = datetime.now().isoformat()
             bot.start_trading()
             bot_running = True
-            bot_start_time = datetime.now().isoformat()
-            bot_thread = threading.Thread(target=run_bot)
-            bot_thread.start()
+            # 'trades' is otherwise only published when a sync adds fills
+            bot_events.refresh()
+            publish_status()
             logger.info("Bot started successfully")
             return jsonify({"status": "success", "message": "Bot started successfully"})
         else:
@@ -78,10 +173,13 @@ def stop_bot():
     global bot_running, bot_start_time
     logger.debug("Stop bot route called")
     try:
+        if state_store:
+            return request_trading(False)
         if bot_running:
             bot.stop_trading()
             bot_running = False
             bot_start_time = None
+            publish_status()
             logger.info("Bot stopped successfully")
             return jsonify({"status": "success", "message": "Bot stopped successfully"})
         else:
@@ -95,9 +193,10 @@ def stop_bot():
 @app.route('/get_logs')
 def get_logs():
     try:
-        with open('kraken_trader.log', 'r') as log_file:
-            logs = log_file.readlines()[-100:]  # Get last 100 lines
-        return jsonify({"logs": logs})
+        after = request.args.get('after', type=int)
+        limit = request.args.get('limit', 100, type=int)
+        logs = log_journal.since(after, limit)
+        return jsonify({"logs": logs, "last_seq": logs[-1]['seq'] if logs else after})
     except Exception as e:
         error_message = f"Error reading logs: {str(e)}"
         logger.error(error_message)
@@ -107,15 +206,17 @@ def get_logs():
 def get_portfolio():
     logger.debug("Get portfolio route called")
     try:
-        if bot and bot_running:
-            portfolio = bot.get_balance()
-            portfolio_value = bot.get_portfolio_value()
-            return jsonify({
-                "portfolio": {k: float(v) for k, v in portfolio.items()},
-                "total_value": float(portfolio_value),
-                "history": portfolio_history,
-                "start_time": bot_start_time
-            })
+        if trading_active():
+            if state_store:
+                snapshot = state_store.get('portfolio', {"portfolio": {}, "total_value": 0})
+                portfolio, portfolio_value = snapshot['portfolio'], snapshot['total_value']
+            else:
+                with bot.rate_limiter.lane('dashboard'):
+                    portfolio, portfolio_value = response_cache.get('portfolio', CACHE_TTLS['portfolio'],
+                                                                    load_portfolio)
+            hours = request.args.get('hours', HISTORY_HOURS, type=float)
+            since = request.args.get('since', type=float)
+            return jsonify(portfolio_payload(portfolio, portfolio_value, hours, since))
         else:
             logger.info("Bot is not running, cannot retrieve portfolio")
             return jsonify({"error": "Bot is not running"}), 400
@@ -124,11 +225,16 @@ def get_portfolio():
         logger.error(error_message)
         return jsonify({"error": error_message}), 500
 
+def load_portfolio():
+    portfolio = bot.get_balance()
+    return portfolio, bot.get_portfolio_value(balance=portfolio)
+
 @app.route('/get_trades')
 def get_trades():
-    if bot and bot_running:
+    if trading_active():
         try:
-            trades = bot.get_recent_trades()
+            limit = request.args.get('limit', 10, type=int)
+            trades = trade_ledger.recent(limit) if state_store else bot.get_recent_trades(limit)
             return jsonify({"trades": trades})
         except Exception as e:
             error_message = f"Error getting trades: {str(e)}"
@@ -136,17 +242,32 @@ def get_trades():
             return jsonify({"error": error_message}), 500
     return jsonify({"error": "Bot is not running"}), 400
 
+@app.route('/get_pnl')
+def get_pnl():
+    if trading_active():
+        try:
+            since = request.args.get('since', type=float)
+            realized = trade_ledger.realized_pnl(since=since) if state_store else bot.get_realized_pnl(since)
+            pnl = {pair: {key: float(value) for key, value in position.items()}
+                   for pair, position in realized.items()}
+            return jsonify({"pnl": pnl, "total_realized": sum(position['realized'] for position in pnl.values())})
+        except Exception as e:
+            error_message = f"Error getting realised PnL: {str(e)}"
+            logger.error(error_message)
+            return jsonify({"error": error_message}), 500
+    return jsonify({"error": "Bot is not running"}), 400
+
 @app.route('/update_settings', methods=['POST'])
 def update_settings():
-    if bot and bot_running:
+    if trading_active():
         try:
             data = request.json
-            bot.check_interval = int(data['checkInterval'])
-            bot.max_risk_per_trade = float(data['maxRiskPerTrade']) / 100
-            bot.sentiment_threshold = float(data['sentimentThreshold'])
-            bot.rebalance_threshold = float(data['rebalanceThreshold']) / 100
-            bot.volatility_threshold = float(data['volatilityThreshold']) / 100
-            bot.min_trade_size = float(data['minTradeSize'])
+            if state_store:
+                state_store.append('command', {'settings': data})
+                logger.info("Settings sent to the coordinator")
+                return jsonify({"status": "success", "message": "Settings sent to the coordinator"})
+            bot.apply_settings(data)
+            publish_status()
             logger.info("Settings updated successfully")
             return jsonify({"status": "success", "message": "Settings updated successfully"})
         except Exception as e:
@@ -157,22 +278,51 @@ def update_settings():
 
 @app.route('/get_bot_status')
 def get_bot_status():
+    return jsonify(bot_status())
+
+def bot_status():
+    if state_store:
+        return coordinator_status()
     status = "running" if bot_running else "stopped"
     uptime = None
     if bot_running and bot_start_time:
         uptime = (datetime.now() - datetime.fromisoformat(bot_start_time)).total_seconds()
-    return jsonify({
+    return {
         "status": status,
         "start_time": bot_start_time,
         "uptime": uptime,
-        "current_settings": get_current_settings() if bot and bot_running else None
-    })
+        "current_settings": bot.get_settings() if bot and bot_running else None,
+        "jobs": bot.scheduler.status() if bot and bot_running else None
+    }
+
+def coordinator_status():
+    """Worker mode: the coordinator's last published status, or offline once its heartbeat stops."""
+    status, updated = state_store.get('status'), state_store.updated('status')
+    if status is None or time.time() - updated > COORDINATOR_TIMEOUT:
+        return {"status": "offline", "start_time": None, "uptime": None, "current_settings": None, "jobs": None}
+    uptime = None
+    if status['status'] == 'running' and status['start_time']:
+        uptime = (datetime.now() - datetime.fromisoformat(status['start_time'])).total_seconds()
+    return {**status, "uptime": uptime}
+
+def publish_status():
+    broadcaster.publish('status', bot_status())
+
+@app.route('/stream')
+def stream():
+    subscription = broadcaster.subscribe()
+    return Response(broadcaster.stream(subscription), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/get_trading_signals')
 def get_trading_signals():
-    if bot and bot_running:
+    if trading_active():
         try:
-            signals = bot.get_current_signals()
+            if state_store:
+                # The coordinator stores each strategy cycle's signals; nothing is computed here
+                return jsonify(state_store.get('signals', {}))
+            with bot.rate_limiter.lane('dashboard'):
+                signals = response_cache.get('signals', CACHE_TTLS['signals'], bot.get_current_signals)
             return jsonify(signals)
         except Exception as e:
             error_message = f"Error getting trading signals: {str(e)}"
@@ -180,17 +330,25 @@ def get_trading_signals():
             return jsonify({"status": "error", "message": error_message}), 500
     return jsonify({"status": "error", "message": "Bot is not running"}), 400
 
-def get_current_settings():
-    return {
-        "check_interval": bot.check_interval,
-        "max_risk_per_trade": bot.max_risk_per_trade,
-        "sentiment_threshold": bot.sentiment_threshold,
-        "rebalance_threshold": bot.rebalance_threshold,
-        "volatility_threshold": bot.volatility_threshold,
-        "min_trade_size": bot.min_trade_size
-    }
+@app.route('/metrics')
+def metrics():
+    # In worker mode the trading metrics are the coordinator's, as of its last heartbeat
+    text = state_store.get('metrics', '') if state_store else REGISTRY.render()
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
+@app.route('/profile_cycle', methods=['POST'])
+def profile_cycle():
+    if trading_active():
+        if state_store:
+            state_store.append('command', {'profile': True})
+        else:
+            bot.profile_next_cycle = True
+        logger.info("The next strategy cycle will be profiled")
+        return jsonify({"status": "success", "message": "The next strategy cycle will be profiled"})
+    return jsonify({"status": "error", "message": "Bot is not running"}), 400
 
 def compile_scss():
+    """Compile main.scss, unless main.css was already built from the same source."""
     scss_path = os.path.join(app.static_folder, 'scss', 'main.scss')
     css_path = os.path.join(app.static_folder, 'css', 'main.css')
     
@@ -199,12 +357,31 @@ def compile_scss():
     
     with open(scss_path, 'r') as scss_file:
         scss_content = scss_file.read()
-    
+
+    header = f"/* scss-sha256: {hashlib.sha256(scss_content.encode()).hexdigest()} */\n"
+    if os.path.exists(css_path):
+        with open(css_path, 'r') as css_file:
+            if css_file.readline() == header:
+                return
+
+    import sass
     compiled_css = sass.compile(string=scss_content)
     
     with open(css_path, 'w') as css_file:
-        css_file.write(compiled_css)
+        css_file.write(header + compiled_css)
+
+def warm_up():
+    """Load pandas and the sentiment lexicon in the background so the first bot start is quick."""
+    try:
+        import pandas  # noqa: F401
+        from sentiment_analyzer import get_analyzer
+        get_analyzer()
+    except Exception as e:
+        logger.error(f"Error warming up: {str(e)}")
+
+publish_status()
 
 if __name__ == '__main__':
     compile_scss()
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
     app.run(debug=True)
\ No newline at end of file
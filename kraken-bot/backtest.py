@@ -0,0 +1,223 @@
+"""Replay stored OHLC candles through the trading strategy without touching the exchange.
+
+Usage:
+    python backtest.py XXBTZUSD XETHZUSD --interval 1440 --cash 1000
+    python backtest.py XXBTZUSD --cash 1000 --units 0.5
+"""
+import argparse
+import logging
+from decimal import Decimal, ROUND_DOWN
+import numpy as np
+import pandas as pd
+from candle_store import CandleStore
+from indicators import sma, rsi, macd, strategy_signals
+from pair_index import PairIndex
+
+logger = logging.getLogger(__name__)
+
+# Mirrors the defaults on KrakenBot so a backtest with no overrides replays the live strategy.
+DEFAULT_PARAMS = {
+    'moving_average_periods': (20, 50),
+    'rsi_period': 14,
+    'macd_periods': (12, 26, 9),
+    'sentiment_threshold': 0.2,
+    'max_risk_per_trade': 0.02,
+    'min_trade_size': 5.0,
+    'fee': 0.0026,  # Kraken taker fee for market orders at the lowest volume tier
+}
+
+
+def compute_signals(close, params, sentiment=0.0, cache=None):
+    """Return buy/sell flags for every bar using the live strategy's indicator rules.
+
+    Pass the same `cache` dict for repeated calls on one series to reuse indicator arrays
+    between parameter sets that share periods.
+    """
+    cache = {} if cache is None else cache
+
+    def cached(key, compute):
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    short_period, long_period = params['moving_average_periods'][:2]
+    macd_periods = tuple(params['macd_periods'])
+    sma_signal = cached(('sma', short_period, long_period),
+                        lambda: (sma(close, short_period) > sma(close, long_period)).to_numpy())
+    macd_signal = cached(('macd',) + macd_periods,
+                         lambda: np.greater(*macd(close, *macd_periods)[:2]).to_numpy())
+    rsi_value = cached(('rsi', params['rsi_period']), lambda: rsi(close, params['rsi_period']).to_numpy())
+    if isinstance(sentiment, pd.Series):
+        sentiment = sentiment.reindex(close.index, method='ffill').fillna(0).to_numpy()
+    return strategy_signals(sma_signal, macd_signal, rsi_value, sentiment, params['sentiment_threshold'])
+
+
+def starting_position(close, cash, units=None):
+    """Return the (cash, units) a backtest starts with.
+
+    The strategy sizes every order from the current holding, so it never trades from an
+    empty one. Without `units`, half of `cash` is put into the asset at the first close.
+    """
+    if units is None:
+        half = cash / 2
+        return half, half / float(close.iloc[0])
+    if units <= 0:
+        raise ValueError("The starting holding must be positive: the strategy sizes every order from it")
+    return cash, units
+
+
+def round_down(value, decimals):
+    """Round a volume down to `decimals` places, as OrderPlan does with a pair's lot decimals."""
+    return float(Decimal(str(float(value))).quantize(Decimal(1).scaleb(-int(decimals)), rounding=ROUND_DOWN))
+
+
+def simulate(close, buy, sell, params, cash, units, min_order=0.0, lot_decimals=8):
+    """Simulate market fills for precomputed signals and return (equity, trades).
+
+    Each signal trades `max_risk_per_trade` of the current holding, rounded down to the
+    pair's lot decimals, and the same volume moves both cash and holding. Like the live bot,
+    orders below `min_trade_size` or `ordermin`, and buys without enough cash, are skipped.
+    Only the signal bars are visited; the cash and holding between fills are filled in
+    with array operations.
+    """
+    price = close.to_numpy(dtype=np.float64)
+    side = np.where(buy, 1, np.where(sell, -1, 0))
+    risk = float(params['max_risk_per_trade'])
+    fee = float(params['fee'])
+    min_trade_size = float(params['min_trade_size'])
+
+    filled, volumes, notionals, fees, cash_path, units_path = [], [], [], [], [cash], [units]
+    for bar in np.flatnonzero(side):
+        volume = round_down(units * risk, lot_decimals)
+        notional = volume * price[bar]
+        if volume <= 0 or volume < min_order or notional < min_trade_size or (side[bar] > 0 and cash < notional):
+            continue
+        fee_paid = notional * fee
+        units += side[bar] * volume
+        cash -= side[bar] * notional + fee_paid
+        filled.append(bar)
+        volumes.append(volume)
+        notionals.append(notional)
+        fees.append(fee_paid)
+        cash_path.append(cash)
+        units_path.append(units)
+
+    # Position after each bar: the state after the last fill at or before it.
+    state = np.searchsorted(np.array(filled, dtype=np.int64), np.arange(len(price)), side='right')
+    equity = pd.Series(np.array(cash_path)[state] + np.array(units_path)[state] * price, index=close.index,
+                       name='equity')
+    filled = np.array(filled, dtype=np.int64)
+    trades = pd.DataFrame({
+        'time': close.index[filled],
+        'type': np.where(side[filled] > 0, 'buy', 'sell'),
+        'price': price[filled],
+        'volume': np.array(volumes, dtype=np.float64),
+        'cost': np.array(notionals, dtype=np.float64),
+        'fee': np.array(fees, dtype=np.float64),
+    })
+    return equity, trades
+
+
+def run_backtest(df, params=None, cash=1000.0, units=None, sentiment=0.0, min_order=0.0, lot_decimals=8):
+    """Backtest one pair's candle frame and return its equity curve, trade list and summary stats."""
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    cash, units = starting_position(df['close'], cash, units)
+    buy, sell = compute_signals(df['close'], params, sentiment)
+    equity, trades = simulate(df['close'], buy, sell, params, cash, units, min_order, lot_decimals)
+    return {'equity': equity, 'trades': trades, 'stats': summarize(equity, trades)}
+
+
+def summarize(equity, trades):
+    """Summarise an equity curve and its trades."""
+    if equity.empty:
+        return {'start_value': 0.0, 'end_value': 0.0, 'return': 0.0, 'max_drawdown': 0.0, 'trades': 0, 'fees': 0.0}
+    drawdown = equity / equity.cummax() - 1
+    return {
+        'start_value': float(equity.iloc[0]),
+        'end_value': float(equity.iloc[-1]),
+        'return': float(equity.iloc[-1] / equity.iloc[0] - 1) if equity.iloc[0] else 0.0,
+        'max_drawdown': float(drawdown.min()),
+        'trades': len(trades),
+        'fees': float(trades['fee'].sum()) if len(trades) else 0.0,
+    }
+
+
+def load_pair_rules(pairs, path='asset_pairs.json', offline=False):
+    """Return ordermin and lot decimals per pair from the bot's pair cache, fetching it if missing."""
+    index = PairIndex(path)
+    if not index.load() and not offline:
+        import krakenex
+        try:
+            index.refresh(krakenex.API().query_public('AssetPairs')['result'])
+        except Exception as e:
+            logger.warning(f"Could not fetch pair rules, assuming no minimum order: {str(e)}")
+    rules = {}
+    for name in pairs:
+        pair = index.resolve(name)
+        if pair:
+            rules[name] = (float(index.pairs[pair]['min_order']), index.pairs[pair]['lot_decimals'])
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the trading strategy over candles stored in the candle cache.")
+    parser.add_argument('pairs', nargs='+', help="Kraken pair names, e.g. XXBTZUSD")
+    parser.add_argument('--db', default='candles.db', help="Candle cache written by the bot")
+    parser.add_argument('--interval', type=int, default=1440, help="Candle interval in minutes")
+    parser.add_argument('--cash', type=float, default=1000.0,
+                        help="Starting base currency per pair; half goes into the asset unless --units is given")
+    parser.add_argument('--units', type=float, help="Starting asset holding per pair (must be positive)")
+    parser.add_argument('--sentiment', type=float, default=0.0, help="Constant news sentiment to assume")
+    parser.add_argument('--fee', type=float, default=DEFAULT_PARAMS['fee'])
+    parser.add_argument('--max-risk-per-trade', type=float, default=DEFAULT_PARAMS['max_risk_per_trade'])
+    parser.add_argument('--sentiment-threshold', type=float, default=DEFAULT_PARAMS['sentiment_threshold'])
+    parser.add_argument('--min-trade-size', type=float, default=DEFAULT_PARAMS['min_trade_size'])
+    parser.add_argument('--offline', action='store_true', help="Only use cached ordermin rules from asset_pairs.json")
+    parser.add_argument('--equity-csv', help="Write the combined equity curve to this file")
+    parser.add_argument('--trades-csv', help="Write the trade list to this file")
+    args = parser.parse_args()
+
+    if args.units is not None and args.units <= 0:
+        parser.error("--units must be positive: the strategy sizes every order from the current holding")
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    params = {
+        'fee': args.fee,
+        'max_risk_per_trade': args.max_risk_per_trade,
+        'sentiment_threshold': args.sentiment_threshold,
+        'min_trade_size': args.min_trade_size,
+    }
+    rules = load_pair_rules(args.pairs, offline=args.offline)
+    store = CandleStore(args.db)
+
+    equity_curves, trade_lists = [], []
+    for pair in args.pairs:
+        df = store.history(pair, args.interval)
+        if df.empty:
+            logger.warning(f"No stored candles for {pair} at interval {args.interval}")
+            continue
+        min_order, lot_decimals = rules.get(pair, (0.0, 8))
+        result = run_backtest(df, params, args.cash, args.units, args.sentiment, min_order, lot_decimals)
+        stats = result['stats']
+        logger.info(f"{pair}: {len(df)} candles, {stats['trades']} trades, return {stats['return']:.2%}, "
+                    f"max drawdown {stats['max_drawdown']:.2%}, fees {stats['fees']:.2f}")
+        if not stats['trades']:
+            logger.warning(f"{pair}: no trade was placed; either there were no signals or every order was "
+                           f"below --min-trade-size or the pair's ordermin, or beyond the available cash")
+        equity_curves.append(result['equity'].rename(pair))
+        trade_lists.append(result['trades'].assign(pair=pair))
+
+    if not equity_curves:
+        return
+    equity = pd.concat(equity_curves, axis=1).ffill().bfill().sum(axis=1).rename('equity')
+    trades = pd.concat(trade_lists, ignore_index=True).sort_values('time')
+    stats = summarize(equity, trades)
+    logger.info(f"Portfolio: {stats['trades']} trades, return {stats['return']:.2%}, "
+                f"max drawdown {stats['max_drawdown']:.2%}, fees {stats['fees']:.2f}")
+    if args.equity_csv:
+        equity.to_csv(args.equity_csv)
+    if args.trades_csv:
+        trades.to_csv(args.trades_csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
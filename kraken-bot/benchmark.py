@@ -0,0 +1,225 @@
+"""Benchmark the bot's hot paths against recorded or synthetic exchange data, with no network.
+
+Usage:
+    python benchmark.py --pairs 1 10 100 500 --repeat 3 --output benchmark_results.json
+    python benchmark.py --record fixtures.json          # capture read-only responses from Kraken and GNews
+    python benchmark.py --fixtures fixtures.json --compare benchmark_results.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import replay
+
+logger = logging.getLogger(__name__)
+
+ENDPOINTS = ['/get_portfolio', '/get_trades', '/get_pnl', '/get_trading_signals', '/metrics']
+
+
+def make_bot(workdir, rate_limits=False):
+    """Build a KrakenBot whose caches live in a fresh directory; call inside `replay.replaying`."""
+    from kraken_bot import KrakenBot
+    from rate_limiter import KrakenRateLimiter, TokenBucket
+    os.makedirs(workdir)
+    os.chdir(workdir)
+    bot = KrakenBot()
+    if not rate_limits:
+        # Replayed calls are free, so the limiter would only measure its own sleeps.
+        unlimited = float('inf')
+        bot.rate_limiter = KrakenRateLimiter(counter_max=unlimited, public_max=unlimited, order_max=unlimited)
+        bot.news_rate_limiter = TokenBucket(capacity=unlimited, refill_rate=1)
+    return bot
+
+
+def base_assets(bot):
+    return [info['base'] for info in bot.asset_pairs.values()]
+
+
+def cases(rate_limits):
+    """Yield (name, setup, run); setup(workdir) returns the state that run(state) measures."""
+
+    def fresh(workdir):
+        bot = make_bot(workdir, rate_limits)
+        bot.get_asset_pairs()
+        return bot
+
+    def warm(workdir):
+        bot = fresh(workdir)
+        bot.run_cycle()
+        return bot
+
+    def trading(workdir):
+        # The scheduler's usual run: the setup run rebalanced, so the timed one is strategy only
+        bot = fresh(workdir)
+        bot.is_trading = True
+        bot.run_scheduled_cycle()
+        return bot
+
+    def with_frames(workdir):
+        bot = fresh(workdir)
+        return bot, [bot.get_historical_data(pair) for pair in bot.asset_pairs]
+
+    yield 'cycle_cold', fresh, lambda bot: bot.run_cycle()
+    yield 'cycle_warm', warm, lambda bot: bot.run_cycle()
+    yield 'cycle_scheduled', trading, lambda bot: bot.run_scheduled_cycle()
+    yield 'rebalance', warm, lambda bot: bot.rebalance_portfolio()
+    yield 'trading_strategy', warm, lambda bot: bot.trading_strategy()
+    yield 'historical_data', fresh, lambda bot: [bot.get_historical_data(pair) for pair in bot.asset_pairs]
+    yield 'indicators', with_frames, lambda state: [state[0].calculate_indicators(df.copy())
+                                                    for df in state[1] if df is not None]
+    yield 'news_sentiment', fresh, lambda bot: [bot.get_news_sentiment(asset) for asset in base_assets(bot)]
+    yield 'trade_sync', fresh, lambda bot: bot.sync_trades()
+
+    def dashboard(workdir):
+        bot = warm(workdir)
+        bot.sync_trades()
+        import app
+        app.bot, app.bot_running = bot, True
+        app.response_cache.invalidate()
+        return app.app.test_client()
+
+    for path in ENDPOINTS:
+        yield f"endpoint:{path}", dashboard, lambda client, path=path: client.get(path).status_code
+
+
+def measure(fixtures, name, setup, run, repeat, workroot, latency, news_latency):
+    """Time `repeat` runs, then repeat once under tracemalloc for the peak allocation."""
+    times, calls = [], {}
+    for attempt in range(repeat + 1):
+        with replay.replaying(fixtures, latency, news_latency) as counter:
+            state = setup(os.path.join(workroot, f"{name.replace('/', '_').replace(':', '_')}-{attempt}"))
+            counter.clear()
+            gc.collect()
+            if attempt < repeat:
+                started = time.perf_counter()
+                run(state)
+                times.append(time.perf_counter() - started)
+                calls = dict(counter)
+            else:
+                tracemalloc.start()
+                run(state)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        os.chdir(workroot)
+    return {
+        'benchmark': name,
+        'wall_seconds': statistics.median(times),
+        'wall_seconds_min': min(times),
+        'repeat': repeat,
+        'calls': calls,
+        'calls_total': sum(calls.values()),
+        'peak_memory_bytes': peak,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    """Log each benchmark's median wall time against a previous results file."""
+    with open(baseline_path) as f:
+        baseline = {(row['benchmark'], row['pairs']): row for row in json.load(f)['results']}
+    for row in results:
+        before = baseline.get((row['benchmark'], row['pairs']))
+        if before and before['wall_seconds']:
+            ratio = row['wall_seconds'] / before['wall_seconds']
+            logger.info(f"{row['benchmark']:<32} {row['pairs']:>4} pairs: {before['wall_seconds'] * 1000:9.2f}ms -> "
+                        f"{row['wall_seconds'] * 1000:9.2f}ms ({ratio:.2f}x)")
+
+
+def record(path):
+    """Capture read-only responses for the configured account by evaluating signals without trading."""
+    fixtures = replay.empty_fixtures()
+    with replay.recording(fixtures):
+        from kraken_bot import KrakenBot
+        bot = KrakenBot()
+        bot.get_asset_pairs(force=True)
+        bot.get_ticker_snapshot()
+        bot.get_recent_trades()
+        bot.evaluate_assets(bot.get_balance())
+    replay.save_fixtures(fixtures, path)
+    logger.info(f"Recorded {len(fixtures['kraken']['OHLC'])} pairs and {len(fixtures['news'])} news searches to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark trading cycles, parsing, indicators, news scoring "
+                                                 "and dashboard endpoints against replayed data.")
+    parser.add_argument('--pairs', type=int, nargs='+', default=[1, 10, 100, 500], help="Pair counts to benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per benchmark; the median is reported")
+    parser.add_argument('--fixtures', help="Recorded fixtures to replay instead of synthetic data")
+    parser.add_argument('--record', metavar='PATH', help="Record fixtures from the live APIs to PATH and exit")
+    parser.add_argument('--latency', type=float, default=0.0, help="Synthetic seconds added to each Kraken call")
+    parser.add_argument('--news-latency', type=float, default=0.0, help="Synthetic seconds added to each news call")
+    parser.add_argument('--rate-limits', action='store_true', help="Keep the bot's real rate limiters")
+    parser.add_argument('--only', nargs='+', help="Only run benchmarks whose name starts with one of these")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the results")
+    parser.add_argument('--compare', metavar='PATH', help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.record:
+        record(args.record)
+        return
+
+    output = os.path.abspath(args.output)
+    recorded = replay.load_fixtures(args.fixtures) if args.fixtures else None
+    results = []
+    with tempfile.TemporaryDirectory() as workroot:
+        cwd = os.getcwd()
+        os.chdir(workroot)
+        try:
+            for count in args.pairs:
+                fixtures = replay.limit_pairs(recorded, count) if recorded else replay.synthetic_fixtures(count)
+                pair_root = os.path.join(workroot, str(count))
+                os.makedirs(pair_root)
+                for name, setup, run in cases(args.rate_limits):
+                    if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                        continue
+                    # The bot logs every asset it touches; keep that out of the timings.
+                    logging.getLogger().setLevel(logging.WARNING)
+                    row = measure(fixtures, name, setup, run, args.repeat, pair_root, args.latency, args.news_latency)
+                    logging.getLogger().setLevel(logging.INFO)
+                    row['pairs'] = count
+                    results.append(row)
+                    logger.info(f"{name:<32} {count:>4} pairs: {row['wall_seconds'] * 1000:9.2f}ms, "
+                                f"{row['calls_total']:>5} calls, peak {row['peak_memory_bytes'] / 2 ** 20:7.2f} MiB")
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'fixtures': args.fixtures or 'synthetic',
+            'latency': args.latency,
+            'news_latency': args.news_latency,
+            'rate_limits': args.rate_limits,
+        },
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
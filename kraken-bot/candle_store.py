@@ -0,0 +1,94 @@
+import sqlite3
+import threading
+import logging
+from itertools import repeat
+from ohlc import CandleBuffer, parse_ohlc, ohlc_frame
+
+logger = logging.getLogger(__name__)
+
+
+class CandleStore:
+    """Persist OHLC candles per pair and interval so history is only downloaded once."""
+
+    def __init__(self, path='candles.db', max_rows=720):
+        """Open (or create) the SQLite candle database at the given path."""
+        self.path = path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._series = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Shard workers share the database
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS candles ("
+                "pair TEXT, interval INTEGER, time INTEGER, "
+                "open REAL, high REAL, low REAL, close REAL, vwap REAL, volume REAL, count REAL, "
+                "PRIMARY KEY (pair, interval, time)) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cursors ("
+                "pair TEXT, interval INTEGER, last INTEGER, "
+                "PRIMARY KEY (pair, interval))"
+            )
+
+    def cursor(self, pair, interval):
+        """Return the `since` cursor Kraken last handed back for this series, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last FROM cursors WHERE pair = ? AND interval = ?", (pair, interval)
+            ).fetchone()
+        return row[0] if row else None
+
+    def merge(self, pair, interval, rows, last=None):
+        """Merge raw Kraken OHLC rows into the stored series and remember the new cursor."""
+        if not rows:
+            return
+        times, values = parse_ohlc(rows)
+        with self._lock:
+            buffer = self._load(pair, interval)
+            if len(buffer) and times[0] > buffer.times[-1] + interval * 60:
+                # The cursor fell too far behind for Kraken to fill the gap; start over.
+                logger.warning(f"Gap in stored candles for {pair}, discarding {len(buffer)} cached rows")
+                buffer.clear()
+            buffer.merge(times, values)
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    zip(repeat(pair), repeat(interval), times.tolist(), *values.tolist()),
+                )
+                if last is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO cursors VALUES (?, ?, ?)", (pair, interval, int(last))
+                    )
+
+    def frame(self, pair, interval):
+        """Return the cached series as a DataFrame over the buffer's arrays, without copying.
+
+        Rows already in the frame stay valid after later merges, except ones a merge
+        rewrites in place, which is normally just the newest, still-forming candle.
+        """
+        with self._lock:
+            return self._load(pair, interval).frame()
+
+    def history(self, pair, interval):
+        """Load the full stored history for a series, beyond the in-memory window."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT time, open, high, low, close, vwap, volume, count FROM candles "
+                "WHERE pair = ? AND interval = ? ORDER BY time", (pair, interval)
+            ).fetchall()
+        return ohlc_frame(*parse_ohlc(rows))
+
+    def _load(self, pair, interval):
+        """Return the in-memory buffer for a series, warm-starting it from SQLite."""
+        key = (pair, interval)
+        if key not in self._series:
+            rows = self._conn.execute(
+                "SELECT time, open, high, low, close, vwap, volume, count FROM candles "
+                "WHERE pair = ? AND interval = ? ORDER BY time DESC LIMIT ?", (pair, interval, self.max_rows)
+            ).fetchall()
+            buffer = CandleBuffer(self.max_rows)
+            if rows:
+                buffer.merge(*parse_ohlc(rows[::-1]))
+            self._series[key] = buffer
+        return self._series[key]
@@ -0,0 +1,130 @@
+import json
+import queue
+import threading
+import logging
+from collections import deque
+from datetime import datetime
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class Subscription:
+    """One connected client's queue of encoded Server-Sent Event frames."""
+
+    def __init__(self, max_pending):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.closed = False
+
+    def put(self, frame):
+        """Queue a frame; a client that falls this far behind is dropped and will reconnect."""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            self.closed = True
+            return False
+
+
+class EventBroadcaster:
+    """Fan bot events out to every dashboard client as Server-Sent Events.
+
+    Each event is encoded once and shared by all clients. The latest event of each
+    state type (portfolio, signals, ...) and a short backlog of log lines are kept,
+    so a client that connects or reconnects is brought up to date immediately.
+    """
+
+    def __init__(self, state_events=('status', 'portfolio', 'trades', 'signals'), backlog=100, max_pending=256):
+        self.state_events = set(state_events)
+        self.max_pending = max_pending
+        self._state = {}
+        self._backlog = deque(maxlen=backlog)
+        self._subscribers = set()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def publish(self, event, data):
+        """Send an event to every connected client."""
+        with self._lock:
+            frame = f"id: {self._next_id}\nevent: {event}\ndata: {json.dumps(data, default=_json_default)}\n\n"
+            self._next_id += 1
+            if event in self.state_events:
+                self._state[event] = frame
+            else:
+                self._backlog.append(frame)
+            dropped = {subscription for subscription in self._subscribers if not subscription.put(frame)}
+            self._subscribers -= dropped
+        for _ in dropped:
+            logger.debug("Dropped a dashboard stream client that stopped reading")
+
+    def subscribe(self):
+        """Register a client, pre-loaded with the current state and recent backlog."""
+        subscription = Subscription(self.max_pending + len(self.state_events) + self._backlog.maxlen)
+        with self._lock:
+            for frame in list(self._state.values()) + list(self._backlog):
+                subscription.put(frame)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def clients(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def stream(self, subscription, heartbeat=15):
+        """Yield a client's frames, with comment heartbeats so idle connections stay open."""
+        try:
+            yield "retry: 3000\n\n"
+            while not subscription.closed:
+                try:
+                    yield subscription.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+
+
+class BotEventPublisher:
+    """Bot listener that turns the bot's events into dashboard updates.
+
+    `publish(event, data)` delivers each update: app.py passes its EventBroadcaster, and the
+    worker-mode coordinator writes to the StateStore for app.py to relay. Fills republish
+    the trade list and take a portfolio snapshot straight away, as they change the balance.
+    """
+
+    def __init__(self, bot, publish, snapshot_job='portfolio_snapshot'):
+        self.bot = bot
+        self.publish = publish
+        self.snapshot_job = snapshot_job  # Scheduler job that records and publishes the portfolio
+
+    def __call__(self, event, data=None):
+        if event in ('signals', 'order'):
+            self.publish(event, data)
+        elif event == 'trades':
+            self.publish_trades()
+            self.bot.scheduler.run_now(self.snapshot_job)
+
+    def publish_trades(self):
+        self.publish('trades', {"trades": self.bot.get_recent_trades()})
+
+    def refresh(self):
+        """Publish the trades and a portfolio snapshot now, e.g. when the bot starts."""
+        self.bot.scheduler.run_now(self.snapshot_job)
+        self.publish_trades()
+
+    def portfolio(self):
+        """Return the current balance and its total value."""
+        portfolio = self.bot.get_balance()
+        return portfolio, self.bot.get_portfolio_value(balance=portfolio)
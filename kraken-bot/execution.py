@@ -0,0 +1,172 @@
+import logging
+import contextvars
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_DOWN
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_ORDERS = 15  # Kraken's AddOrderBatch limit; every order in a batch must be on the same pair
+
+
+def _quantum(decimals):
+    return Decimal(1).scaleb(-int(decimals))
+
+
+class OrderPlan:
+    """The orders one cycle intends to place, netted and validated before anything is sent.
+
+    Callers add orders with the price they were sized at. `finalize` nets opposing orders
+    on each pair, rounds volumes down to the pair's lot precision, and drops orders Kraken
+    would reject (below `ordermin`/`costmin`), capping them to the balance first. Buys are
+    capped at what they cost filled at the ask plus the pair's taker fee. With
+    `limit_orders`, orders become marketable limits at the quoted ask (buys) or bid
+    (sells): they fill straight away like market orders, but never at a worse price.
+    """
+
+    def __init__(self, pair_index, prices=None, limit_orders=False):
+        self.pair_index = pair_index
+        self.prices = prices or {}
+        self.limit_orders = limit_orders
+        self.orders = []
+        self.rejected = []
+
+    def __len__(self):
+        return len(self.orders)
+
+    def add(self, pair, type, volume, price=None, reason=None):
+        """Queue a buy or sell of `volume` base units, sized at `price` (used for the cost checks)."""
+        if type not in ('buy', 'sell'):
+            raise ValueError(f"Invalid order type {type!r}. Use 'buy' or 'sell'.")
+        self.orders.append({'pair': pair, 'type': type, 'volume': Decimal(volume),
+                            'price': Decimal(price) if price is not None else None, 'reason': reason})
+
+    def net(self):
+        """Offset buys against sells on the same pair, keeping whatever is left of the larger side."""
+        volumes = defaultdict(lambda: {'buy': Decimal('0'), 'sell': Decimal('0')})
+        for order in self.orders:
+            volumes[order['pair']][order['type']] += order['volume']
+        offsets = {(pair, side): min(sides['buy'], sides['sell'])
+                   for pair, sides in volumes.items() for side in ('buy', 'sell')}
+
+        netted = []
+        for order in self.orders:
+            key = (order['pair'], order['type'])
+            taken = min(offsets[key], order['volume'])
+            offsets[key] -= taken
+            if order['volume'] > taken:
+                netted.append({**order, 'volume': order['volume'] - taken})
+        return netted
+
+    def finalize(self, holdings=None, quote_balance=None):
+        """Net, round and validate the plan in place, and return the orders left to send.
+
+        `holdings` maps pair -> base volume held and caps sells; `quote_balance` caps the
+        total cost of buys, shrinking whichever buy no longer fits. Rejected orders are
+        kept in `rejected` with a reason.
+        """
+        holdings = dict(holdings) if holdings is not None else None
+        orders, self.rejected = [], []
+        for order in self.net():
+            pair, side = order['pair'], order['type']
+            info = self.pair_index.pairs.get(pair)
+            if info is None:
+                self._reject(order, f"unknown pair {pair}")
+                continue
+
+            ordertype, price = 'market', order['price']
+            ticker = self.prices.get(pair)
+            if self.limit_orders and ticker:
+                ordertype = 'limit'
+                price = ticker['ask' if side == 'buy' else 'bid'].quantize(_quantum(info['decimal_places']))
+
+            volume, capped = order['volume'], False
+            if side == 'sell' and holdings is not None:
+                capped = volume > holdings.get(pair, Decimal('0'))
+                volume = min(volume, holdings.get(pair, Decimal('0')))
+            # A buy fills at the ask (or its limit) and pays the taker fee on top
+            fill_price = ticker['ask'] if side == 'buy' and ticker and ordertype == 'market' else price
+            if side == 'buy' and fill_price and quote_balance is not None:
+                affordable = max(quote_balance, Decimal('0')) / (fill_price * (1 + info['taker_fee']))
+                capped = volume > affordable
+                volume = min(volume, affordable)
+            volume = volume.quantize(_quantum(info['lot_decimals']), rounding=ROUND_DOWN)
+            cost = volume * price if price is not None else None
+
+            if volume < info['min_order'] and capped:
+                held = 'balance' if side == 'buy' else f"{pair} holdings"
+                self._reject(order, f"insufficient {held}: only {volume} fits, below the minimum {info['min_order']}")
+            elif volume < info['min_order']:
+                self._reject(order, f"volume {volume} is below the minimum {info['min_order']}")
+            elif cost is not None and info['min_cost'] and cost < info['min_cost']:
+                self._reject(order, f"cost {cost:.4f} is below the minimum {info['min_cost']}")
+            else:
+                if side == 'buy' and fill_price and quote_balance is not None:
+                    quote_balance -= volume * fill_price * (1 + info['taker_fee'])
+                if side == 'sell' and holdings is not None:
+                    holdings[pair] -= volume
+                orders.append({**order, 'volume': volume, 'ordertype': ordertype,
+                               'price': price if ordertype == 'limit' else None})
+        self.orders = orders
+        return orders
+
+    def _reject(self, order, reason):
+        logger.warning(f"Dropping {order['type']} of {order['volume']:.8f} {order['pair']}: {reason}")
+        self.rejected.append({**order, 'error': reason})
+
+
+class OrderExecutor:
+    """Send finalized orders with one request per pair, and all pairs in flight at once.
+
+    A pair with a single order uses AddOrder. Several orders on one pair go out in
+    AddOrderBatch requests of up to 15 orders each.
+    """
+
+    def __init__(self, api_call, max_workers=8):
+        self.api_call = api_call  # KrakenBot._make_kraken_api_call, so every request is rate limited
+        self.max_workers = max_workers
+
+    def execute(self, orders):
+        """Submit the orders and return one result per order, with `txid` or `error` set."""
+        by_pair = defaultdict(list)
+        for order in orders:
+            by_pair[order['pair']].append(order)
+        batches = [(pair, pair_orders[i:i + MAX_BATCH_ORDERS])
+                   for pair, pair_orders in by_pair.items()
+                   for i in range(0, len(pair_orders), MAX_BATCH_ORDERS)]
+        if not batches:
+            return []
+        # Each request runs in a copy of the caller's context so it keeps the caller's rate limit lane.
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, self._send, pair, chunk)
+                       for pair, chunk in batches]
+        return [result for future in futures for result in future.result()]
+
+    def _send(self, pair, orders):
+        try:
+            if len(orders) == 1:
+                response = self.api_call('private', 'AddOrder', {'pair': pair, **self._params(orders[0])})
+                outcomes = [response.get('result', {})]
+            else:
+                # Sent as a JSON body (see kraken_api.KrakenAPI), as Kraken documents it
+                payload = {'pair': pair, 'orders': [self._params(order) for order in orders]}
+                response = self.api_call('private', 'AddOrderBatch', payload)
+                outcomes = response.get('result', {}).get('orders', [])
+            if response.get('error'):
+                return [{**order, 'txid': None, 'error': ', '.join(response['error'])} for order in orders]
+        except Exception as e:
+            return [{**order, 'txid': None, 'error': str(e)} for order in orders]
+
+        results = []
+        for i, order in enumerate(orders):
+            outcome = outcomes[i] if i < len(outcomes) else {'error': 'missing from response'}
+            txid = outcome.get('txid')
+            results.append({**order, 'txid': [txid] if isinstance(txid, str) else txid,
+                            'error': None if txid else outcome.get('error', 'no txid in response')})
+        return results
+
+    def _params(self, order):
+        params = {'type': order['type'], 'ordertype': order['ordertype'], 'volume': str(order['volume'])}
+        if order['ordertype'] == 'limit':
+            params['price'] = str(order['price'])
+        return params
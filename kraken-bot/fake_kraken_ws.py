@@ -0,0 +1,106 @@
+import asyncio
+import json
+import threading
+
+import websockets
+
+
+class FakeKrakenWebSocketServer:
+    """Local stand-in for Kraken's public websocket so the market data feed can run offline."""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.subscriptions = []
+        self._clients = set()
+        self._channels = {}
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self):
+        """Start serving on a background event loop and wait until the port is bound."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._serve(), self._loop).result()
+        return self
+
+    def stop(self):
+        """Close every client connection and shut the server down."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def send_ticker(self, wsname, last, bid=None, ask=None):
+        """Push a ticker update for a websocket pair name to every subscribed client."""
+        data = {'c': [str(last), '1'], 'b': [str(bid or last), '1', '1'], 'a': [str(ask or last), '1', '1']}
+        self._broadcast('ticker', wsname, data)
+
+    def send_candle(self, wsname, start, open_, high, low, close, interval=1440, volume=1, count=1):
+        """Push an OHLC update for the candle that begins at `start` (unix seconds)."""
+        etime = start + interval * 60
+        data = [f"{start:.6f}", f"{etime:.6f}", str(open_), str(high), str(low), str(close), str(close),
+                str(volume), count]
+        self._broadcast(f'ohlc-{interval}', wsname, data)
+
+    def drop_connections(self):
+        """Abruptly close all client sockets to exercise reconnect handling."""
+        asyncio.run_coroutine_threadsafe(self._close_clients(), self._loop).result()
+
+    def _broadcast(self, channel, wsname, data):
+        async def send():
+            channel_id = self._channels.setdefault((channel, wsname), len(self._channels) + 1)
+            message = json.dumps([channel_id, data, channel, wsname])
+            for client in list(self._clients):
+                try:
+                    await client.send(message)
+                except websockets.ConnectionClosed:
+                    self._clients.discard(client)
+        asyncio.run_coroutine_threadsafe(send(), self._loop).result()
+
+    async def _serve(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _handler(self, connection):
+        await connection.send(json.dumps({'event': 'systemStatus', 'status': 'online'}))
+        try:
+            async for raw in connection:
+                request = json.loads(raw)
+                if request.get('event') != 'subscribe':
+                    continue
+                self.subscriptions.append(request)
+                for wsname in request.get('pair', []):
+                    await connection.send(json.dumps({
+                        'event': 'subscriptionStatus', 'status': 'subscribed', 'pair': wsname,
+                        'subscription': request.get('subscription', {}),
+                    }))
+                self._clients.add(connection)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._clients.discard(connection)
+
+    async def _close_clients(self):
+        for client in list(self._clients):
+            await client.close()
+        self._clients.clear()
+
+    async def _close(self):
+        await self._close_clients()
+        self._server.close()
+        await self._server.wait_closed()
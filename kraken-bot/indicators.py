@@ -0,0 +1,210 @@
+import math
+import threading
+from collections import deque
+import numpy as np
+
+
+def sma(prices, period):
+    """Calculate a simple moving average over a price series."""
+    return prices.rolling(window=period).mean()
+
+
+def rsi(prices, period=14):
+    """Calculate the Relative Strength Index."""
+    delta = prices.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def macd(prices, fast=12, slow=26, signal=9):
+    """Calculate the Moving Average Convergence Divergence."""
+    exp1 = prices.ewm(span=fast, adjust=False).mean()
+    exp2 = prices.ewm(span=slow, adjust=False).mean()
+    macd_line = exp1 - exp2
+    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
+    histogram = macd_line - signal_line
+    return macd_line, signal_line, histogram
+
+
+class RollingMean:
+    """Simple moving average kept as a running sum over a fixed window."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+
+    def push(self, value):
+        """Add a new value, dropping the oldest once the window is full."""
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+
+    def replace_last(self, value):
+        """Revise the most recent value in place."""
+        self.total += value - self.values[-1]
+        self.values[-1] = value
+
+    def seed(self, values):
+        """Reset the window from the tail of a bulk-computed series."""
+        self.values = deque(float(v) for v in values[-self.window:])
+        self.total = math.fsum(self.values)
+
+    @property
+    def value(self):
+        return self.total / self.window if len(self.values) == self.window else math.nan
+
+
+class EMA:
+    """Exponential moving average matching pandas' `ewm(span=..., adjust=False)`."""
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2 / (span + 1)
+        self.value = None
+        self.previous = None
+
+    def push(self, value):
+        """Fold a new value into the average."""
+        self.previous = self.value
+        self.value = self._step(self.previous, value)
+
+    def replace_last(self, value):
+        """Recompute the average with a revised most recent value."""
+        self.value = self._step(self.previous, value)
+
+    def seed(self, values):
+        """Reset the state from the tail of a bulk-computed average."""
+        self.previous = float(values[-2]) if len(values) > 1 else None
+        self.value = float(values[-1])
+
+    def _step(self, previous, value):
+        return value if previous is None else self.alpha * value + (1 - self.alpha) * previous
+
+
+class IndicatorState:
+    """SMA, RSI and MACD state for one pair, updated in O(1) per candle."""
+
+    def __init__(self, sma_periods=(20, 50), rsi_period=14, macd_periods=(12, 26, 9)):
+        fast, slow, signal = macd_periods
+        self.smas = {period: RollingMean(period) for period in sma_periods}
+        self.gains = RollingMean(rsi_period)
+        self.losses = RollingMean(rsi_period)
+        self.ema_fast = EMA(fast)
+        self.ema_slow = EMA(slow)
+        self.ema_signal = EMA(signal)
+        self.last_time = None
+        self.last_close = None
+        self.previous_close = None
+
+    def update(self, candle):
+        """Apply one candle; a candle with the same time as the last one revises it."""
+        time, close = candle['time'], float(candle['close'])
+        if self.last_time is not None and time < self.last_time:
+            return
+        revise = self.last_time is not None and time == self.last_time
+        if not revise:
+            self.previous_close = self.last_close
+        delta = close - self.previous_close if self.previous_close is not None else 0.0
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+
+        apply = 'replace_last' if revise else 'push'
+        for average in self.smas.values():
+            getattr(average, apply)(close)
+        getattr(self.gains, apply)(gain)
+        getattr(self.losses, apply)(loss)
+        getattr(self.ema_fast, apply)(close)
+        getattr(self.ema_slow, apply)(close)
+        getattr(self.ema_signal, apply)(self.ema_fast.value - self.ema_slow.value)
+
+        self.last_time = time
+        self.last_close = close
+
+    def warm_up(self, df):
+        """Seed the state from a full candle frame using the vectorised pandas path."""
+        close = df['close']
+        for average in self.smas.values():
+            average.seed(close.to_numpy())
+        delta = close.diff()
+        self.gains.seed(delta.where(delta > 0, 0).to_numpy())
+        self.losses.seed((-delta.where(delta < 0, 0)).to_numpy())
+        fast = close.ewm(span=self.ema_fast.span, adjust=False).mean()
+        slow = close.ewm(span=self.ema_slow.span, adjust=False).mean()
+        signal = (fast - slow).ewm(span=self.ema_signal.span, adjust=False).mean()
+        self.ema_fast.seed(fast.to_numpy())
+        self.ema_slow.seed(slow.to_numpy())
+        self.ema_signal.seed(signal.to_numpy())
+        self.last_time = df.index[-1]
+        self.last_close = float(close.iloc[-1])
+        self.previous_close = float(close.iloc[-2]) if len(close) > 1 else None
+
+    def values(self):
+        """Return the latest indicator values keyed like the DataFrame columns."""
+        values = {f'SMA_{period}': average.value for period, average in self.smas.items()}
+        gain, loss = self.gains.value, self.losses.value
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.float64(gain) / np.float64(loss)
+        values['RSI'] = float(100 - (100 / (1 + rs)))
+        macd_line = self.ema_fast.value - self.ema_slow.value
+        values['MACD'] = macd_line
+        values['Signal'] = self.ema_signal.value
+        values['Hist'] = macd_line - self.ema_signal.value
+        return values
+
+
+class IndicatorEngine:
+    """Keep streaming indicator state for every pair so each new candle costs O(1)."""
+
+    def __init__(self, sma_periods=(20, 50), rsi_period=14, macd_periods=(12, 26, 9)):
+        self.sma_periods = tuple(sma_periods)
+        self.rsi_period = rsi_period
+        self.macd_periods = tuple(macd_periods)
+        self.states = {}
+        self._lock = threading.Lock()
+
+    def update(self, pair, candle):
+        """Apply a single candle to a pair's state and return the latest values."""
+        with self._lock:
+            state = self.states.get(pair)
+            if state is None:
+                state = self.states[pair] = self._new_state()
+            state.update(candle)
+            return state.values()
+
+    def warm_up(self, pair, df):
+        """Rebuild a pair's state from a full candle frame and return the latest values."""
+        with self._lock:
+            state = self.states[pair] = self._new_state()
+            state.warm_up(df)
+            return state.values()
+
+    def sync(self, pair, df):
+        """Apply only the candles in `df` the pair's state has not seen yet."""
+        with self._lock:
+            state = self.states.get(pair)
+            if state is not None and state.last_time is not None:
+                position = df.index.searchsorted(state.last_time)
+                if position < len(df) and df.index[position] == state.last_time:
+                    closes = df['close'].to_numpy()
+                    for time, close in zip(df.index[position:], closes[position:]):
+                        state.update({'time': time, 'close': close})
+                    return state.values()
+        return self.warm_up(pair, df)
+
+    def _new_state(self):
+        return IndicatorState(self.sma_periods, self.rsi_period, self.macd_periods)
+
+
+def strategy_signals(sma_signal, macd_signal, rsi_value, sentiment, sentiment_threshold):
+    """Combine technical and sentiment signals into (buy, sell) flags.
+
+    Works on scalars for the live bot and element-wise on NumPy arrays for backtests.
+    """
+    bullish = np.logical_and(np.logical_and(sma_signal, macd_signal), rsi_value < 50)
+    bearish = np.logical_and(np.logical_and(np.logical_not(sma_signal), np.logical_not(macd_signal)), rsi_value > 50)
+    buy = np.logical_or(bullish, sentiment > sentiment_threshold)
+    sell = np.logical_or(bearish, sentiment < -sentiment_threshold)
+    return buy, sell
@@ -1,16 +1,27 @@
-import krakenex
-import requests
+import kraken_api
 import time
 import os
 from decimal import Decimal
-import pandas as pd
-import numpy as np
-from nltk.sentiment import SentimentIntensityAnalyzer
-import nltk
-from datetime import datetime, timedelta
+from types import MappingProxyType
+from datetime import datetime, timezone
 import logging
 from dotenv import load_dotenv
-from ratelimit import limits, sleep_and_retry
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from candle_store import CandleStore
+from indicators import IndicatorEngine, sma, rsi, macd, strategy_signals
+from market_feed import MarketDataFeed
+from rate_limiter import KrakenRateLimiter, TokenBucket
+from sentiment_store import SentimentStore
+from pair_index import PairIndex
+from sentiment_analyzer import get_analyzer
+from trade_ledger import TradeLedger
+from execution import OrderPlan, OrderExecutor
+from news_source import GNewsSource
+from scheduler import Scheduler, next_boundary
+from metrics import (REGISTRY, API_REQUEST_SECONDS, API_ERRORS, RATE_LIMIT_WAIT_SECONDS, PHASE_SECONDS,
+                     CACHE_LOOKUPS, timed, profile_call)
 
 # Load environment variables
 load_dotenv()
@@ -20,55 +31,132 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 class KrakenBot:
-    def __init__(self):
-        """Initialize the KrakenBot with necessary configurations and API connections."""
-        self.kraken = krakenex.API()
-        self.kraken.load_key('kraken.key')
+    def __init__(self, exchange=None, news_source=None):
+        """Initialize the KrakenBot with necessary configurations and API connections.
+
+        `exchange` is anything with krakenex.API's query_public/query_private and defaults to
+        kraken_api.KrakenAPI with the keys in kraken.key. `news_source` is anything with a `search(asset)`
+        that returns GNews-style results and defaults to GNews. The simulator module provides
+        offline stand-ins for both.
+        """
+        if exchange is None:
+            exchange = kraken_api.KrakenAPI()
+            exchange.load_key('kraken.key')
+        self.kraken = exchange
         self.gnews_api_key = os.getenv('GNEWS_API_KEY')
+        self.news_source = news_source or GNewsSource(self.gnews_api_key)
         self.check_interval = 300  # check every 5 minutes
+        self.rebalance_interval = 3600  # rebalance hourly
+        self.last_rebalance = None  # When a scheduled cycle last included the rebalance pass
+        self.candle_interval = 1440  # OHLC candle length in minutes
+        self.candle_close_delay = 5  # Seconds after a candle closes before evaluating it
         self.base_currency = 'USD'
-        self.asset_pairs = {}
+        self.pair_index = PairIndex('asset_pairs.json', self.base_currency)
+        self.pair_index.load()  # Warm start from the cached metadata; refreshed once it goes stale
+        self.asset_pairs = self.pair_index.pairs
         self.max_risk_per_trade = Decimal('0.02')  # 2% of account balance
         self.sentiment_threshold = Decimal('0.2')  # Sentiment threshold for trading decisions
         self.volatility_threshold = Decimal('0.02')  # 2% volatility threshold
         self.moving_average_periods = [20, 50]  # For simple moving average crossover strategy
+        self.rsi_period = 14
+        self.macd_periods = [12, 26, 9]  # Fast, slow and signal spans
         self.rebalance_threshold = Decimal('0.1')  # 10% threshold for rebalancing
         self.min_trade_size = Decimal('5')  # Minimum trade size in base currency
         self.is_trading = False
-        nltk.download('vader_lexicon', quiet=True)
-        self.sia = SentimentIntensityAnalyzer()
+        self.max_workers = 8  # Concurrent news/OHLC fetches per cycle
+        self.rate_limiter = KrakenRateLimiter()  # Models Kraken's decaying API counters
+        self.news_rate_limiter = TokenBucket(capacity=5, refill_rate=5 / 60)  # 5 calls per 60 seconds
+        self.use_limit_orders = os.getenv('KRAKEN_LIMIT_ORDERS', '').lower() in ('1', 'true', 'yes')
+        self.order_executor = OrderExecutor(self._make_kraken_api_call, self.max_workers)
+        self.listeners = []
+        self.use_market_feed = os.getenv('KRAKEN_MARKET_FEED', '').lower() in ('1', 'true', 'yes')
+        self.market_feed = None
+        self.profile_next_cycle = os.getenv('KRAKEN_PROFILE_CYCLE', '').lower() in ('1', 'true', 'yes')
+        self.candle_store = CandleStore('candles.db')
+        self.sentiment_store = SentimentStore('sentiment.db')
+        self.trade_ledger = TradeLedger('trades.db')
+        self.trade_sync_interval = 60  # Seconds between incremental trade history syncs
+        self.news_ttl = 1800  # Refresh each asset's news at most every 30 minutes
+        self.news_half_life = 6 * 3600  # Article weight halves every 6 hours
+        self.news_window = 7 * 24 * 3600  # Ignore articles older than a week
+        self.scheduler = Scheduler()
+        self._trade_lock = threading.Lock()  # Cycles never place orders concurrently
+        self.schedule_jobs()
+        self.indicators = IndicatorEngine(self.moving_average_periods, self.rsi_period, self.macd_periods)
+
+    @property
+    def sia(self):
+        """The shared VADER analyzer, loaded on first use rather than when the bot is created."""
+        return get_analyzer()
+
+    def get_settings(self):
+        """Return the settings the dashboard can change."""
+        return {
+            "check_interval": self.check_interval,
+            "max_risk_per_trade": self.max_risk_per_trade,
+            "sentiment_threshold": self.sentiment_threshold,
+            "rebalance_threshold": self.rebalance_threshold,
+            "volatility_threshold": self.volatility_threshold,
+            "min_trade_size": self.min_trade_size
+        }
+
+    def apply_settings(self, data):
+        """Apply the dashboard's settings form (percentages as 0-100) and reschedule the jobs."""
+        self.check_interval = int(data['checkInterval'])
+        self.max_risk_per_trade = float(data['maxRiskPerTrade']) / 100
+        self.sentiment_threshold = float(data['sentimentThreshold'])
+        self.rebalance_threshold = float(data['rebalanceThreshold']) / 100
+        self.volatility_threshold = float(data['volatilityThreshold']) / 100
+        self.min_trade_size = float(data['minTradeSize'])
+        self.scheduler.reschedule()
+
+    def add_listener(self, callback):
+        """Register a callback(event, data) for bot events such as placed orders and finished cycles."""
+        self.listeners.append(callback)
+
+    def _notify(self, event, data=None):
+        """Call every registered listener, keeping their failures out of the trading loop."""
+        for callback in list(self.listeners):
+            try:
+                callback(event, data)
+            except Exception as e:
+                logger.error(f"Error in {event} listener: {str(e)}")
 
-    @sleep_and_retry
-    @limits(calls=15, period=60)  # Limit to 15 calls per 60 seconds
     def _make_kraken_api_call(self, method, endpoint, payload=None):
         """Make a rate-limited API call to Kraken."""
-        if method == 'public':
-            return self.kraken.query_public(endpoint, payload)
-        elif method == 'private':
-            return self.kraken.query_private(endpoint, payload)
-        else:
+        if method not in ('public', 'private'):
             raise ValueError("Invalid method. Use 'public' or 'private'.")
-
-    def get_asset_pairs(self):
-        """Fetch and store valid asset pairs from Kraken."""
+        waited = self.rate_limiter.acquire(method, endpoint)
+        RATE_LIMIT_WAIT_SECONDS.observe(waited, pool=self.rate_limiter.pool_for(method, endpoint))
+        query = self.kraken.query_public if method == 'public' else self.kraken.query_private
+        try:
+            with API_REQUEST_SECONDS.time(endpoint=endpoint):
+                response = query(endpoint, payload)
+        except Exception:
+            API_ERRORS.inc(endpoint=endpoint)
+            raise
+        if response.get('error'):
+            API_ERRORS.inc(endpoint=endpoint)
+        return response
+
+    def get_metrics(self):
+        """Return the current latency histograms, counters and cache statistics."""
+        return REGISTRY.snapshot()
+
+    def get_asset_pairs(self, force=False):
+        """Load valid asset pairs, refetching them from Kraken only when the cached index is stale."""
+        if not force and not self.pair_index.is_stale():
+            self.asset_pairs = self.pair_index.pairs
+            return
         try:
             assets = self._make_kraken_api_call('public', 'AssetPairs')['result']
-            self.asset_pairs = {}
-            for pair, info in assets.items():
-                if info['quote'] == self.base_currency or info['quote'] == f'Z{self.base_currency}':
-                    try:
-                        min_order = Decimal(info['ordermin'])
-                        self.asset_pairs[pair] = {
-                            'altname': info['altname'],
-                            'min_order': min_order,
-                            'decimal_places': info['pair_decimals']
-                        }
-                    except KeyError:
-                        logger.warning(f"Skipping pair {pair} due to missing 'ordermin' information")
+            self.pair_index.refresh(assets)
+            self.asset_pairs = self.pair_index.pairs
             logger.info(f"Valid asset pairs: {list(self.asset_pairs.keys())}")
         except Exception as e:
             logger.error(f"Error fetching asset pairs: {str(e)}")
 
+    @timed('balance')
     def get_balance(self):
         """Fetch account balance from Kraken."""
         try:
@@ -77,15 +165,20 @@ class KrakenBot:
             logger.error(f"Error fetching balance: {str(e)}")
             return {}
 
+    def get_base_balance(self, balance):
+        """Return the quote currency balance, which Kraken may report as e.g. USD or ZUSD."""
+        return sum((Decimal(balance.get(asset, '0')) for asset in (self.base_currency, f'Z{self.base_currency}')),
+                   Decimal('0'))
+
     def get_ticker_info(self, pair):
         """Fetch ticker information for a specific asset pair."""
+        if self.market_feed:
+            cached = self.market_feed.ticker(pair)
+            if cached:
+                return cached
         try:
             ticker = self._make_kraken_api_call('public', 'Ticker', {'pair': pair})['result'][pair]
-            return {
-                'last': Decimal(ticker['c'][0]),
-                'bid': Decimal(ticker['b'][0]),
-                'ask': Decimal(ticker['a'][0]),
-            }
+            return self._parse_ticker(ticker)
         except KeyError:
             logger.error(f"Error fetching ticker info for {pair}: KeyError")
             return None
@@ -93,110 +186,210 @@ class KrakenBot:
             logger.error(f"Error fetching ticker info for {pair}: {str(e)}")
             return None
 
-    def get_portfolio_value(self):
+    def held_pairs(self, balance):
+        """Return the pairs that trade the assets in `balance`; a cycle only prices and orders these."""
+        return [pair for pair in dict.fromkeys(map(self.pair_index.pair_for_asset, balance)) if pair]
+
+    @timed('pricing')
+    def get_ticker_snapshot(self, pairs=None):
+        """Fetch ticker information for many asset pairs with a single Ticker request.
+
+        Returns an immutable mapping of pair -> ticker info that one cycle can share
+        between pricing, rebalancing and the strategy. Defaults to the pairs of the held
+        assets: Kraken fails the whole request if any pair in it is unknown, so asking for
+        every listed pair would let one delisting break pricing for the account.
+        """
+        pairs = self.held_pairs(self.get_balance()) if pairs is None else list(pairs)
+        snapshot = {}
+        if self.market_feed:
+            for pair in pairs:
+                cached = self.market_feed.ticker(pair)
+                if cached:
+                    snapshot[pair] = MappingProxyType(cached)
+            pairs = [pair for pair in pairs if pair not in snapshot]
+            CACHE_LOOKUPS.inc(len(snapshot), cache='ticker', result='hit')
+            CACHE_LOOKUPS.inc(len(pairs), cache='ticker', result='miss')
+        if not pairs:
+            return MappingProxyType(snapshot)
+        try:
+            tickers = self._make_kraken_api_call('public', 'Ticker', {'pair': ','.join(pairs)})['result']
+            for pair, ticker in tickers.items():
+                snapshot[pair] = MappingProxyType(self._parse_ticker(ticker))
+        except Exception as e:
+            logger.error(f"Error fetching ticker snapshot for {len(pairs)} pairs: {str(e)}")
+        return MappingProxyType(snapshot)
+
+    def _parse_ticker(self, ticker):
+        """Extract last, bid and ask prices from a raw Kraken ticker entry."""
+        return {
+            'last': Decimal(ticker['c'][0]),
+            'bid': Decimal(ticker['b'][0]),
+            'ask': Decimal(ticker['a'][0]),
+        }
+
+    def get_portfolio_value(self, prices=None, balance=None):
         """Calculate the total portfolio value in the base currency."""
-        balance = self.get_balance()
+        if balance is None:
+            balance = self.get_balance()
+        if prices is None:
+            prices = self.get_ticker_snapshot(self.held_pairs(balance))
         total_value = Decimal('0')
         for asset, amount in balance.items():
-            if asset == self.base_currency or asset == f'Z{self.base_currency}':
+            if self.pair_index.is_quote_asset(asset):
                 total_value += amount
             else:
-                for pair in self.asset_pairs:
-                    if pair.startswith(asset) or pair.startswith(f'X{asset}'):
-                        ticker_info = self.get_ticker_info(pair)
-                        if ticker_info:
-                            total_value += amount * ticker_info['last']
-                            break
+                ticker_info = prices.get(self.pair_index.pair_for_asset(asset))
+                if ticker_info:
+                    total_value += amount * ticker_info['last']
         logger.info(f"Total portfolio value: {total_value:.4f} {self.base_currency}")
         return total_value
 
-    @sleep_and_retry
-    @limits(calls=5, period=60)  # Limit to 5 calls per 60 seconds
+    @timed('news')
     def get_news_sentiment(self, asset):
-        """Fetch and analyze news sentiment for a specific asset."""
+        """Fetch and analyze news sentiment for a specific asset, scoring each article only once."""
         try:
-            url = f"https://gnews.io/api/v4/search?q={asset}&token={self.gnews_api_key}&lang=en"
-            response = requests.get(url)
-            news_data = response.json()
-            
-            if 'articles' not in news_data:
-                logger.error(f"Error fetching news for {asset}: {news_data.get('errors', ['Unknown error'])}")
-                return Decimal('0')
-            
-            sentiments = []
-            for article in news_data['articles'][:10]:
-                title = article['title']
-                description = article['description']
-                content = f"{title} {description}"
-                sentiment = self.sia.polarity_scores(content)['compound']
-                sentiments.append(sentiment)
-            
-            avg_sentiment = Decimal(sum(sentiments) / len(sentiments)) if sentiments else Decimal('0')
+            fresh = self.sentiment_store.is_fresh(asset, self.news_ttl)
+            CACHE_LOOKUPS.inc(cache='news', result='hit' if fresh else 'miss')
+            if not fresh:
+                self._refresh_news(asset)
+            # A failed refresh falls back to the articles already stored
+            avg_sentiment = Decimal(self.sentiment_store.aggregate(asset, self.news_half_life, self.news_window))
             logger.info(f"Current sentiment for {asset}: {avg_sentiment:.4f}")
             return avg_sentiment
         except Exception as e:
-            logger.error(f"Error fetching news sentiment for {asset}: {str(e)}")
+            logger.error(f"Error reading news sentiment for {asset}: {str(e)}")
             return Decimal('0')
-        
+
+    def _refresh_news(self, asset):
+        """Fetch and score the asset's latest articles; a failed fetch still counts against the TTL."""
+        try:
+            self.news_rate_limiter.acquire()
+            with PHASE_SECONDS.time(phase='news_request'):
+                news_data = self.news_source.search(asset)
+
+            if 'articles' in news_data:
+                scored = self.sentiment_store.record(
+                    asset, news_data['articles'][:10], lambda text: self.sia.polarity_scores(text)['compound'])
+                logger.debug(f"Scored {scored} new articles for {asset}")
+                return
+            logger.error(f"Error fetching news for {asset}: {news_data.get('errors', ['Unknown error'])}")
+        except Exception as e:
+            logger.error(f"Error fetching news sentiment for {asset}: {str(e)}")
+        self.sentiment_store.mark_refreshed(asset)
+
     def get_recent_trades(self, limit=10):
-        """Fetch recent trades from the account."""
+        """Return the account's most recent trades from the local ledger."""
         try:
-            trades = self._make_kraken_api_call('private', 'TradesHistory')['result']['trades']
-            recent_trades = []
-            for trade_id, trade_info in list(trades.items())[:limit]:
-                recent_trades.append({
-                    'time': trade_info['time'],
-                    'pair': trade_info['pair'],
-                    'type': trade_info['type'],
-                    'price': trade_info['price'],
-                    'amount': trade_info['vol'],
-                    'cost': trade_info['cost']
-                })
-            return recent_trades
+            return self.trade_ledger.recent(limit)
         except Exception as e:
-            logger.error(f"Error fetching recent trades: {str(e)}")
+            logger.error(f"Error reading recent trades: {str(e)}")
             return []
 
-    def place_order(self, pair, type, volume):
-        """Place a market order on Kraken."""
+    def get_realized_pnl(self, since=None):
+        """Return realised profit and fees per pair from the local ledger."""
         try:
-            volume = round(volume, self.asset_pairs[pair]['decimal_places'])
-            min_order = self.asset_pairs[pair]['min_order']
-            if volume < min_order:
-                logger.warning(f"Order volume {volume} is below minimum {min_order} for {pair}")
-                return
-            
-            order_params = {
-                'pair': pair,
-                'type': type,
-                'ordertype': 'market',
-                'volume': str(volume)
-            }
-            
-            response = self._make_kraken_api_call('private', 'AddOrder', order_params)
-            logger.info(f"Order response: {response}")
-            if 'error' in response and response['error']:
-                logger.error(f"Error placing order: {response['error']}")
-            elif 'result' in response and 'txid' in response['result']:
-                logger.info(f"Order placed successfully. Transaction ID: {response['result']['txid']}")
-            else:
-                logger.warning("Unexpected response format")
+            return self.trade_ledger.realized_pnl(since=since)
         except Exception as e:
-            logger.error(f"Exception occurred while placing order: {str(e)}")
+            logger.error(f"Error calculating realised PnL: {str(e)}")
+            return {}
 
-    def rebalance_portfolio(self):
-        """Rebalance the portfolio based on predefined thresholds."""
-        portfolio_value = self.get_portfolio_value()
+    @timed('trade_sync')
+    def sync_trades(self):
+        """Download trades since the last complete sync into the ledger, paging through TradesHistory.
+
+        Pages come newest first, so an interrupted sync may have stored recent trades but not
+        older ones. The sync watermark only moves once every page has been read, and the next
+        sync starts again from the old watermark; trades already stored are ignored.
+        """
+        added = 0
+        try:
+            synced_until = self.trade_ledger.synced_until()
+            # A fixed end keeps offsets stable while new fills arrive during the sync.
+            end = int(time.time())
+            payload = {'end': end}
+            if synced_until is not None:
+                payload['start'] = int(synced_until) - 1  # `start` is exclusive; re-fetched trades are ignored
+            offset = 0
+            while True:
+                response = self._make_kraken_api_call('private', 'TradesHistory', {**payload, 'ofs': offset})
+                if response.get('error'):
+                    logger.error(f"Error fetching trade history: {response['error']}")
+                    break
+                trades = response['result'].get('trades', {})
+                added += self.trade_ledger.record(trades)
+                offset += len(trades)
+                if offset >= int(response['result'].get('count', 0)):
+                    self.trade_ledger.mark_synced(end)
+                    break
+                if not trades:
+                    break
+        except Exception as e:
+            logger.error(f"Error syncing trade history: {str(e)}")
+        if added:
+            logger.info(f"Synced {added} new trades into the ledger")
+            self._notify('trades', {'added': added})
+        return added
+
+    def place_order(self, pair, type, volume, price=None):
+        """Place a single order on Kraken. Limit orders need `price` and a fresh quote, so this is a market order."""
+        plan = OrderPlan(self.pair_index)
+        plan.add(pair, type, volume, price)
+        return self.execute_plan(plan)
+
+    def new_order_plan(self, prices=None):
+        """Start an empty order plan for one cycle, quoted against the cycle's ticker snapshot."""
+        return OrderPlan(self.pair_index, prices, self.use_limit_orders)
+
+    @timed('orders')
+    def execute_plan(self, plan, balance=None):
+        """Validate a cycle's orders against the balance and submit them all in one round of requests."""
+        try:
+            holdings, quote_balance = None, None
+            if balance is not None:
+                holdings = {}
+                for asset, amount in balance.items():
+                    pair = self.pair_index.pair_for_asset(asset)
+                    if pair:
+                        holdings[pair] = holdings.get(pair, Decimal('0')) + Decimal(amount)
+                quote_balance = self.get_base_balance(balance)
+            orders = plan.finalize(holdings, quote_balance)
+            results = self.order_executor.execute(orders)
+            for result in results:
+                if result['error']:
+                    logger.error(f"Error placing {result['type']} order for {result['pair']}: {result['error']}")
+                    continue
+                logger.info(f"Order placed successfully. Transaction ID: {result['txid']}")
+                self._notify('order', {'pair': result['pair'], 'type': result['type'],
+                                       'volume': str(result['volume']), 'txid': result['txid']})
+            if any(not result['error'] for result in results):
+                self.scheduler.run_now('trade_sync')  # Pick up the fills without waiting for the next sync
+            return results
+        except Exception as e:
+            logger.error(f"Exception occurred while executing order plan: {str(e)}")
+            return []
+
+    def rebalance_portfolio(self, prices=None, plan=None):
+        """Rebalance the portfolio based on predefined thresholds.
+
+        Orders go into `plan` when one is given (the caller submits it); otherwise they are
+        submitted together once every asset has been checked.
+        """
         balance = self.get_balance()
-        base_balance = Decimal(balance.get(self.base_currency, '0'))
+        if prices is None:
+            prices = self.get_ticker_snapshot(self.held_pairs(balance))
+        submit = plan is None
+        if submit:
+            plan = self.new_order_plan(prices)
+        portfolio_value = self.get_portfolio_value(prices, balance)
+        base_balance = self.get_base_balance(balance)
         target_allocation = Decimal('0.1')  # 10% of portfolio for each asset
 
-        for pair, info in self.asset_pairs.items():
-            asset = pair.split(self.base_currency)[0]
-            if asset not in balance:
+        for asset in balance:
+            pair = self.pair_index.pair_for_asset(asset)
+            if pair is None:
                 continue
 
-            ticker_info = self.get_ticker_info(pair)
+            ticker_info = prices.get(pair)
             if not ticker_info:
                 continue
 
@@ -208,24 +401,44 @@ class KrakenBot:
                 # Sell excess
                 sell_amount = (current_value - target_value) / current_price
                 if sell_amount * current_price >= self.min_trade_size:
-                    self.place_order(pair, 'sell', sell_amount)
+                    plan.add(pair, 'sell', sell_amount, current_price, 'rebalance')
             elif current_value < target_value * (1 - self.rebalance_threshold) and base_balance > self.min_trade_size:
                 # Buy more
                 buy_amount = min((target_value - current_value) / current_price, base_balance / current_price)
                 if buy_amount * current_price >= self.min_trade_size:
-                    self.place_order(pair, 'buy', buy_amount)
+                    plan.add(pair, 'buy', buy_amount, current_price, 'rebalance')
+
+        if submit:
+            self.execute_plan(plan, balance)
+        return plan
 
-    def get_historical_data(self, pair, interval=1440, since=None):
-        """Fetch historical OHLC data for a specific pair."""
+    @timed('ohlc')
+    def get_historical_data(self, pair, interval=None, since=None):
+        """Fetch historical OHLC data for a specific pair, downloading only candles newer than the stored cursor."""
+        interval = interval or self.candle_interval
         try:
+            feed = self.market_feed if self.market_feed and self.market_feed.interval == interval else None
+            if feed and not since and feed.is_live(pair):
+                CACHE_LOOKUPS.inc(cache='candles', result='hit')
+                rows = feed.pop_candles(pair)
+                if rows:
+                    self.candle_store.merge(pair, interval, rows)
+                return self.candle_store.frame(pair, interval)
+            if feed:
+                # REST is about to cover everything streamed so far.
+                feed.pop_candles(pair)
+            CACHE_LOOKUPS.inc(cache='candles', result='miss')
             payload = {'pair': pair, 'interval': interval}
+            cursor = since if since else self.candle_store.cursor(pair, interval)
+            if cursor:
+                payload['since'] = cursor
+            result = self._make_kraken_api_call('public', 'OHLC', payload)['result']
+            self.candle_store.merge(pair, interval, result[pair], result.get('last'))
+            if feed:
+                feed.mark_backfilled(pair)
+            df = self.candle_store.frame(pair, interval)
             if since:
-                payload['since'] = since
-            ohlc_data = self._make_kraken_api_call('public', 'OHLC', payload)['result'][pair]
-            df = pd.DataFrame(ohlc_data, columns=['time', 'open', 'high', 'low', 'close', 'vwap', 'volume', 'count'])
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-            df.set_index('time', inplace=True)
-            df = df.astype(float)
+                df = df[df.index >= datetime.fromtimestamp(since, timezone.utc).replace(tzinfo=None)]
             return df
         except Exception as e:
             logger.error(f"Error fetching historical data for {pair}: {str(e)}")
@@ -233,152 +446,236 @@ class KrakenBot:
 
     def calculate_indicators(self, df):
         """Calculate technical indicators for trading decisions."""
-        df['SMA_20'] = df['close'].rolling(window=20).mean()
-        df['SMA_50'] = df['close'].rolling(window=50).mean()
-        df['RSI'] = self.calculate_rsi(df['close'])
-        df['MACD'], df['Signal'], df['Hist'] = self.calculate_macd(df['close'])
+        for period in self.moving_average_periods:
+            df[f'SMA_{period}'] = sma(df['close'], period)
+        df['RSI'] = self.calculate_rsi(df['close'], self.rsi_period)
+        df['MACD'], df['Signal'], df['Hist'] = self.calculate_macd(df['close'], *self.macd_periods)
         return df
 
     def calculate_rsi(self, prices, period=14):
         """Calculate the Relative Strength Index."""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
+        return rsi(prices, period)
 
     def calculate_macd(self, prices, fast=12, slow=26, signal=9):
         """Calculate the Moving Average Convergence Divergence."""
-        exp1 = prices.ewm(span=fast, adjust=False).mean()
-        exp2 = prices.ewm(span=slow, adjust=False).mean()
-        macd = exp1 - exp2
-        signal_line = macd.ewm(span=signal, adjust=False).mean()
-        histogram = macd - signal_line
-        return macd, signal_line, histogram
+        return macd(prices, fast, slow, signal)
+
+    @timed('indicators')
+    def get_latest_indicators(self, pair, df):
+        """Return the latest indicator values for a pair, updating streaming state with new candles only."""
+        engine = self.indicators
+        if (engine.sma_periods, engine.rsi_period, engine.macd_periods) != (
+                tuple(self.moving_average_periods), self.rsi_period, tuple(self.macd_periods)):
+            engine = self.indicators = IndicatorEngine(self.moving_average_periods, self.rsi_period, self.macd_periods)
+        return engine.sync(pair, df)
     
-    def get_current_signals(self):
-        """Get current trading signals for all asset pairs."""
-        signals = {}
-        self.get_asset_pairs()
-        balance = self.get_balance()
-        
+    def evaluate_assets(self, balance, prices=None):
+        """Fetch news and OHLC for every held asset concurrently, then compute their signals in one batch."""
+        candidates = []
         for asset, amount in balance.items():
-            if asset == self.base_currency or asset == f'Z{self.base_currency}':
+            if self.pair_index.is_quote_asset(asset):
                 continue
 
-            pair = f"{asset}{self.base_currency}"
-            if pair not in self.asset_pairs:
+            pair = self.pair_index.pair_for_asset(asset)
+            if pair is None:
+                logger.debug(f"No {self.base_currency} pair for {asset}.")
                 continue
-
+            candidates.append((asset, pair, amount))
+
+        # Each task runs in a copy of the caller's context so it keeps the caller's rate limit lane.
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            fetches = [
+                (asset, pair, amount,
+                 executor.submit(contextvars.copy_context().run, self.get_news_sentiment, asset),
+                 executor.submit(contextvars.copy_context().run, self.get_historical_data, pair))
+                for asset, pair, amount in candidates
+            ]
+
+        short_period, long_period = self.moving_average_periods[:2]
+        evaluations = []
+        for asset, pair, amount, sentiment_future, ohlc_future in fetches:
             try:
-                sentiment = self.get_news_sentiment(asset)
-                df = self.get_historical_data(pair)
+                sentiment = sentiment_future.result()
+                df = ohlc_future.result()
                 if df is None or df.empty:
+                    logger.debug(f"No historical data for {pair}.")
                     continue
 
-                df = self.calculate_indicators(df)
-                
-                # Convert numpy.bool_ to Python bool
-                sma_signal = bool(df['SMA_20'].iloc[-1] > df['SMA_50'].iloc[-1])
-                rsi = df['RSI'].iloc[-1]
-                macd_signal = bool(df['MACD'].iloc[-1] > df['Signal'].iloc[-1])
-
-                signals[asset] = {
-                    'sma_signal': sma_signal,
-                    'rsi_signal': 'Oversold' if rsi < 30 else 'Overbought' if rsi > 70 else 'Neutral',
-                    'macd_signal': macd_signal,
-                    'sentiment': float(sentiment)
-                }
-            
+                latest = self.get_latest_indicators(pair, df)
+                ticker_info = prices.get(pair) if prices else None
+                evaluations.append({
+                    'asset': asset,
+                    'pair': pair,
+                    'amount': amount,
+                    'sentiment': sentiment,
+                    'price': ticker_info['last'] if ticker_info else Decimal(str(df['close'].iloc[-1])),
+                    # Convert numpy.bool_ to Python bool
+                    'sma_signal': bool(latest[f'SMA_{short_period}'] > latest[f'SMA_{long_period}']),
+                    'rsi': latest['RSI'],
+                    'macd_signal': bool(latest['MACD'] > latest['Signal']),
+                })
             except Exception as e:
-                logger.error(f"Error getting signals for {asset}: {str(e)}")
-        
-        return signals
+                logger.error(f"Error processing {asset}: {str(e)}")
+        return evaluations
 
-    def trading_strategy(self):
-        """Implement the trading strategy based on technical indicators and sentiment analysis."""
+    def get_current_signals(self):
+        """Get current trading signals for all asset pairs."""
         self.get_asset_pairs()
         balance = self.get_balance()
-        
-        for asset, amount in balance.items():
-            if asset == self.base_currency or asset == f'Z{self.base_currency}':
-                continue
 
-            pair = f"{asset}{self.base_currency}"
-            if pair not in self.asset_pairs:
-                logger.debug(f"Asset pair {pair} not in asset pairs.")
-                continue
+        return self._summarize_signals(self.evaluate_assets(balance))
 
-            try:
-                sentiment = self.get_news_sentiment(asset)
-                df = self.get_historical_data(pair)
-                if df is None or df.empty:
-                    logger.debug(f"No historical data for {pair}.")
-                    continue
+    def _summarize_signals(self, evaluations):
+        """Reduce asset evaluations to the per-asset signal summary shown on the dashboard."""
+        signals = {}
+        for evaluation in evaluations:
+            rsi_value = evaluation['rsi']
+            signals[evaluation['asset']] = {
+                'sma_signal': bool(evaluation['sma_signal']),
+                'rsi_signal': 'Oversold' if rsi_value < 30 else 'Overbought' if rsi_value > 70 else 'Neutral',
+                'macd_signal': bool(evaluation['macd_signal']),
+                'sentiment': float(evaluation['sentiment'])
+            }
+        return signals
 
-                df = self.calculate_indicators(df)
-                current_price = Decimal(str(df['close'].iloc[-1]))
+    def trading_strategy(self, prices=None, plan=None):
+        """Implement the trading strategy based on technical indicators and sentiment analysis."""
+        balance = self.get_balance()
+        if prices is None:
+            self.get_asset_pairs()
+            prices = self.get_ticker_snapshot(self.held_pairs(balance))
+        submit = plan is None
+        if submit:
+            plan = self.new_order_plan(prices)
+
+        # Signals for every asset are computed up front; the resulting orders are submitted together.
+        evaluations = self.evaluate_assets(balance, prices)
+        self._notify('signals', self._summarize_signals(evaluations))
+        for evaluation in evaluations:
+            asset, pair, amount = evaluation['asset'], evaluation['pair'], evaluation['amount']
+            try:
+                sentiment = evaluation['sentiment']
+                current_price = evaluation['price']
                 current_value = Decimal(amount) * current_price
 
                 # Use the risk tolerance parameter
                 risk_amount = current_value * self.max_risk_per_trade
 
                 # Technical analysis signals
-                sma_signal = bool(df['SMA_20'].iloc[-1] > df['SMA_50'].iloc[-1])
-                rsi_value = df['RSI'].iloc[-1]
-                macd_signal = bool(df['MACD'].iloc[-1] > df['Signal'].iloc[-1])
+                sma_signal = evaluation['sma_signal']
+                rsi_value = evaluation['rsi']
+                macd_signal = evaluation['macd_signal']
 
                 # Combine technical and sentiment signals
-                buy_signal = (sma_signal and macd_signal and rsi_value < 50) or sentiment > self.sentiment_threshold
-                sell_signal = (not sma_signal and not macd_signal and rsi_value > 50) or sentiment < -self.sentiment_threshold
+                buy_signal, sell_signal = strategy_signals(sma_signal, macd_signal, rsi_value, sentiment,
+                                                           self.sentiment_threshold)
 
                 logger.debug(f"Signals for {asset}: Buy={buy_signal}, Sell={sell_signal}, Price={current_price}")
 
                 if buy_signal:
-                    base_balance = Decimal(balance.get(self.base_currency, '0'))
+                    base_balance = self.get_base_balance(balance)
                     buy_volume = (risk_amount / current_price).quantize(Decimal('1e-8'))
                     if buy_volume * current_price >= self.min_trade_size and base_balance >= buy_volume * current_price:
-                        self.place_order(pair, 'buy', buy_volume)
-                        logger.info(f"Placed buy order for {buy_volume} {asset}")
+                        plan.add(pair, 'buy', buy_volume, current_price, 'strategy')
+                        logger.info(f"Planned buy order for {buy_volume} {asset}")
                     else:
                         logger.debug(f"Not enough balance to buy {asset} or trade size too small.")
                 elif sell_signal:
                     sell_volume = min((risk_amount / current_price).quantize(Decimal('1e-8')), Decimal(amount))
                     if sell_volume * current_price >= self.min_trade_size:
-                        self.place_order(pair, 'sell', sell_volume)
-                        logger.info(f"Placed sell order for {sell_volume} {asset}")
+                        plan.add(pair, 'sell', sell_volume, current_price, 'strategy')
+                        logger.info(f"Planned sell order for {sell_volume} {asset}")
                     else:
                         logger.debug(f"Not enough {asset} to sell or trade size too small.")
                 else:
                     logger.debug(f"No trade action for {asset}.")
-            
+
             except Exception as e:
                 logger.error(f"Error processing {asset}: {str(e)}")
-            
-            time.sleep(1)
+
+        if submit:
+            self.execute_plan(plan, balance)
+        return plan
+
+    def run_cycle(self, rebalance=True, strategy=True):
+        """Run the rebalance and strategy passes on one price snapshot and submit their orders as one plan."""
+        with self._trade_lock:
+            self.get_asset_pairs()
+            prices = self.get_ticker_snapshot(self.held_pairs(self.get_balance()))
+            plan = self.new_order_plan(prices)
+            if rebalance:
+                self.rebalance_portfolio(prices, plan)
+            if strategy:
+                self.trading_strategy(prices, plan)
+            self.execute_plan(plan, self.get_balance())
+        self._notify('cycle')
+        return prices
+
+    def run_scheduled_cycle(self):
+        """Scheduled job: run a cycle with the strategy, plus rebalancing once its interval has come round."""
+        if not self.is_trading:
+            return
+        now = time.time()
+        rebalance = self.last_rebalance is None or \
+            next_boundary(self.last_rebalance, self.rebalance_interval, self.candle_close_delay) <= now
+        if rebalance:
+            self.last_rebalance = now
+        if self.profile_next_cycle:
+            self.profile_next_cycle = False
+            profile_call(lambda: self.run_cycle(rebalance), f"cycle-{datetime.now():%Y%m%d-%H%M%S}.prof")
+        else:
+            self.run_cycle(rebalance)
+
+    def schedule_jobs(self):
+        """Register the bot's recurring jobs; the cycle also runs right after each candle closes."""
+        self.scheduler.add('cycle', self.run_scheduled_cycle, lambda: self.check_interval,
+                           align=lambda: self.candle_interval * 60, offset=self.candle_close_delay)
+        self.scheduler.add('trade_sync', self.sync_trades, lambda: self.trade_sync_interval)
+
+    def start_market_feed(self, interval=1440):
+        """Stream ticker and OHLC data for the known asset pairs over Kraken's websocket."""
+        if not self.asset_pairs:
+            self.get_asset_pairs()
+        pairs = {pair: info['wsname'] for pair, info in self.asset_pairs.items() if info.get('wsname')}
+        try:
+            self.market_feed = MarketDataFeed(pairs, interval)
+            self.market_feed.start()
+            logger.info(f"Market data feed started for {len(pairs)} pairs")
+        except Exception as e:
+            logger.error(f"Error starting market data feed: {str(e)}")
+            self.market_feed = None
+
+    def stop_market_feed(self):
+        """Stop the websocket feed and go back to REST polling."""
+        if self.market_feed:
+            self.market_feed.stop()
+            self.market_feed = None
+            logger.info("Market data feed stopped")
 
     def start_trading(self):
         """Start the trading bot."""
         self.is_trading = True
+        if self.use_market_feed and not self.market_feed:
+            self.start_market_feed(self.candle_interval)
+        self.scheduler.start()
+        self.scheduler.run_now('trade_sync')
         logger.info("Trading bot started")
 
     def stop_trading(self):
         """Stop the trading bot."""
         self.is_trading = False
+        self.scheduler.stop()
+        self.stop_market_feed()
         logger.info("Trading bot stopped")
 
     def run(self):
-        """Main loop to run the trading bot."""
+        """Trade on the scheduler until interrupted."""
         logger.info("Starting improved Kraken trading bot with portfolio management...")
-        while True:
-            try:
-                if self.is_trading:
-                    self.rebalance_portfolio()
-                    self.trading_strategy()
-                time.sleep(self.check_interval)
-            except Exception as e:
-                logger.error(f"Error in trading strategy: {str(e)}")
-                time.sleep(60)
+        self.start_trading()
+        try:
+            self.scheduler.join()
+        except KeyboardInterrupt:
+            self.stop_trading()
 
 if __name__ == "__main__":
     bot = KrakenBot()
@@ -0,0 +1,240 @@
+"""Load-test the bot and the dashboard against the exchange simulator, on one machine and with no real money.
+
+Starts the Flask app on a local port with a bot wired to simulator.SimulatedKraken and
+simulator.FakeNews. Trading then runs on a short cadence while dashboard clients poll the
+JSON endpoints and hold /stream open. Request latencies, bot phase timings and exchange
+statistics are reported at the end.
+
+Usage:
+    python loadtest.py --pairs 500 --clients 50 --stream-clients 20 --duration 120
+    python loadtest.py --pairs 100 --latency 0.05 --jitter 0.05 --error-rate 0.01 --rate-limits
+    python loadtest.py --fixtures fixtures.json --pairs 50 --output loadtest_results.json
+    python loadtest.py --pairs 500 --workers 4
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+import requests
+from werkzeug.serving import make_server
+import replay
+from simulator import SimulatedKraken, FakeNews
+
+logger = logging.getLogger(__name__)
+
+ENDPOINTS = ['/get_bot_status', '/get_portfolio', '/get_trades', '/get_pnl', '/get_trading_signals', '/get_logs',
+             '/metrics']
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def poll(base_url, deadline, offset, think_time, samples, failures, lock):
+    """Cycle through the dashboard endpoints until the deadline, recording each request's latency."""
+    session = requests.Session()
+    index = offset
+    while time.monotonic() < deadline:
+        path = ENDPOINTS[index % len(ENDPOINTS)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            ok = session.get(base_url + path, timeout=60).status_code < 500
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            samples[path].append(elapsed)
+            if not ok:
+                failures[path] += 1
+        if think_time:
+            time.sleep(think_time)
+
+
+def listen(base_url, deadline, events, lock):
+    """Hold a /stream connection open until the deadline, counting the events pushed to it."""
+    try:
+        with requests.get(base_url + '/stream', stream=True, timeout=30) as response:
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith('event: '):
+                    with lock:
+                        events[line[len('event: '):]] += 1
+                if time.monotonic() >= deadline:
+                    break
+    except requests.RequestException as e:
+        with lock:
+            events['disconnected'] += 1
+        logger.debug(f"Stream client stopped: {str(e)}")
+
+
+class BotFactory:
+    """Builds the load test's bot around the simulator.
+
+    Picklable, as shard workers are spawned: each worker unpickles its own copy of the
+    simulator and builds an unsharded bot around it.
+    """
+
+    def __init__(self, exchange, news, args, sharded=True):
+        self.exchange = exchange
+        self.news = news
+        self.args = args
+        self.sharded = sharded
+
+    def __call__(self):
+        from kraken_bot import KrakenBot
+        from rate_limiter import KrakenRateLimiter, TokenBucket
+        from workers import ShardedKrakenBot
+
+        args = self.args
+        if args.workers and self.sharded:
+            bot = ShardedKrakenBot(exchange=self.exchange, news_source=self.news, workers=args.workers,
+                                   bot_factory=BotFactory(self.exchange, self.news, args, sharded=False))
+        else:
+            bot = KrakenBot(exchange=self.exchange, news_source=self.news)
+        bot.check_interval = args.check_interval
+        bot.rebalance_interval = args.rebalance_interval
+        if not args.rate_limits:
+            # The simulator isn't limiting either, so the limiter would only add sleeps.
+            unlimited = float('inf')
+            bot.rate_limiter = KrakenRateLimiter(counter_max=unlimited, public_max=unlimited, order_max=unlimited)
+            bot.news_rate_limiter = TokenBucket(capacity=unlimited, refill_rate=1)
+        return bot
+
+
+def summarize(samples, failures, duration):
+    rows = {}
+    for path in ENDPOINTS:
+        latencies = samples.get(path, [])
+        rows[path] = {
+            'requests': len(latencies),
+            'failures': failures.get(path, 0),
+            'per_second': len(latencies) / duration,
+            'p50_ms': (percentile(latencies, 0.5) or 0) * 1000,
+            'p95_ms': (percentile(latencies, 0.95) or 0) * 1000,
+            'p99_ms': (percentile(latencies, 0.99) or 0) * 1000,
+            'max_ms': max(latencies, default=0) * 1000,
+        }
+    return rows
+
+
+def phase_timings(snapshot, metric):
+    return {labels: {'count': series['count'], 'mean_ms': series['sum'] / series['count'] * 1000}
+            for labels, series in snapshot.get(metric, {}).items() if series['count']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the trading bot and dashboard against a simulated "
+                                                 "Kraken exchange and news feed.")
+    parser.add_argument('--pairs', type=int, default=500, help="Number of simulated USD pairs")
+    parser.add_argument('--candles', type=int, default=720, help="Synthetic candles per pair")
+    parser.add_argument('--fixtures', help="Recorded fixtures to simulate instead of synthetic data")
+    parser.add_argument('--duration', type=float, default=60, help="Seconds to run the load")
+    parser.add_argument('--clients', type=int, default=20, help="Concurrent dashboard clients polling JSON endpoints")
+    parser.add_argument('--stream-clients', type=int, default=10, help="Concurrent /stream subscribers")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Seconds each client waits between requests")
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated seconds added to each Kraken call")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many extra random seconds per call")
+    parser.add_argument('--news-latency', type=float, default=0.0, help="Simulated seconds added to each news search")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of Kraken calls that return EService")
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help="Fraction of Kraken calls that time out")
+    parser.add_argument('--rate-limits', action='store_true',
+                        help="Enforce Kraken's rate limits in the simulator and keep the bot's limiters")
+    parser.add_argument('--seconds-per-candle', type=float, default=5.0, help="How fast the simulated market moves")
+    parser.add_argument('--check-interval', type=int, default=30, help="Seconds between strategy runs")
+    parser.add_argument('--rebalance-interval', type=int, default=60, help="Seconds between rebalances")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Evaluate signals in this many shard worker processes (0 keeps it in-process)")
+    parser.add_argument('--port', type=int, default=0, help="Port for the dashboard (0 picks a free one)")
+    parser.add_argument('--output', help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    output = os.path.abspath(args.output) if args.output else None
+    if args.fixtures:
+        fixtures = replay.limit_pairs(replay.load_fixtures(args.fixtures), args.pairs)
+    else:
+        logger.info(f"Generating {args.pairs} synthetic pairs")
+        fixtures = replay.synthetic_fixtures(args.pairs, candles=args.candles)
+    exchange = SimulatedKraken(fixtures, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                               timeout_rate=args.timeout_rate, rate_limits=args.rate_limits,
+                               seconds_per_candle=args.seconds_per_candle)
+    news = FakeNews(latency=args.news_latency)
+
+    # The bot's stores, caches and logs go to a scratch directory, never the real ones.
+    workdir = tempfile.mkdtemp(prefix='kraken-loadtest-')
+    os.chdir(workdir)
+    import app
+    from metrics import REGISTRY, PHASE_SECONDS, JOB_SECONDS
+    app.bot_factory = BotFactory(exchange, news, args)
+
+    server = make_server('127.0.0.1', args.port, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='dashboard', daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    logger.info(f"Dashboard on {base_url}, working directory {workdir}")
+
+    started = time.monotonic()
+    response = requests.post(base_url + '/start_bot', timeout=60).json()
+    logger.info(f"Start bot: {response['message']} in {time.monotonic() - started:.2f}s")
+
+    # The bot logs every asset it touches; keep that out of the way of the load.
+    logging.getLogger().setLevel(logging.WARNING)
+    samples, failures, events, lock = defaultdict(list), Counter(), Counter(), threading.Lock()
+    deadline = time.monotonic() + args.duration
+    threads = [threading.Thread(target=poll, args=(base_url, deadline, i, args.think_time, samples, failures, lock),
+                                daemon=True) for i in range(args.clients)]
+    threads += [threading.Thread(target=listen, args=(base_url, deadline, events, lock), daemon=True)
+                for _ in range(args.stream_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        # Stream clients notice the deadline on their next event or heartbeat.
+        thread.join(max(0.0, deadline - time.monotonic()) + 20)
+    logging.getLogger().setLevel(logging.INFO)
+
+    requests.post(base_url + '/stop_bot', timeout=60)
+    server.shutdown()
+
+    snapshot = REGISTRY.snapshot()
+    endpoints = summarize(samples, failures, args.duration)
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': vars(args),
+        },
+        'endpoints': endpoints,
+        'stream_events': dict(events),
+        'phases': phase_timings(snapshot, PHASE_SECONDS.name),
+        'jobs': phase_timings(snapshot, JOB_SECONDS.name),
+        'exchange': exchange.stats(),
+        'news_searches': news.calls['search'],
+    }
+
+    for path, row in endpoints.items():
+        logger.info(f"{path:<22} {row['requests']:>7} requests ({row['per_second']:7.1f}/s), "
+                    f"{row['failures']:>4} failed, p50 {row['p50_ms']:8.1f}ms, p95 {row['p95_ms']:8.1f}ms, "
+                    f"p99 {row['p99_ms']:8.1f}ms")
+    logger.info(f"Stream events received: {dict(events)}")
+    for name, timing in sorted(report['jobs'].items()):
+        logger.info(f"Job {name:<28} ran {timing['count']:>4} times, mean {timing['mean_ms']:10.1f}ms")
+    logger.info(f"Exchange: {report['exchange']}")
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import os
+import json
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+
+def tail_lines(path, count, block_size=8192):
+    """Return the last `count` lines of a file, reading backwards from the end in blocks."""
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        data, newlines = b'', 0
+        while position > 0 and newlines <= count:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            block = f.read(step)
+            newlines += block.count(b'\n')
+            data = block + data
+    return [line.decode('utf-8', 'replace') for line in data.splitlines()[-count:]]
+
+
+class LogJournal(RotatingFileHandler):
+    """Log handler that numbers every record and keeps the newest ones in memory.
+
+    Each record gets a monotonically increasing `seq`, is appended to a bounded ring
+    buffer and written to a size-rotated JSON-lines file. Readers ask for the records
+    after the last `seq` they saw, which costs time proportional to the new records
+    only. On startup the tail of the file is loaded back, so sequence numbers carry on
+    across restarts.
+    """
+
+    def __init__(self, path='kraken_trader.jsonl', capacity=1000, max_bytes=5000000, backup_count=3,
+                 on_record=None, level=logging.INFO):
+        super().__init__(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.setLevel(level)
+        self.on_record = on_record  # Called with each new entry, e.g. to push it to dashboards
+        self._records = deque(maxlen=capacity)
+        self._seq = 0
+        self._records_lock = threading.Lock()
+        self._message_formatter = logging.Formatter()
+        self._load(path, capacity)
+
+    def _load(self, path, capacity):
+        if not os.path.exists(path):
+            return
+        for line in tail_lines(path, capacity):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # A torn last line or an older plain-text log
+            if isinstance(entry, dict) and 'seq' in entry:
+                self._records.append(entry)
+                self._seq = max(self._seq, entry['seq'])
+
+    @property
+    def last_seq(self):
+        return self._seq
+
+    def emit(self, record):
+        try:
+            with self._records_lock:
+                self._seq += 1
+                entry = {
+                    'seq': self._seq,
+                    'time': record.created,
+                    'level': record.levelname,
+                    'logger': record.name,
+                    'message': self._message_formatter.format(record),
+                }
+                self._records.append(entry)
+            record.journal_entry = entry
+            super().emit(record)
+            if self.on_record:
+                self.on_record(entry)
+        except Exception:
+            self.handleError(record)
+
+    def format(self, record):
+        """Serialise the record's journal entry as one JSON line."""
+        return json.dumps(record.journal_entry)
+
+    def since(self, after=None, limit=100):
+        """Return up to `limit` records newer than `after`, oldest first.
+
+        Without `after` the newest `limit` records are returned. With it, the oldest
+        `limit` new ones are, so a reader that fell behind can page forward.
+        """
+        with self._records_lock:
+            new = []
+            for entry in reversed(self._records):
+                if after is not None and entry['seq'] <= after:
+                    break
+                if after is None and len(new) >= limit:
+                    break
+                new.append(entry)
+        new.reverse()
+        return new[:limit]
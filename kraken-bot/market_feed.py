@@ -0,0 +1,188 @@
+import asyncio
+import json
+import random
+import threading
+import time
+import logging
+from decimal import Decimal
+
+try:
+    import websockets
+except ImportError:  # The feed is optional; the bot falls back to REST polling without it.
+    websockets = None
+
+logger = logging.getLogger(__name__)
+
+KRAKEN_WS_URL = 'wss://ws.kraken.com'
+CHANNELS = ('ticker', 'ohlc')  # The feed only counts as connected once both are subscribed
+
+
+class MarketDataFeed:
+    """Stream Kraken ticker and OHLC updates into an in-memory cache on a background event loop."""
+
+    def __init__(self, pairs, interval=1440, url=KRAKEN_WS_URL, stale_after=30, max_backoff=60):
+        """Create a feed for a mapping of Kraken pair name -> websocket pair name."""
+        if websockets is None:
+            raise RuntimeError("The 'websockets' package is required for the market data feed")
+        self.pairs = dict(pairs)
+        self.interval = interval
+        self.url = url
+        self.stale_after = stale_after
+        self.max_backoff = max_backoff
+        self.reconnects = 0
+        self.gaps = 0
+        self._by_wsname = {wsname: pair for pair, wsname in self.pairs.items()}
+        self._tickers = {}
+        self._candle_starts = {}
+        self._pending_candles = {}
+        self._needs_backfill = set(self.pairs)
+        self._last_message = 0.0
+        self._subscribed = set()  # Channels acknowledged on the current connection
+        self._connected = threading.Event()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._stopping = None
+
+    def start(self):
+        """Run the feed on its own event loop in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._loop = asyncio.new_event_loop()
+        self._stopping = asyncio.Event()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self.run(),), daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Close the connection and wait for the feed thread to finish."""
+        if self._loop and self._thread and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._stopping.set)
+            self._thread.join(timeout)
+        self._connected.clear()
+
+    def wait_connected(self, timeout=None):
+        """Block until the feed has an active subscription."""
+        return self._connected.wait(timeout)
+
+    async def run(self):
+        """Keep a subscription alive, reconnecting with jittered exponential backoff."""
+        if self._stopping is None:
+            self._stopping = asyncio.Event()
+        backoff = 1
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            try:
+                await self._session()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Market data feed disconnected: {str(e)}")
+            finally:
+                self._connected.clear()
+                with self._lock:
+                    # Anything could have happened while we were disconnected.
+                    self._needs_backfill.update(self.pairs)
+            if self._stopping.is_set():
+                break
+            if time.monotonic() - started > self.stale_after:
+                backoff = 1
+            delay = min(backoff, self.max_backoff) * (0.5 + random.random() / 2)
+            self.reconnects += 1
+            logger.info(f"Reconnecting market data feed in {delay:.1f}s")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            backoff *= 2
+
+    async def _session(self):
+        """Subscribe to ticker and OHLC channels and process messages until the socket drops or goes stale."""
+        async with websockets.connect(self.url) as ws:
+            self._subscribed.clear()
+            wsnames = list(self._by_wsname)
+            await ws.send(json.dumps({'event': 'subscribe', 'pair': wsnames, 'subscription': {'name': 'ticker'}}))
+            await ws.send(json.dumps({'event': 'subscribe', 'pair': wsnames,
+                                      'subscription': {'name': 'ohlc', 'interval': self.interval}}))
+            stop_task = asyncio.ensure_future(self._stopping.wait())
+            try:
+                while not self._stopping.is_set():
+                    recv_task = asyncio.ensure_future(ws.recv())
+                    done, _ = await asyncio.wait({recv_task, stop_task}, timeout=self.stale_after,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                    if recv_task not in done:
+                        recv_task.cancel()
+                        if stop_task in done:
+                            return
+                        raise ConnectionError(f"No market data for {self.stale_after}s")
+                    self._handle(json.loads(recv_task.result()))
+            finally:
+                stop_task.cancel()
+
+    def _handle(self, message):
+        """Route a decoded websocket message into the ticker or candle cache."""
+        self._last_message = time.monotonic()
+        if isinstance(message, dict):
+            if message.get('event') == 'subscriptionStatus':
+                if message.get('status') == 'subscribed':
+                    self._subscribed.add(message.get('subscription', {}).get('name'))
+                    if self._subscribed.issuperset(CHANNELS):
+                        self._connected.set()
+                else:
+                    logger.error(f"Market data subscription failed: {message.get('errorMessage')}")
+            return
+        channel, pair = message[-2], self._by_wsname.get(message[-1])
+        if pair is None:
+            return
+        if channel == 'ticker':
+            self._handle_ticker(pair, message[1])
+        elif channel.startswith('ohlc'):
+            self._handle_candle(pair, message[1])
+
+    def _handle_ticker(self, pair, data):
+        with self._lock:
+            self._tickers[pair] = {
+                'last': Decimal(data['c'][0]),
+                'bid': Decimal(data['b'][0]),
+                'ask': Decimal(data['a'][0]),
+                'updated': time.monotonic(),
+            }
+
+    def _handle_candle(self, pair, data):
+        _, etime, open_, high, low, close, vwap, volume, count = data
+        start = int(float(etime)) - self.interval * 60
+        with self._lock:
+            previous = self._candle_starts.get(pair)
+            if previous is not None and start > previous + self.interval * 60:
+                # A whole candle went by without an update, so the cache can't be trusted.
+                self.gaps += 1
+                self._needs_backfill.add(pair)
+                logger.warning(f"Candle gap detected for {pair}, falling back to REST until backfilled")
+            self._candle_starts[pair] = start
+            self._pending_candles.setdefault(pair, {})[start] = [start, open_, high, low, close, vwap, volume, count]
+
+    def is_live(self, pair):
+        """Whether cached data for a pair is current and can be served instead of REST."""
+        with self._lock:
+            return (self._connected.is_set() and pair in self.pairs and pair not in self._needs_backfill
+                    and time.monotonic() - self._last_message < self.stale_after)
+
+    def ticker(self, pair):
+        """Return the cached top of book for a pair, or None if it is missing or stale."""
+        if not self._connected.is_set():
+            return None
+        with self._lock:
+            ticker = self._tickers.get(pair)
+        if ticker is None or time.monotonic() - ticker['updated'] > self.stale_after:
+            return None
+        return {key: ticker[key] for key in ('last', 'bid', 'ask')}
+
+    def pop_candles(self, pair):
+        """Return candles received for a pair since the last call, oldest first."""
+        with self._lock:
+            pending = self._pending_candles.pop(pair, {})
+        return [pending[start] for start in sorted(pending)]
+
+    def mark_backfilled(self, pair):
+        """Record that REST has filled any gap for a pair, so the cache may serve it again."""
+        with self._lock:
+            self._needs_backfill.discard(pair)
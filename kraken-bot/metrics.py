@@ -0,0 +1,206 @@
+import bisect
+import cProfile
+import functools
+import io
+import math
+import pstats
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond cache hits up to slow exchange calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _label_key(label_names, labels):
+    return tuple(str(labels.get(name, '')) for name in label_names)
+
+
+def _format_labels(label_names, key, extra=None):
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, key)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """A value that only goes up, e.g. requests served."""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {key: value for key, value in self._values.items()}
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                for key, value in self.snapshot().items()]
+
+
+class Gauge(Counter):
+    """A value that can go up and down, e.g. jobs in progress."""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Counts observations into cumulative buckets, plus their sum and count."""
+    kind = 'histogram'
+
+    def __init__(self, name, help, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(self.label_names, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time spent inside the block, even when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        """Return {label values: {'count', 'sum', 'buckets': {upper bound: cumulative count}}}."""
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        result = {}
+        for key, (counts, total, count) in values.items():
+            cumulative, running = {}, 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                running += bucket_count
+                cumulative[bound] = running
+            result[key] = {'count': count, 'sum': total, 'buckets': cumulative}
+        return result
+
+    def render(self):
+        lines = []
+        for key, series in self.snapshot().items():
+            for bound, count in series['buckets'].items():
+                labels = _format_labels(self.label_names, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process's metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def snapshot(self):
+        """Return every metric's current values keyed by metric name, for in-process use."""
+        return {name: {
+            ','.join(f"{label}={value}" for label, value in zip(metric.label_names, key)): value
+            for key, value in metric.snapshot().items()
+        } for name, metric in list(self.metrics.items())}
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+API_REQUEST_SECONDS = REGISTRY.histogram(
+    'kraken_api_request_seconds', "Kraken REST call latency, excluding rate limiter waits", ['endpoint'])
+API_ERRORS = REGISTRY.counter(
+    'kraken_api_errors_total', "Kraken REST calls that raised or returned an error", ['endpoint'])
+RATE_LIMIT_WAIT_SECONDS = REGISTRY.histogram(
+    'kraken_rate_limit_wait_seconds', "Time spent waiting for Kraken API counter headroom", ['pool'])
+PHASE_SECONDS = REGISTRY.histogram(
+    'bot_phase_seconds', "Time spent in each phase of a trading cycle", ['phase'])
+CACHE_LOOKUPS = REGISTRY.counter(
+    'bot_cache_lookups_total', "Cache lookups by cache and result (hit or miss)", ['cache', 'result'])
+JOB_SECONDS = REGISTRY.histogram(
+    'scheduler_job_seconds', "Duration of each scheduled job run, i.e. the cycle time", ['job'],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+JOB_SKIPPED = REGISTRY.counter(
+    'scheduler_job_skipped_total', "Job runs skipped because the previous run was still in progress", ['job'])
+JOB_LATE = REGISTRY.counter(
+    'scheduler_job_late_total', "Job runs that started noticeably after their deadline", ['job'])
+
+
+def timed(phase):
+    """Decorator that records a function's duration under `bot_phase_seconds{phase=...}`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with PHASE_SECONDS.time(phase=phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profile_call(func, path, top=25):
+    """Run `func` under cProfile, dump the stats to `path` and log the most expensive calls."""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func)
+    finally:
+        profiler.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(top)
+        logger.info(f"Profiled {getattr(func, '__name__', func)}; stats written to {path}\n{report.getvalue()}")
@@ -0,0 +1,13 @@
+import requests
+
+
+class GNewsSource:
+    """Search GNews for recent English articles about an asset."""
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def search(self, asset):
+        """Return the parsed GNews search response for an asset."""
+        url = f"https://gnews.io/api/v4/search?q={asset}&token={self.api_key}&lang=en"
+        return requests.get(url).json()
@@ -0,0 +1,80 @@
+import itertools
+import numpy as np
+
+OHLC_COLUMNS = ['open', 'high', 'low', 'close', 'vwap', 'volume', 'count']
+ROW_WIDTH = len(OHLC_COLUMNS) + 1  # Kraken rows lead with the candle's start time
+
+
+def parse_ohlc(rows):
+    """Parse raw Kraken OHLC rows into (times int64[n], values float64[7, n]).
+
+    The rows' strings and numbers are streamed into one preallocated array, so no
+    per-row Python objects or object-dtype intermediates are created. `values` is a
+    view into that array; CandleBuffer copies it into contiguous columns.
+    """
+    count = len(rows)
+    flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.float64, count=count * ROW_WIDTH)
+    table = flat.reshape(count, ROW_WIDTH).T
+    return table[0].astype(np.int64), table[1:]
+
+
+def ohlc_frame(times, values):
+    """Wrap columnar candle arrays in a DataFrame without copying them."""
+    import pandas as pd  # Deferred so importing the bot (and the dashboard) doesn't pay for pandas
+    index = pd.DatetimeIndex(times.astype('datetime64[s]'), name='time')
+    return pd.DataFrame(values.T, index=index, columns=OHLC_COLUMNS, copy=False)
+
+
+class CandleBuffer:
+    """The newest `max_rows` candles of one series, held in preallocated columnar arrays.
+
+    Storage is twice `max_rows` long. New candles are written after the current window and
+    the window start moves forward, so `times` and `values` are always contiguous views. When
+    the storage runs out, the window is copied into fresh arrays, which costs one copy per
+    `max_rows` appended candles and leaves views handed out earlier untouched.
+    """
+
+    def __init__(self, max_rows):
+        self.max_rows = max_rows
+        self._times = np.empty(2 * max_rows, dtype=np.int64)
+        self._values = np.empty((len(OHLC_COLUMNS), 2 * max_rows), dtype=np.float64)
+        self._start = self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def times(self):
+        return self._times[self._start:self._end]
+
+    @property
+    def values(self):
+        return self._values[:, self._start:self._end]
+
+    def clear(self):
+        self._start = self._end = 0
+
+    def merge(self, times, values):
+        """Add parsed candles; ones at or after the first new time replace what is stored."""
+        if not len(times):
+            return
+        if len(times) > self.max_rows:
+            times, values = times[-self.max_rows:], values[:, -self.max_rows:]
+        # The newest stored candle was still forming when fetched, so overlapping rows are rewritten.
+        self._end = self._start + int(np.searchsorted(self.times, times[0]))
+        keep = min(len(self), self.max_rows - len(times))
+        if self._end + len(times) > len(self._times):
+            fresh_times = np.empty_like(self._times)
+            fresh_values = np.empty_like(self._values)
+            fresh_times[:keep] = self._times[self._end - keep:self._end]
+            fresh_values[:, :keep] = self._values[:, self._end - keep:self._end]
+            self._times, self._values = fresh_times, fresh_values
+            self._start, self._end = 0, keep
+        end = self._end + len(times)
+        self._times[self._end:end] = times
+        self._values[:, self._end:end] = values
+        self._start, self._end = end - keep - len(times), end
+
+    def frame(self):
+        """Return the window as a DataFrame over the buffer's own memory."""
+        return ohlc_frame(self.times, self.values)
@@ -0,0 +1,206 @@
+"""Search strategy parameters by backtesting many configurations across every CPU core.
+
+Sentiment is a constant (--sentiment), so the sentiment threshold is fixed rather than swept:
+every threshold on the same side of that constant gives the same signals. Rebalancing is not
+replayed by backtest.py, so rebalance_threshold is not swept either.
+
+Usage:
+    python optimize.py XXBTZUSD XETHZUSD --mode random --samples 2000 --output sweep_results.csv
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from backtest import DEFAULT_PARAMS, compute_signals, simulate, starting_position, load_pair_rules
+from candle_store import CandleStore
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('return', 'end_value', 'max_drawdown', 'trades', 'fees')
+
+SEARCH_SPACE = {
+    'moving_average_periods': [(10, 30), (20, 50), (20, 100), (50, 200)],
+    'rsi_period': [7, 14, 21],
+    'macd_periods': [(8, 17, 9), (12, 26, 9), (5, 35, 5)],
+    'max_risk_per_trade': [0.01, 0.02, 0.05, 0.1],
+}
+
+# Set in each worker process by _attach_candles.
+_worker_closes = None
+_worker_settings = None
+_worker_memory = None
+_worker_indicators = None
+
+
+def grid_configs(space=SEARCH_SPACE):
+    """Yield every combination in the search space."""
+    keys = list(space)
+    for values in itertools.product(*(space[key] for key in keys)):
+        yield dict(zip(keys, values))
+
+
+def random_configs(samples, space=SEARCH_SPACE, seed=None):
+    """Yield `samples` configurations drawn independently from each dimension of the search space."""
+    rng = random.Random(seed)
+    for _ in range(samples):
+        yield {key: rng.choice(values) for key, values in space.items()}
+
+
+def share_candles(closes):
+    """Copy each pair's close prices into one shared memory block; returns (memory, layout)."""
+    total = sum(len(close) for close in closes.values())
+    memory = shared_memory.SharedMemory(create=True, size=max(total, 1) * 8)
+    buffer = np.ndarray((total,), dtype=np.float64, buffer=memory.buf)
+    layout, offset = {}, 0
+    for pair, close in closes.items():
+        buffer[offset:offset + len(close)] = close
+        layout[pair] = (offset, len(close))
+        offset += len(close)
+    return memory, layout
+
+
+def _attach_candles(name, layout, settings):
+    """Worker initializer: map the shared close prices without copying them."""
+    global _worker_closes, _worker_settings, _worker_memory, _worker_indicators
+    try:
+        _worker_memory = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no `track`. Workers share the parent's resource tracker, where the
+        # block is already registered, so attaching leaves the parent to unlink it as usual.
+        _worker_memory = shared_memory.SharedMemory(name=name)
+    total = sum(length for _, length in layout.values())
+    buffer = np.ndarray((total,), dtype=np.float64, buffer=_worker_memory.buf)
+    _worker_closes = {pair: pd.Series(buffer[offset:offset + length], copy=False)
+                      for pair, (offset, length) in layout.items()}
+    _worker_settings = settings
+    _worker_indicators = {pair: {} for pair in layout}
+
+
+def evaluate(config):
+    """Backtest one configuration over every shared pair and return a flat result row."""
+    params = {**DEFAULT_PARAMS, 'sentiment_threshold': _worker_settings['sentiment_threshold'], **config,
+              'fee': _worker_settings['fee'], 'min_trade_size': _worker_settings['min_trade_size']}
+    start_value = end_value = fees = 0.0
+    trades = 0
+    portfolio = None
+    for pair, close in _worker_closes.items():
+        min_order, lot_decimals = _worker_settings['rules'].get(pair, (0.0, 8))
+        buy, sell = compute_signals(close, params, _worker_settings['sentiment'], _worker_indicators[pair])
+        cash, units = starting_position(close, _worker_settings['cash'], _worker_settings['units'])
+        equity, fills = simulate(close, buy, sell, params, cash, units, min_order, lot_decimals)
+        if equity.empty:
+            continue
+        start_value += equity.iloc[0]
+        end_value += equity.iloc[-1]
+        fees += fills['fee'].sum()
+        trades += len(fills)
+        # Align pairs on their most recent candle so the portfolio curve is the sum of equal-length tails.
+        values = equity.to_numpy()
+        portfolio = values if portfolio is None else _add_aligned(portfolio, values)
+    drawdown = float((portfolio / np.maximum.accumulate(portfolio) - 1).min()) if portfolio is not None else 0.0
+    return {
+        **{key: str(value) if isinstance(value, tuple) else value for key, value in config.items()},
+        'return': end_value / start_value - 1 if start_value else 0.0,
+        'end_value': end_value,
+        'max_drawdown': drawdown,
+        'trades': trades,
+        'fees': fees,
+    }
+
+
+def _add_aligned(a, b):
+    length = min(len(a), len(b))
+    return a[-length:] + b[-length:]
+
+
+def sweep(closes, configs, settings, workers=None, chunksize=16):
+    """Evaluate every configuration on a process pool and return the results as a DataFrame."""
+    memory, layout = share_candles(closes)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_candles,
+                                 initargs=(memory.name, layout, settings)) as executor:
+            rows = list(executor.map(evaluate, configs, chunksize=chunksize))
+    finally:
+        memory.close()
+        memory.unlink()
+    return pd.DataFrame(rows).sort_values('return', ascending=False, ignore_index=True)
+
+
+def degenerate(results):
+    """Describe why a sweep's results cannot rank configurations, or return None if they can."""
+    if not results['trades'].any():
+        return "No configuration placed a trade"
+    if len(results) > 1 and (results[list(METRICS)].nunique() <= 1).all():
+        return "Every configuration produced identical results"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep strategy parameters over candles stored in the candle cache.",
+                                     epilog="The sentiment threshold is not swept, as sentiment is constant, and "
+                                            "neither is rebalance_threshold: backtests do not replay rebalancing.")
+    parser.add_argument('pairs', nargs='+', help="Kraken pair names, e.g. XXBTZUSD")
+    parser.add_argument('--db', default='candles.db', help="Candle cache written by the bot")
+    parser.add_argument('--interval', type=int, default=1440, help="Candle interval in minutes")
+    parser.add_argument('--mode', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--samples', type=int, default=1000, help="Configurations to draw in random mode")
+    parser.add_argument('--seed', type=int, help="Random seed for reproducible random searches")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument('--cash', type=float, default=1000.0,
+                        help="Starting base currency per pair; half goes into the asset unless --units is given")
+    parser.add_argument('--units', type=float, help="Starting asset holding per pair (must be positive)")
+    parser.add_argument('--sentiment', type=float, default=0.0, help="Constant news sentiment to assume")
+    parser.add_argument('--sentiment-threshold', type=float, default=DEFAULT_PARAMS['sentiment_threshold'])
+    parser.add_argument('--fee', type=float, default=DEFAULT_PARAMS['fee'])
+    parser.add_argument('--min-trade-size', type=float, default=DEFAULT_PARAMS['min_trade_size'])
+    parser.add_argument('--offline', action='store_true', help="Only use cached ordermin rules from asset_pairs.json")
+    parser.add_argument('--output', default='sweep_results.csv', help="Where to write the results table")
+    args = parser.parse_args()
+
+    if args.units is not None and args.units <= 0:
+        parser.error("--units must be positive: the strategy sizes every order from the current holding")
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = CandleStore(args.db)
+    closes = {}
+    for pair in args.pairs:
+        close = store.history(pair, args.interval)['close'].to_numpy()
+        if len(close):
+            closes[pair] = close
+        else:
+            logger.warning(f"No stored candles for {pair} at interval {args.interval}")
+    if not closes:
+        return
+
+    settings = {
+        'cash': args.cash,
+        'units': args.units,
+        'sentiment': args.sentiment,
+        'sentiment_threshold': args.sentiment_threshold,
+        'fee': args.fee,
+        'min_trade_size': args.min_trade_size,
+        'rules': load_pair_rules(list(closes), offline=args.offline),
+    }
+    configs = list(grid_configs() if args.mode == 'grid' else random_configs(args.samples, seed=args.seed))
+    started = time.monotonic()
+    results = sweep(closes, configs, settings, args.workers)
+    elapsed = time.monotonic() - started
+    results.to_csv(args.output, index=False, float_format='%.6g')
+    logger.info(f"Evaluated {len(configs)} configurations on {len(closes)} pairs in {elapsed:.1f}s; "
+                f"results written to {args.output}")
+    problem = degenerate(results)
+    if problem:
+        logger.error(f"{problem}, so the ranking is arbitrary. Check --units, --cash, --min-trade-size "
+                     f"and the candles stored for these pairs.")
+        sys.exit(1)
+    logger.info(f"Best configuration:\n{results.head(1).T.to_string(header=False)}")
+
+
+if __name__ == "__main__":
+    main()
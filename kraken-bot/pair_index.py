@@ -0,0 +1,99 @@
+import json
+import os
+import time
+import threading
+import logging
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAKER_FEE = Decimal('0.0026')  # Kraken's entry-tier taker fee, for pairs cached without fee tiers
+
+
+class PairIndex:
+    """Kraken asset pair metadata for one quote currency, with O(1) lookups and an on-disk cache."""
+
+    def __init__(self, path='asset_pairs.json', quote='USD', ttl=24 * 3600):
+        self.path = path
+        self.quote = quote
+        self.ttl = ttl
+        self.fetched = 0.0
+        self.pairs = {}
+        self._by_asset = {}
+        self._by_name = {}
+        self._lock = threading.Lock()
+
+    def is_stale(self):
+        """Whether the metadata is missing or older than the refresh TTL."""
+        return not self.pairs or time.time() - self.fetched > self.ttl
+
+    def load(self):
+        """Load the cached index from disk, whatever its age. Returns True if anything was loaded."""
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if cached.get('quote') != self.quote:
+            return False
+        self._build(cached['pairs'], cached['fetched'])
+        return True
+
+    def refresh(self, asset_pairs):
+        """Rebuild the index from a raw Kraken AssetPairs result and persist it."""
+        pairs = {}
+        for pair, info in asset_pairs.items():
+            if info['quote'] not in (self.quote, f'Z{self.quote}'):
+                continue
+            if 'ordermin' not in info:
+                logger.warning(f"Skipping pair {pair} due to missing 'ordermin' information")
+                continue
+            pairs[pair] = {
+                'altname': info['altname'],
+                'wsname': info.get('wsname'),
+                'base': info['base'],
+                'min_order': info['ordermin'],
+                'min_cost': info.get('costmin'),
+                'decimal_places': info['pair_decimals'],
+                'lot_decimals': info['lot_decimals'],
+                # `fees` is [[30-day volume, percent], ...]; the first tier is the highest
+                'taker_fee': str(Decimal(str(info['fees'][0][1])) / 100) if info.get('fees') else None,
+            }
+        self._build(pairs, time.time())
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'quote': self.quote, 'fetched': self.fetched, 'pairs': pairs}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save asset pair cache: {str(e)}")
+
+    def _build(self, pairs, fetched):
+        by_asset, by_name, index = {}, {}, {}
+        for pair, info in pairs.items():
+            index[pair] = {
+                **info,
+                'min_order': Decimal(info['min_order']),
+                'min_cost': Decimal(info['min_cost']) if info.get('min_cost') else None,
+                'taker_fee': Decimal(info['taker_fee']) if info.get('taker_fee') else DEFAULT_TAKER_FEE,
+            }
+            by_name[pair] = by_name[info['altname']] = pair
+            # Balances use Kraken's asset codes (XXBT, XETH, DOT); websocket names use XBT/USD.
+            by_asset[info['base']] = pair
+            if info.get('wsname'):
+                by_name[info['wsname']] = pair
+                by_asset.setdefault(info['wsname'].split('/')[0], pair)
+        with self._lock:
+            self.pairs, self._by_asset, self._by_name, self.fetched = index, by_asset, by_name, fetched
+
+    def pair_for_asset(self, asset):
+        """Return the pair that trades `asset` against the quote currency, or None."""
+        return self._by_asset.get(asset)
+
+    def resolve(self, name):
+        """Return the canonical pair for a pair name, altname or websocket name, or None."""
+        return self._by_name.get(name)
+
+    def is_quote_asset(self, asset):
+        """Whether a balance entry is the quote currency itself."""
+        return asset in (self.quote, f'Z{self.quote}')
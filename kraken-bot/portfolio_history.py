@@ -0,0 +1,120 @@
+import time
+import sqlite3
+import threading
+from datetime import datetime
+import numpy as np
+
+# name: (bucket seconds, capacity). Buckets keep the last value seen in them.
+RESOLUTIONS = {
+    'raw': (None, 2880),  # Every snapshot; 10 days at the default 5 minute interval
+    '5m': (300, 2016),    # 7 days
+    '1h': (3600, 2160),   # 90 days
+}
+
+
+class SeriesBuffer:
+    """The newest `capacity` (time, value) points, held in preallocated arrays.
+
+    Like CandleBuffer, storage is twice `capacity` long and the window slides forward,
+    so appends and evictions are O(1) amortised. With a `bucket`, points are snapped to
+    the bucket start and a later point in the same bucket replaces the earlier one.
+    """
+
+    def __init__(self, capacity, bucket=None):
+        self.capacity = capacity
+        self.bucket = bucket
+        self._times = np.empty(2 * capacity, dtype=np.float64)
+        self._values = np.empty(2 * capacity, dtype=np.float64)
+        self._start = self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def times(self):
+        return self._times[self._start:self._end]
+
+    @property
+    def values(self):
+        return self._values[self._start:self._end]
+
+    def append(self, timestamp, value):
+        if self.bucket:
+            timestamp = timestamp // self.bucket * self.bucket
+            if len(self) and self._times[self._end - 1] == timestamp:
+                self._values[self._end - 1] = value
+                return
+        if self._end == len(self._times):
+            keep = self.capacity - 1
+            self._times[:keep] = self._times[self._end - keep:self._end]
+            self._values[:keep] = self._values[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        self._times[self._end] = timestamp
+        self._values[self._end] = value
+        self._end += 1
+        if len(self) > self.capacity:
+            self._start += 1
+
+    def since(self, timestamp):
+        """Return the (times, values) views for points strictly after `timestamp`."""
+        index = int(np.searchsorted(self.times, timestamp, side='right'))
+        return self.times[index:], self.values[index:]
+
+
+class PortfolioHistory:
+    """Portfolio value over time at raw, 5 minute and hourly resolution, persisted in SQLite.
+
+    Every series has a fixed capacity, so memory and response sizes stay bounded however
+    long the bot runs. Points older than the coarsest series covers are pruned from disk.
+    """
+
+    def __init__(self, path='portfolio_history.db', resolutions=RESOLUTIONS):
+        """Open (or create) the history database and load it back into memory."""
+        self._lock = threading.Lock()
+        self._series = {name: SeriesBuffer(capacity, bucket) for name, (bucket, capacity) in resolutions.items()}
+        self.retention = max((bucket or 0) * capacity for bucket, capacity in resolutions.values())
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS portfolio_history (time REAL PRIMARY KEY, value REAL) WITHOUT ROWID"
+            )
+        rows = self._conn.execute(
+            "SELECT time, value FROM portfolio_history WHERE time >= ? ORDER BY time",
+            (time.time() - self.retention,)
+        ).fetchall()
+        for timestamp, value in rows:
+            for series in self._series.values():
+                series.append(timestamp, value)
+
+    def record(self, value, timestamp=None):
+        """Add a portfolio value; points not newer than the latest one are ignored."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            raw = self._series['raw']
+            if len(raw) and timestamp <= raw.times[-1]:
+                return
+            for series in self._series.values():
+                series.append(timestamp, value)
+            with self._conn:
+                self._conn.execute("INSERT INTO portfolio_history VALUES (?, ?)", (timestamp, value))
+                self._conn.execute("DELETE FROM portfolio_history WHERE time < ?", (timestamp - self.retention,))
+
+    def points(self, resolution='raw', since=None):
+        """Return [{'timestamp', 'value'}] for one resolution, optionally only after `since`."""
+        with self._lock:
+            times, values = self._series[resolution].since(-np.inf if since is None else since)
+            times, values = times.tolist(), values.tolist()
+        return [{'timestamp': datetime.fromtimestamp(t).isoformat(), 'value': v} for t, v in zip(times, values)]
+
+    def window(self, hours=24, since=None):
+        """Return the last `hours` of history at the finest resolution that still covers them.
+
+        `since` (unix time) limits the result to points after it, so clients can fetch
+        only what they have not seen yet.
+        """
+        start = time.time() - hours * 3600
+        with self._lock:
+            # A series that has never evicted anything still holds all the history there is
+            resolution = next((name for name, series in self._series.items()
+                               if len(series) < series.capacity or series.times[0] <= start), '1h')
+        return self.points(resolution, start if since is None else max(start, since))
@@ -0,0 +1,194 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every thread that talks to one API."""
+
+    def __init__(self, capacity, refill_rate):
+        """Allow bursts of `capacity` calls, refilled at `refill_rate` tokens per second."""
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+    def try_acquire(self, cost=1):
+        """Take `cost` tokens if they are available right now."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= cost:
+                self._tokens -= cost
+                return True
+            return False
+
+    def wait_time(self, cost=1):
+        """Estimate how many seconds until `cost` tokens are available."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (cost - self._tokens) / self.refill_rate)
+
+    def acquire(self, cost=1):
+        """Block until `cost` tokens are available, then take them."""
+        while not self.try_acquire(cost):
+            time.sleep(self.wait_time(cost))
+
+
+# Kraken charges most private endpoints 1 point and history queries 2; order entry is
+# limited separately by the matching engine, so it is tracked in its own pool.
+ENDPOINT_COSTS = {
+    'Ledgers': 2,
+    'QueryLedgers': 2,
+    'TradesHistory': 2,
+    'QueryTrades': 2,
+}
+ORDER_ENDPOINTS = {'AddOrder', 'AddOrderBatch', 'EditOrder', 'CancelOrder', 'CancelAll', 'CancelOrderBatch'}
+
+# Lanes in priority order: orders first, then the trading loop, then dashboard reads.
+LANES = ('order', 'trading', 'dashboard')
+
+_current_lane = contextvars.ContextVar('kraken_rate_limit_lane', default='trading')
+
+
+class KrakenRateLimiter:
+    """Model Kraken's decaying API counters and hand out capacity by priority lane.
+
+    Each pool behaves like Kraken's counter: calls add their cost, the counter decays at a
+    fixed rate, and a call may proceed while the counter stays under the maximum. Dashboard
+    reads cannot use the last `reserve` points of a pool, and a lane never overtakes a
+    higher-priority lane that is already waiting on the same pool.
+    """
+
+    def __init__(self, counter_max=15, decay_rate=0.33, public_max=2, public_decay_rate=1.0,
+                 order_max=60, order_decay_rate=1.0, reserve=2, costs=None):
+        """Defaults match a Kraken Starter tier account.
+
+        Public endpoints have no published counter; Kraken asks REST clients to stay around
+        one call per second and throttles the IP on bursts, so they get a burst of 2.
+        """
+        self.pools = {
+            'private': {'max': counter_max, 'decay': decay_rate},
+            'public': {'max': public_max, 'decay': public_decay_rate},
+            'order': {'max': order_max, 'decay': order_decay_rate},
+        }
+        now = time.monotonic()
+        for pool in self.pools.values():
+            pool.update(level=0.0, updated=now, waiting={lane: 0 for lane in LANES})
+        self.reserve = reserve
+        self.costs = dict(ENDPOINT_COSTS if costs is None else costs)
+        self._condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def lane(self, name):
+        """Run the enclosed calls (and anything that copies this context) in the given lane."""
+        if name not in LANES:
+            raise ValueError(f"Unknown rate limit lane {name!r}. Use one of {LANES}.")
+        token = _current_lane.set(name)
+        try:
+            yield
+        finally:
+            _current_lane.reset(token)
+
+    def pool_for(self, method, endpoint):
+        """Return the name of the counter a call is charged against."""
+        if endpoint in ORDER_ENDPOINTS:
+            return 'order'
+        return 'public' if method == 'public' else 'private'
+
+    def cost(self, endpoint):
+        """Return how many counter points a call to `endpoint` costs."""
+        return self.costs.get(endpoint, 1)
+
+    def try_acquire(self, method, endpoint, lane=None):
+        """Charge the call if it can proceed right now; never blocks."""
+        lane = self._resolve_lane(endpoint, lane)
+        with self._condition:
+            return self._try_charge(self.pool_for(method, endpoint), self.cost(endpoint), lane)
+
+    def wait_time(self, method, endpoint, lane=None):
+        """Estimate how long a call would wait for counter headroom, ignoring queued callers."""
+        lane = self._resolve_lane(endpoint, lane)
+        with self._condition:
+            pool = self._decay(self.pool_for(method, endpoint))
+            return self._headroom_wait(pool, self.cost(endpoint), lane)
+
+    def acquire(self, method, endpoint, lane=None):
+        """Block until the call fits under the counter, then charge it. Returns seconds waited."""
+        lane = self._resolve_lane(endpoint, lane)
+        name, cost = self.pool_for(method, endpoint), self.cost(endpoint)
+        started = time.monotonic()
+        with self._condition:
+            if self._try_charge(name, cost, lane):
+                return 0.0
+            self.pools[name]['waiting'][lane] += 1
+            try:
+                while not self._try_charge(name, cost, lane, queued=True):
+                    pool = self.pools[name]
+                    self._condition.wait(max(self._headroom_wait(pool, cost, lane), 0.01))
+            finally:
+                self.pools[name]['waiting'][lane] -= 1
+                self._condition.notify_all()
+        return time.monotonic() - started
+
+    async def acquire_async(self, method, endpoint, lane=None):
+        """Asyncio-friendly `acquire` that sleeps on the event loop instead of blocking it."""
+        lane = self._resolve_lane(endpoint, lane)
+        name, cost = self.pool_for(method, endpoint), self.cost(endpoint)
+        started = time.monotonic()
+        with self._condition:
+            if self._try_charge(name, cost, lane):
+                return 0.0
+            self.pools[name]['waiting'][lane] += 1
+        try:
+            while True:
+                with self._condition:
+                    if self._try_charge(name, cost, lane, queued=True):
+                        return time.monotonic() - started
+                    delay = self._headroom_wait(self.pools[name], cost, lane)
+                await asyncio.sleep(max(delay, 0.01))
+        finally:
+            with self._condition:
+                self.pools[name]['waiting'][lane] -= 1
+                self._condition.notify_all()
+
+    def _resolve_lane(self, endpoint, lane):
+        if endpoint in ORDER_ENDPOINTS:
+            return 'order'
+        return lane or _current_lane.get()
+
+    def _decay(self, name):
+        pool = self.pools[name]
+        now = time.monotonic()
+        pool['level'] = max(0.0, pool['level'] - (now - pool['updated']) * pool['decay'])
+        pool['updated'] = now
+        return pool
+
+    def _limit(self, pool, lane):
+        if lane != 'dashboard':
+            return pool['max']
+        # A pool smaller than the reserve still lets the dashboard make one call at a time
+        return pool['max'] - min(self.reserve, max(pool['max'] - 1, 0))
+
+    def _headroom_wait(self, pool, cost, lane):
+        return max(0.0, (pool['level'] + cost - self._limit(pool, lane)) / pool['decay'])
+
+    def _try_charge(self, name, cost, lane, queued=False):
+        pool = self._decay(name)
+        priority = LANES.index(lane)
+        if any(pool['waiting'][ahead] for ahead in LANES[:priority]):
+            return False
+        if not queued and pool['waiting'][lane]:
+            # Keep FIFO-ish fairness within a lane: newcomers don't jump queued callers.
+            return False
+        if pool['level'] + cost > self._limit(pool, lane):
+            return False
+        pool['level'] += cost
+        return True
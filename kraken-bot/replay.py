@@ -0,0 +1,262 @@
+"""Record and replay Kraken and GNews responses so the bot can run without the network.
+
+Fixtures are plain JSON:
+    {"kraken": {"AssetPairs": <response>, "Ticker": <response>, "Balance": <response>,
+                "TradesHistory": <response>, "OHLC": {<pair>: <response>}},
+     "news": {<asset>: <response>}}
+"""
+import json
+import random
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+import kraken_api
+import requests
+from rate_limiter import ORDER_ENDPOINTS
+
+NEWS_PHRASES = [
+    "rallies as institutional demand grows", "slides after exchange outage", "holds steady ahead of rate decision",
+    "surges on record trading volume", "drops amid regulatory uncertainty", "gains after upgrade ships on schedule",
+    "falls as traders take profits", "climbs on strong adoption figures", "wobbles on mixed economic data",
+    "jumps after major partnership announcement",
+]
+
+
+def empty_fixtures():
+    return {'kraken': {'OHLC': {}}, 'news': {}}
+
+
+def load_fixtures(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_fixtures(fixtures, path):
+    with open(path, 'w') as f:
+        json.dump(fixtures, f)
+
+
+def synthetic_fixtures(pairs, candles=720, interval=1440, articles=10, trades=20, seed=0):
+    """Generate a plausible account with `pairs` USD pairs, random-walk candles, trades and news."""
+    rng = random.Random(seed)
+    now = int(time.time()) // (interval * 60) * (interval * 60)
+    asset_pairs, tickers, ohlc, news, fills = {}, {}, {}, {}, {}
+    balance = {'ZUSD': '100000.0000'}
+    for i in range(pairs):
+        base = f"A{i:03d}"
+        pair = f"{base}USD"
+        asset_pairs[pair] = {
+            'altname': pair, 'wsname': f"{base}/USD", 'base': base, 'quote': 'ZUSD',
+            'ordermin': '0.01', 'costmin': '0.5', 'pair_decimals': 4, 'lot_decimals': 8,
+            'fees': [[0, 0.26], [50000, 0.24]],
+        }
+        price, rows = rng.uniform(1, 1000), []
+        for j in range(candles):
+            open_ = price
+            price *= 1 + rng.gauss(0, 0.02)
+            rows.append([now - (candles - 1 - j) * interval * 60, f"{open_:.4f}", f"{max(open_, price) * 1.005:.4f}",
+                         f"{min(open_, price) * 0.995:.4f}", f"{price:.4f}", f"{(open_ + price) / 2:.4f}",
+                         f"{rng.uniform(10, 1000):.8f}", rng.randint(10, 500)])
+        ohlc[pair] = {'error': [], 'result': {pair: rows, 'last': rows[-2][0] if len(rows) > 1 else rows[-1][0]}}
+        close = rows[-1][4]
+        for k in range(trades):
+            row = rows[rng.randrange(len(rows))]
+            volume = rng.uniform(0.1, 5)
+            cost = volume * float(row[4])
+            fills[f"T{i:03d}-{k:04d}"] = {
+                'ordertxid': f"O{i:03d}-{k:04d}", 'pair': pair, 'time': row[0] + rng.uniform(0, interval * 60),
+                'type': rng.choice(['buy', 'sell']), 'ordertype': 'market', 'price': row[4],
+                'cost': f"{cost:.5f}", 'fee': f"{cost * 0.0026:.5f}", 'vol': f"{volume:.8f}",
+            }
+        tickers[pair] = {'a': [close, '1', '1.000'], 'b': [close, '1', '1.000'], 'c': [close, '0.1']}
+        balance[base] = f"{rng.uniform(1, 100):.8f}"
+        published = datetime.fromtimestamp(now, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        news[base] = {'articles': [{
+            'title': f"{base} {rng.choice(NEWS_PHRASES)}",
+            'description': f"Analysts say {base} {rng.choice(NEWS_PHRASES)} while the market {rng.choice(NEWS_PHRASES)}.",
+            'url': f"https://news.example/{base}/{k}",
+            'publishedAt': published,
+        } for k in range(articles)]}
+    return {
+        'kraken': {
+            'AssetPairs': {'error': [], 'result': asset_pairs},
+            'Ticker': {'error': [], 'result': tickers},
+            'Balance': {'error': [], 'result': balance},
+            'TradesHistory': {'error': [], 'result': {'trades': fills, 'count': len(fills)}},
+            'OHLC': ohlc,
+        },
+        'news': news,
+    }
+
+
+def limit_pairs(fixtures, count):
+    """Return a copy of recorded fixtures that only knows about the first `count` pairs with candles."""
+    kraken = fixtures['kraken']
+    keep = list(kraken['OHLC'])[:count]
+    limited = json.loads(json.dumps(fixtures))
+    pairs = limited['kraken']['AssetPairs']['result']
+    limited['kraken']['AssetPairs']['result'] = {pair: pairs[pair] for pair in keep if pair in pairs}
+    limited['kraken']['OHLC'] = {pair: kraken['OHLC'][pair] for pair in keep}
+    return limited
+
+
+def trades_page(trades, data):
+    """Page {txid: trade} like TradesHistory: newest first, 50 per page, honouring `start`, `end` and `ofs`."""
+    start, end = data.get('start'), data.get('end')
+    matching = sorted(((txid, trade) for txid, trade in trades.items()
+                       if (start is None or trade['time'] > start) and (end is None or trade['time'] <= end)),
+                      key=lambda item: item[1]['time'], reverse=True)
+    offset = int(data.get('ofs', 0))
+    return {'error': [], 'result': {'trades': dict(matching[offset:offset + 50]), 'count': len(matching)}}
+
+
+class _NewsResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def _news_asset(url):
+    return parse_qs(urlparse(url).query).get('q', [''])[0]
+
+
+class ReplayKraken:
+    """Stand-in for krakenex.API that answers from fixtures, optionally after a synthetic delay."""
+
+    def __init__(self, fixtures, latency=0.0, calls=None):
+        self.fixtures = fixtures['kraken']
+        self.latency = latency
+        self.calls = Counter() if calls is None else calls
+        self._txids = 0
+        self._lock = threading.Lock()
+
+    def load_key(self, path):
+        pass
+
+    def query_public(self, method, data=None, timeout=None):
+        return self._answer(method, data or {})
+
+    def query_private(self, method, data=None, timeout=None):
+        return self._answer(method, data or {})
+
+    def _answer(self, method, data):
+        with self._lock:
+            self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if method == 'Ticker':
+            tickers = self.fixtures['Ticker']['result']
+            return {'error': [], 'result': {pair: tickers[pair] for pair in data['pair'].split(',') if pair in tickers}}
+        if method == 'OHLC':
+            response = self.fixtures['OHLC'].get(data['pair'])
+            if response is None:
+                return {'error': ['EQuery:Unknown asset pair'], 'result': {}}
+            rows = response['result'][data['pair']]
+            if data.get('since'):
+                rows = [row for row in rows if row[0] >= data['since']]
+            return {'error': [], 'result': {data['pair']: rows, 'last': response['result']['last']}}
+        if method == 'TradesHistory' and 'TradesHistory' in self.fixtures:
+            return trades_page(self.fixtures['TradesHistory']['result']['trades'], data)
+        if method == 'AddOrderBatch':
+            count = len(data['orders'])
+            with self._lock:
+                self._txids += count
+                return {'error': [], 'result': {'orders': [{'txid': f"REPLAY-{self._txids - count + i + 1}"}
+                                                           for i in range(count)]}}
+        if method in ORDER_ENDPOINTS:
+            with self._lock:
+                self._txids += 1
+                return {'error': [], 'result': {'txid': [f"REPLAY-{self._txids}"]}}
+        if method in self.fixtures:
+            return self.fixtures[method]
+        return {'error': [f"EGeneral:No fixture for {method}"], 'result': {}}
+
+
+class ReplayNews:
+    """Stand-in for requests.get that returns recorded GNews search results by asset."""
+
+    def __init__(self, fixtures, latency=0.0, calls=None):
+        self.news = fixtures['news']
+        self.latency = latency
+        self.calls = Counter() if calls is None else calls
+
+    def __call__(self, url, *args, **kwargs):
+        self.calls['gnews'] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return _NewsResponse(self.news.get(_news_asset(url), {'articles': []}))
+
+
+class RecordingKraken:
+    """Wrap a real kraken_api.KrakenAPI and keep every read-only response as a fixture. Refuses to trade."""
+
+    def __init__(self, fixtures, api):
+        self.api = api
+        self.fixtures = fixtures['kraken']
+
+    def load_key(self, path):
+        self.api.load_key(path)
+
+    def query_public(self, method, data=None, timeout=None):
+        return self._record(method, data, self.api.query_public(method, data, timeout))
+
+    def query_private(self, method, data=None, timeout=None):
+        if method in ORDER_ENDPOINTS:
+            raise RuntimeError(f"Refusing to call {method} while recording fixtures")
+        return self._record(method, data, self.api.query_private(method, data, timeout))
+
+    def _record(self, method, data, response):
+        if response.get('error'):
+            return response
+        if method == 'OHLC':
+            self.fixtures['OHLC'][data['pair']] = response
+        elif method == 'Ticker' and 'Ticker' in self.fixtures:
+            self.fixtures['Ticker']['result'].update(response['result'])
+        elif method == 'TradesHistory' and 'TradesHistory' in self.fixtures:
+            self.fixtures['TradesHistory']['result']['trades'].update(response['result']['trades'])
+            self.fixtures['TradesHistory']['result']['count'] = response['result']['count']
+        else:
+            self.fixtures[method] = response
+        return response
+
+
+class RecordingNews:
+    """Wrap requests.get and keep each GNews search result, keyed by asset (the API token is not stored)."""
+
+    def __init__(self, fixtures, get):
+        self.news = fixtures['news']
+        self.get = get
+
+    def __call__(self, url, *args, **kwargs):
+        response = self.get(url, *args, **kwargs)
+        self.news[_news_asset(url)] = response.json()
+        return response
+
+
+@contextmanager
+def replaying(fixtures, latency=0.0, news_latency=0.0):
+    """Route every kraken_api.KrakenAPI and requests.get made inside the block to the fixtures.
+
+    Yields a Counter of calls issued per Kraken endpoint (and 'gnews').
+    """
+    calls = Counter()
+    news = ReplayNews(fixtures, news_latency, calls)
+    with mock.patch.object(kraken_api, 'KrakenAPI', lambda *args, **kwargs: ReplayKraken(fixtures, latency, calls)), \
+            mock.patch.object(requests, 'get', news):
+        yield calls
+
+
+@contextmanager
+def recording(fixtures):
+    """Let calls inside the block reach Kraken and GNews while copying their responses into `fixtures`."""
+    get, api = requests.get, kraken_api.KrakenAPI
+    with mock.patch.object(kraken_api, 'KrakenAPI',
+                           lambda *args, **kwargs: RecordingKraken(fixtures, api(*args, **kwargs))), \
+            mock.patch.object(requests, 'get', RecordingNews(fixtures, get)):
+        yield fixtures
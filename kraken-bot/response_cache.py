@@ -0,0 +1,70 @@
+import threading
+import time
+from metrics import CACHE_LOOKUPS
+
+
+class _Flight:
+    """A fetch in progress that later callers for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    """TTL cache with single-flight loading, so concurrent identical requests share one upstream fetch."""
+
+    def __init__(self, name='response'):
+        self.name = name  # Label for the cache's hit/miss metrics
+        self._entries = {}
+        self._flights = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, ttl, loader):
+        """Return the cached value for `key`, calling `loader` at most once across threads when it is stale."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                self.hits += 1
+                CACHE_LOOKUPS.inc(cache=self.name, result='hit')
+                return entry[0]
+            self.misses += 1
+            CACHE_LOOKUPS.inc(cache=self.name, result='miss')
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                generation = self._generation
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                # A fetch that began before an invalidation may already be stale, so don't keep it.
+                if flight.error is None and generation == self._generation:
+                    self._entries[key] = (flight.value, time.monotonic() + ttl)
+            flight.done.set()
+
+    def invalidate(self, key=None):
+        """Drop one entry, or every entry when no key is given."""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -0,0 +1,182 @@
+import math
+import time
+import threading
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from metrics import JOB_SECONDS, JOB_SKIPPED, JOB_LATE
+
+logger = logging.getLogger(__name__)
+
+
+def next_boundary(now, period, offset=0):
+    """Return the first time after `now` that is a whole multiple of `period` seconds plus `offset`."""
+    return (math.floor((now - offset) / period) + 1) * period + offset
+
+
+def _value(setting):
+    return setting() if callable(setting) else setting
+
+
+class Job:
+    """A recurring task with its own cadence and run bookkeeping."""
+
+    def __init__(self, name, func, interval, align=None, offset=0):
+        self.name = name
+        self.func = func
+        self.interval = interval  # Seconds, or a callable so setting changes apply on reschedule
+        self.align = align  # Optional second boundary, e.g. the candle length, that also triggers a run
+        self.offset = offset  # Seconds after each boundary, e.g. to let the closed candle be published
+        self.next_run = None
+        self.running = False
+        self.runs = 0
+        self.skipped = 0
+        self.late = 0
+        self.last_started = None
+        self.last_duration = None
+
+    def schedule(self, now):
+        """Set the next run to the earliest interval or alignment boundary after `now`."""
+        next_run = next_boundary(now, _value(self.interval), self.offset)
+        if self.align:
+            next_run = min(next_run, next_boundary(now, _value(self.align), self.offset))
+        self.next_run = next_run
+
+    def status(self):
+        return {
+            'interval': _value(self.interval),
+            'running': self.running,
+            'next_run': self.next_run,
+            'last_started': self.last_started,
+            'last_duration': self.last_duration,
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'late': self.late,
+        }
+
+
+class Scheduler:
+    """Run jobs on wall-clock aligned cadences from one thread, with waits that stop or reschedule at once."""
+
+    def __init__(self, max_workers=4, late_after=1.0):
+        self.jobs = {}
+        self.max_workers = max_workers
+        self.late_after = late_after  # Report runs that start more than this many seconds after their deadline
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._executor = None
+
+    def add(self, name, func, interval, align=None, offset=0):
+        """Register (or replace) a job; it is first run at its next boundary, not immediately."""
+        with self._cond:
+            job = self.jobs.get(name)
+            if job:  # Keep the existing job so an in-progress run still clears its `running` flag
+                job.func, job.interval, job.align, job.offset = func, interval, align, offset
+            else:
+                job = Job(name, func, interval, align, offset)
+            if self.is_running():
+                job.schedule(time.time())
+            self.jobs[name] = job
+            self._cond.notify_all()
+        return job
+
+    def remove(self, name):
+        with self._cond:
+            self.jobs.pop(name, None)
+            self._cond.notify_all()
+
+    def run_now(self, name):
+        """Move a job's next run to now, unless it is already running."""
+        with self._cond:
+            job = self.jobs.get(name)
+            if job and not job.running:
+                job.next_run = time.time()
+                self._cond.notify_all()
+
+    def reschedule(self):
+        """Recompute every job's next run, e.g. after an interval setting changed."""
+        with self._cond:
+            now = time.time()
+            for job in self.jobs.values():
+                job.schedule(now)
+            self._cond.notify_all()
+
+    def start(self):
+        """Start the scheduling thread; does nothing if it is already running."""
+        with self._cond:
+            if self.is_running():
+                return
+            self._stopping = False
+            self.reschedule()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+            self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self, wait=False):
+        """Stop scheduling new runs. Runs already in progress finish in the background unless `wait`."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread, executor = self._thread, self._executor
+        if thread and thread is not threading.current_thread():
+            thread.join()
+        if executor:
+            executor.shutdown(wait=wait)
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stopping
+
+    def status(self):
+        with self._cond:
+            return {name: job.status() for name, job in self.jobs.items()}
+
+    def _loop(self):
+        with self._cond:
+            while not self._stopping:
+                now = time.time()
+                for job in list(self.jobs.values()):
+                    if job.next_run is None:
+                        job.schedule(now)
+                    elif job.next_run <= now:
+                        self._dispatch(job, now)
+                wake = min((job.next_run for job in self.jobs.values()), default=None)
+                self._cond.wait(None if wake is None else max(wake - time.time(), 0))
+
+    def _dispatch(self, job, now):
+        due = job.next_run
+        job.schedule(now)
+        due_at = datetime.fromtimestamp(due).strftime('%H:%M:%S')
+        if job.running:
+            # Never queue a second copy behind a slow run; the next boundary gets a fresh one instead.
+            job.skipped += 1
+            JOB_SKIPPED.inc(job=job.name)
+            logger.warning(f"Skipped {job.name} run due at {due_at}: previous run still in progress")
+            return
+        if now - due > self.late_after:
+            job.late += 1
+            JOB_LATE.inc(job=job.name)
+            logger.warning(f"{job.name} run due at {due_at} started {now - due:.1f}s late")
+        job.running = True
+        job.last_started = now
+        self._executor.submit(self._run, job)
+
+    def _run(self, job):
+        started = time.monotonic()
+        try:
+            job.func()
+        except Exception as e:
+            logger.error(f"Error in scheduled job {job.name}: {str(e)}")
+        finally:
+            duration = time.monotonic() - started
+            with self._cond:
+                job.running = False
+                job.runs += 1
+                job.last_duration = duration
+            JOB_SECONDS.observe(duration, job=job.name)
+            if duration > _value(job.interval):
+                logger.warning(f"{job.name} took {duration:.1f}s, longer than its {_value(job.interval)}s interval")
@@ -0,0 +1,35 @@
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Checked before NLTK's default locations; the lexicon is downloaded here if it is not found anywhere.
+NLTK_DATA_DIR = os.getenv('NLTK_DATA', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data'))
+VADER_LEXICON = 'sentiment/vader_lexicon.zip'
+
+_analyzer = None
+_lock = threading.Lock()
+
+
+def get_analyzer():
+    """Return the process-wide VADER analyzer, importing NLTK and loading the lexicon on first use.
+
+    The lexicon is read from a local NLTK data directory. Only if it is missing from all of
+    them is it downloaded, once, so later starts never touch the network.
+    """
+    global _analyzer
+    with _lock:
+        if _analyzer is None:
+            import nltk
+            from nltk.sentiment import SentimentIntensityAnalyzer
+            if NLTK_DATA_DIR not in nltk.data.path:
+                nltk.data.path.insert(0, NLTK_DATA_DIR)
+            try:
+                nltk.data.find(VADER_LEXICON)
+            except LookupError:
+                logger.info(f"VADER lexicon not found locally, downloading it to {NLTK_DATA_DIR}")
+                if not nltk.download('vader_lexicon', download_dir=NLTK_DATA_DIR, quiet=True):
+                    raise LookupError(f"VADER lexicon is not installed and could not be downloaded to {NLTK_DATA_DIR}")
+            _analyzer = SentimentIntensityAnalyzer()
+        return _analyzer
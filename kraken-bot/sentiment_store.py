@@ -0,0 +1,83 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+
+def article_key(article):
+    """Identify an article by its URL, or by a hash of its text when it has none."""
+    if article.get('url'):
+        return article['url']
+    text = f"{article.get('title')} {article.get('description')}"
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def published_time(article, default):
+    """Return an article's publication time as a unix timestamp."""
+    try:
+        return datetime.fromisoformat(article['publishedAt'].replace('Z', '+00:00')).timestamp()
+    except (KeyError, AttributeError, ValueError):
+        return default
+
+
+class SentimentStore:
+    """Persist per-article sentiment scores so each news article is scored only once."""
+
+    def __init__(self, path='sentiment.db'):
+        """Open (or create) the SQLite sentiment database at the given path."""
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Worker processes score news into the same file
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS articles (key TEXT PRIMARY KEY, published REAL, score REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS asset_articles (asset TEXT, key TEXT, PRIMARY KEY (asset, key))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS refreshes (asset TEXT PRIMARY KEY, refreshed REAL)"
+            )
+
+    def is_fresh(self, asset, ttl):
+        """Whether the asset's news was fetched less than `ttl` seconds ago."""
+        with self._lock:
+            row = self._conn.execute("SELECT refreshed FROM refreshes WHERE asset = ?", (asset,)).fetchone()
+        return row is not None and time.time() - row[0] < ttl
+
+    def record(self, asset, articles, score):
+        """Store a fresh batch of articles for an asset, calling `score(text)` only for unseen ones."""
+        now = time.time()
+        keyed = {article_key(article): article for article in articles}
+        with self._lock:
+            placeholders = ','.join('?' * len(keyed))
+            known = {row[0] for row in self._conn.execute(
+                f"SELECT key FROM articles WHERE key IN ({placeholders})", list(keyed)
+            )} if keyed else set()
+            new = [(key, published_time(article, now), score(f"{article['title']} {article['description']}"))
+                   for key, article in keyed.items() if key not in known]
+            with self._conn:
+                self._conn.executemany("INSERT OR IGNORE INTO articles VALUES (?, ?, ?)", new)
+                self._conn.executemany("INSERT OR IGNORE INTO asset_articles VALUES (?, ?)",
+                                       ((asset, key) for key in keyed))
+                self._conn.execute("INSERT OR REPLACE INTO refreshes VALUES (?, ?)", (asset, now))
+        return len(new)
+
+    def mark_refreshed(self, asset):
+        """Record a fetch attempt so a failing news source isn't retried before the TTL."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO refreshes VALUES (?, ?)", (asset, time.time()))
+
+    def aggregate(self, asset, half_life, window):
+        """Return the time-decay weighted mean score of the asset's articles from the last `window` seconds."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT a.published, a.score FROM articles a JOIN asset_articles aa ON aa.key = a.key "
+                "WHERE aa.asset = ? AND a.published >= ?", (asset, now - window)
+            ).fetchall()
+        if not rows:
+            return 0.0
+        weights = [0.5 ** (max(now - published, 0) / half_life) for published, _ in rows]
+        return sum(weight * score for weight, (_, score) in zip(weights, rows)) / sum(weights)
@@ -0,0 +1,322 @@
+"""An in-process Kraken exchange and news feed for load and latency testing without real money.
+
+SimulatedKraken answers AssetPairs, Ticker, OHLC, Balance, AddOrder, AddOrderBatch and
+TradesHistory from fixtures in replay.py's format (recorded or synthetic). Each pair's
+market replays its candles: it starts part way through the series and moves forward one
+candle every `seconds_per_candle`. A small matching engine fills market orders at the
+quoted bid/ask, and fills resting limit orders when a later candle trades through their
+price. Pass it to KrakenBot as `exchange`, and FakeNews as `news_source`.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from decimal import Decimal
+import requests
+from rate_limiter import ENDPOINT_COSTS, ORDER_ENDPOINTS
+from replay import NEWS_PHRASES, trades_page
+
+PUBLIC_ENDPOINTS = {'AssetPairs', 'Ticker', 'OHLC'}
+OHLC_LIMIT = 720  # Kraken returns at most this many candles per OHLC call
+
+
+class _Picklable:
+    """Pickles without the instance's lock, so a shard worker started with spawn gets its own copy."""
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class RateCounter(_Picklable):
+    """Kraken-style decaying call counter; a call that would push it past `max` is refused."""
+
+    def __init__(self, max, decay):
+        self.max = max
+        self.decay = decay
+        self.level = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def charge(self, cost=1):
+        """Add `cost` if it fits under the maximum; returns whether the call is allowed."""
+        with self._lock:
+            now = time.monotonic()
+            self.level = max(0.0, self.level - (now - self._updated) * self.decay)
+            self._updated = now
+            if self.level + cost > self.max:
+                return False
+            self.level += cost
+            return True
+
+
+class SimulatedKraken(_Picklable):
+    """Stand-in for krakenex.API backed by replayed candles and a simple matching engine.
+
+    `latency` (plus up to `jitter`) seconds are added to every call. `error_rate` and
+    `timeout_rate` inject EService errors and request timeouts. With `rate_limits`, calls
+    are charged against counters matching a Starter tier account, and calls over the limit
+    get Kraken's "EAPI:Rate limit exceeded". With `seconds_per_candle=None` the market only
+    moves when `advance` is called.
+    """
+
+    def __init__(self, fixtures, latency=0.0, jitter=0.0, error_rate=0.0, timeout_rate=0.0, rate_limits=True,
+                 seconds_per_candle=1.0, start=0.5, spread=Decimal('0.001'), fee=Decimal('0.0026'), seed=0):
+        kraken = fixtures['kraken']
+        self.asset_pairs = kraken['AssetPairs']['result']
+        self.candles = {pair: response['result'][pair] for pair, response in kraken['OHLC'].items()
+                        if pair in self.asset_pairs}
+        self.balance = Counter({asset: Decimal(amount) for asset, amount in kraken['Balance']['result'].items()})
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.seconds_per_candle = seconds_per_candle
+        self.spread = spread
+        self.fee = fee
+        self.counters = {
+            'public': RateCounter(15, 1.0),
+            'private': RateCounter(15, 0.33),
+            'order': RateCounter(60, 1.0),
+        } if rate_limits else {}
+        self.calls = Counter()
+        self.outcomes = Counter()  # rate_limited, injected_error, timeout, rejected, filled, resting
+        self.trades = {}
+        self.open_orders = {}
+        self._start = {pair: int(len(rows) * start) for pair, rows in self.candles.items()}
+        self._started = time.monotonic()
+        self._advanced = 0
+        self._txids = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def load_key(self, path):
+        pass
+
+    def query_public(self, method, data=None, timeout=None):
+        return self._call(method, data or {})
+
+    def query_private(self, method, data=None, timeout=None):
+        return self._call(method, data or {})
+
+    def advance(self, candles=1):
+        """Move every market forward by `candles`, filling any limit orders they trade through."""
+        with self._lock:
+            self._advanced += candles
+            self._match()
+
+    def stats(self):
+        with self._lock:
+            return {'calls': dict(self.calls), 'outcomes': dict(self.outcomes),
+                    'trades': len(self.trades), 'open_orders': len(self.open_orders)}
+
+    def _call(self, method, data):
+        with self._lock:
+            self.calls[method] += 1
+            roll = self._rng.random()
+            delay = self.latency + self._rng.uniform(0, self.jitter) if self.latency or self.jitter else 0.0
+        if delay:
+            time.sleep(delay)
+        if not self._charge(method):
+            return self._fail('rate_limited', 'EAPI:Rate limit exceeded')
+        if roll < self.timeout_rate:
+            with self._lock:
+                self.outcomes['timeout'] += 1
+            raise requests.exceptions.Timeout(f"Simulated timeout calling {method}")
+        if roll < self.timeout_rate + self.error_rate:
+            return self._fail('injected_error', 'EService:Unavailable')
+        handler = getattr(self, f"_{method}", None)
+        if handler is None:
+            return {'error': [f"EGeneral:Unknown method {method}"], 'result': {}}
+        with self._lock:
+            self._match()
+            return handler(data)
+
+    def _charge(self, method):
+        if not self.counters:
+            return True
+        pool = 'order' if method in ORDER_ENDPOINTS else 'public' if method in PUBLIC_ENDPOINTS else 'private'
+        return self.counters[pool].charge(ENDPOINT_COSTS.get(method, 1))
+
+    def _fail(self, outcome, error):
+        with self._lock:
+            self.outcomes[outcome] += 1
+        return {'error': [error], 'result': {}}
+
+    # Market state
+
+    def _index(self, pair):
+        elapsed = (time.monotonic() - self._started) / self.seconds_per_candle if self.seconds_per_candle else 0
+        return min(len(self.candles[pair]) - 1, self._start[pair] + self._advanced + int(elapsed))
+
+    def _quote(self, pair):
+        """Return (last, bid, ask) from the pair's current candle."""
+        last = Decimal(str(self.candles[pair][self._index(pair)][4]))
+        half_spread = last * self.spread / 2
+        places = Decimal(1).scaleb(-int(self.asset_pairs[pair]['pair_decimals']))
+        return last, (last - half_spread).quantize(places), (last + half_spread).quantize(places)
+
+    def _match(self):
+        """Fill resting limit orders against the candles the market has moved through since they were checked."""
+        for txid, order in list(self.open_orders.items()):
+            rows, index = self.candles[order['pair']], self._index(order['pair'])
+            for row in rows[order['checked'] + 1:index + 1]:
+                low, high = Decimal(str(row[3])), Decimal(str(row[2]))
+                if low <= order['price'] if order['type'] == 'buy' else high >= order['price']:
+                    del self.open_orders[txid]
+                    self._fill(txid, order, order['price'], reserved=True)
+                    break
+            else:
+                order['checked'] = index
+
+    def _fill(self, txid, order, price, reserved=False):
+        info = self.asset_pairs[order['pair']]
+        volume = order['volume']
+        cost = price * volume
+        fee = cost * self.fee
+        if order['type'] == 'buy':
+            if reserved:
+                # The hold was taken at the limit price plus fee; the fill can't cost more.
+                self.balance[info['quote']] += order['price'] * volume * (1 + self.fee) - cost - fee
+            else:
+                self.balance[info['quote']] -= cost + fee
+            self.balance[info['base']] += volume
+        else:
+            if not reserved:
+                self.balance[info['base']] -= volume
+            self.balance[info['quote']] += cost - fee
+        self._txids += 1
+        self.trades[f"TSIM-{self._txids}"] = {
+            'ordertxid': txid, 'pair': order['pair'], 'time': time.time(), 'type': order['type'],
+            'ordertype': order['ordertype'], 'price': str(price), 'cost': f"{cost:.5f}",
+            'fee': f"{fee:.5f}", 'vol': f"{volume:.8f}",
+        }
+        self.outcomes['filled'] += 1
+
+    def _place(self, pair, params):
+        """Validate and place one order; returns ({'txid': ...}, None) or (None, error)."""
+        info = self.asset_pairs.get(pair)
+        if info is None or pair not in self.candles:
+            return None, 'EQuery:Unknown asset pair'
+        try:
+            volume = Decimal(str(params['volume']))
+            limit = Decimal(str(params['price'])) if params.get('ordertype') == 'limit' else None
+        except (KeyError, ArithmeticError):
+            return None, 'EGeneral:Invalid arguments'
+        if params.get('type') not in ('buy', 'sell') or params.get('ordertype') not in ('market', 'limit'):
+            return None, 'EGeneral:Invalid arguments'
+        if volume < Decimal(info['ordermin']):
+            return None, 'EOrder:Order minimum not met'
+
+        _, bid, ask = self._quote(pair)
+        side = params['type']
+        marketable = limit is None or (limit >= ask if side == 'buy' else limit <= bid)
+        price = (ask if side == 'buy' else bid) if marketable else limit
+        if side == 'buy' and price * volume * (1 + self.fee) > self.balance[info['quote']]:
+            return None, 'EOrder:Insufficient funds'
+        if side == 'sell' and volume > self.balance[info['base']]:
+            return None, 'EOrder:Insufficient funds'
+
+        self._txids += 1
+        txid = f"OSIM-{self._txids}"
+        order = {'pair': pair, 'type': side, 'ordertype': params['ordertype'], 'volume': volume, 'price': limit,
+                 'checked': self._index(pair)}
+        if marketable:
+            self._fill(txid, order, price)
+        else:
+            # Hold the funds the order needs while it rests on the book.
+            if side == 'buy':
+                self.balance[info['quote']] -= limit * volume * (1 + self.fee)
+            else:
+                self.balance[info['base']] -= volume
+            self.open_orders[txid] = order
+            self.outcomes['resting'] += 1
+        return {'txid': txid}, None
+
+    # Endpoints
+
+    def _AssetPairs(self, data):
+        return {'error': [], 'result': self.asset_pairs}
+
+    def _Ticker(self, data):
+        pairs = data.get('pair', '').split(',')
+        if not all(pair in self.candles for pair in pairs):
+            return {'error': ['EQuery:Unknown asset pair'], 'result': {}}  # One unknown pair fails them all
+        result = {}
+        for pair in pairs:
+            last, bid, ask = self._quote(pair)
+            result[pair] = {'a': [str(ask), '1', '1.000'], 'b': [str(bid), '1', '1.000'], 'c': [str(last), '0.1']}
+        return {'error': [], 'result': result}
+
+    def _OHLC(self, data):
+        pair = data.get('pair')
+        if pair not in self.candles:
+            return {'error': ['EQuery:Unknown asset pair'], 'result': {}}
+        index = self._index(pair)
+        rows = self.candles[pair][max(0, index + 1 - OHLC_LIMIT):index + 1]
+        if data.get('since'):
+            rows = [row for row in rows if row[0] >= int(data['since'])]
+        # As on Kraken, `last` is the newest committed candle, so the forming one is returned again next time.
+        last = self.candles[pair][max(0, index - 1)][0]
+        return {'error': [], 'result': {pair: rows, 'last': last}}
+
+    def _Balance(self, data):
+        return {'error': [], 'result': {asset: f"{amount:.8f}" for asset, amount in self.balance.items()}}
+
+    def _TradesHistory(self, data):
+        return trades_page(self.trades, data)
+
+    def _AddOrder(self, data):
+        result, error = self._place(data.get('pair'), data)
+        if error:
+            self.outcomes['rejected'] += 1
+            return {'error': [error], 'result': {}}
+        return {'error': [], 'result': {'txid': [result['txid']]}}
+
+    def _AddOrderBatch(self, data):
+        orders = data.get('orders')
+        if not isinstance(orders, list) or not orders or len(orders) > 15:
+            return {'error': ['EGeneral:Invalid arguments'], 'result': {}}
+        results = []
+        for order in orders:
+            result, error = self._place(data.get('pair'), order)
+            if error:
+                self.outcomes['rejected'] += 1
+            results.append(result or {'error': error})
+        return {'error': [], 'result': {'orders': results}}
+
+
+class FakeNews(_Picklable):
+    """News source that makes up a few fresh headlines for every search."""
+
+    def __init__(self, articles=5, latency=0.0, seed=0):
+        self.articles = articles
+        self.latency = latency
+        self.calls = Counter()
+        self._issued = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def search(self, asset):
+        """Return GNews-style results about `asset`, as if just published."""
+        if self.latency:
+            time.sleep(self.latency)
+        published = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        with self._lock:
+            self.calls['search'] += 1
+            articles = []
+            for _ in range(self.articles):
+                self._issued += 1
+                articles.append({
+                    'title': f"{asset} {self._rng.choice(NEWS_PHRASES)}",
+                    'description': f"Traders say {asset} {self._rng.choice(NEWS_PHRASES)}.",
+                    'url': f"https://news.example/{asset}/{self._issued}",
+                    'publishedAt': published,
+                })
+        return {'articles': articles}
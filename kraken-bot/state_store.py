@@ -0,0 +1,102 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+
+def _encode(value):
+    # Decimals become strings, as Flask's jsonify sends them
+    return json.dumps(value, default=str)
+
+
+class StateStore:
+    """Dashboard state shared between processes: the coordinator writes, the web app reads.
+
+    `put` keeps the latest JSON value of a key (status, portfolio, signals, ...) and, unless
+    told not to, also appends it to a numbered event log. `append` adds log-only events such
+    as orders and log lines. Readers follow the log with `events(after)`, much like
+    LogJournal.since. The database runs in WAL mode, so reads never block the writer.
+    """
+
+    def __init__(self, path='bot_state.db', capacity=1000):
+        """Open (or create) the SQLite state database at the given path."""
+        self.capacity = capacity  # Events kept for readers that fall behind
+        self._lock = threading.Lock()
+        self._appended = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT, updated REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT, event TEXT, value TEXT)"
+            )
+
+    def put(self, key, value, publish=True):
+        """Store the latest value of a key; with `publish`, readers following the event log see it too."""
+        data = _encode(value)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO state VALUES (?, ?, ?)", (key, data, time.time()))
+            if publish:
+                self._append(key, data)
+
+    def append(self, event, value):
+        """Add an event to the log without keeping it as state."""
+        data = _encode(value)
+        with self._lock, self._conn:
+            self._append(event, data)
+
+    def _append(self, event, data):
+        cursor = self._conn.execute("INSERT INTO events (event, value) VALUES (?, ?)", (event, data))
+        self._appended += 1
+        if self._appended % 100 == 0:
+            self._conn.execute("DELETE FROM events WHERE seq <= ?", (cursor.lastrowid - self.capacity,))
+
+    def get(self, key, default=None):
+        """Return the latest value of a key."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def updated(self, key):
+        """Return when a key was last written (unix time), or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT updated FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def last_seq(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+
+    def events(self, after=0, limit=500, names=None):
+        """Return up to `limit` (seq, event, value) entries newer than `after`, oldest first."""
+        query = "SELECT seq, event, value FROM events WHERE seq > ?"
+        params = (after,)
+        if names:
+            query += f" AND event IN ({','.join('?' * len(names))})"
+            params += tuple(names)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY seq LIMIT ?", params + (limit,)).fetchall()
+        return [(seq, event, json.loads(value)) for seq, event, value in rows]
+
+
+class StateLogHandler(logging.Handler):
+    """Log handler that appends records to a StateStore as 'log' events, for another process to show."""
+
+    def __init__(self, store, level=logging.INFO):
+        super().__init__(level)
+        self.store = store
+
+    def emit(self, record):
+        try:
+            self.store.append('log', {
+                'time': record.created,
+                'level': record.levelname,
+                'logger': record.name,
+                'message': self.format(record),
+            })
+        except Exception:
+            self.handleError(record)
@@ -55,6 +55,12 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    const MAX_LOG_LINES = 100;
+    const logLines = [];
+    let startTime = null;
+    let signalsReceived = false;
+    let tradesReceived = false;
+
     const toggleButton = document.getElementById('toggleBot');
     console.log('Trader control:', toggleButton);
 
@@ -126,27 +132,22 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 100);
     }
 
-    function updateDashboard() {
-        console.log('Updating Trader dashboard');
-        fetch('/get_portfolio')
-            .then(response => response.json())
-            .then(data => {
-                console.log('Trader data received:', data);
-                updateSummaryCards(data);
-                updateAssetGrid(data.portfolio);
-                updatePortfolioChart(data.history);
-            })
-            .catch(error => {
-                console.error('Error updating Trader dashboard:', error);
-                showToast('Failed to update dashboard. Please check the console for details.', 'error');
-            });
+    function updateDashboard(data) {
+        updateSummaryCards(data);
+        updateAssetGrid(data.portfolio);
+        updatePortfolioChart(data.history);
     }
 
     function updateSummaryCards(data) {
         document.getElementById('totalValue').textContent = `$${data.total_value.toFixed(2)}`;
         document.getElementById('dailyChange').textContent = `${calculateDailyChange(data.history)}%`;
         document.getElementById('topAsset').textContent = getTopAsset(data.portfolio);
-        document.getElementById('botUptime').textContent = calculateUptime(data.start_time);
+        startTime = data.start_time;
+        updateUptime();
+    }
+
+    function updateUptime() {
+        document.getElementById('botUptime').textContent = calculateUptime(startTime);
     }
 
     function calculateDailyChange(history) {
@@ -157,6 +158,7 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     function getTopAsset(portfolio) {
+        if (Object.keys(portfolio).length === 0) return '-';
         return Object.entries(portfolio).reduce((a, b) => a[1] > b[1] ? a : b)[0];
     }
 
@@ -189,57 +191,49 @@ document.addEventListener('DOMContentLoaded', function() {
         portfolioChart.update();
     }
 
-    function updateTradeList() {
-        fetch('/get_trades')
-            .then(response => response.json())
-            .then(data => {
-                const tradeList = document.getElementById('tradeList');
-                tradeList.innerHTML = '';
-                data.trades.forEach(trade => {
-                    const tradeItem = document.createElement('div');
-                    tradeItem.className = 'trade-item';
-                    tradeItem.innerHTML = `
-                        <p>${new Date(trade.time).toLocaleString()} - ${trade.type} ${trade.amount} ${trade.pair} @ ${trade.price}</p>
-                    `;
-                    tradeList.appendChild(tradeItem);
-                });
-            })
-            .catch(error => {
-                console.error('Error updating trade list:', error);
-                showToast('Failed to update trade list. Please check the console for details.', 'error');
-            });
+    function updateTradeList(trades) {
+        const tradeList = document.getElementById('tradeList');
+        tradeList.innerHTML = '';
+        trades.forEach(trade => {
+            const tradeItem = document.createElement('div');
+            tradeItem.className = 'trade-item';
+            tradeItem.innerHTML = `
+                <p>${new Date(trade.time * 1000).toLocaleString()} - ${trade.type} ${trade.amount} ${trade.pair} @ ${trade.price}</p>
+            `;
+            tradeList.appendChild(tradeItem);
+        });
     }
 
-    function updateLogs() {
-        fetch('/get_logs')
-            .then(response => response.json())
-            .then(data => {
-                document.getElementById('logData').textContent = data.logs.join('\n');
-            })
-            .catch(error => {
-                console.error('Error updating logs:', error);
-                showToast('Failed to update logs. Please check the console for details.', 'error');
-            });
+    function appendLog(entry) {
+        const line = `${new Date(entry.time * 1000).toLocaleString()} - ${entry.level} - ${entry.message}`;
+        logLines.push(line);
+        if (logLines.length > MAX_LOG_LINES) logLines.shift();
+        document.getElementById('logData').textContent = logLines.join('\n');
+    }
+
+    function renderTradingSignals(data) {
+        const signalsContainer = document.getElementById('tradingSignals');
+        signalsContainer.innerHTML = '';
+        for (const [asset, signals] of Object.entries(data)) {
+            const signalCard = document.createElement('div');
+            signalCard.className = 'signal-card';
+            signalCard.innerHTML = `
+                <h3>${asset}</h3>
+                <p>SMA: ${signals.sma_signal ? 'Bullish' : 'Bearish'}</p>
+                <p>RSI: ${signals.rsi_signal}</p>
+                <p>MACD: ${signals.macd_signal ? 'Bullish' : 'Bearish'}</p>
+                <p>Sentiment: ${signals.sentiment.toFixed(2)}</p>
+            `;
+            signalsContainer.appendChild(signalCard);
+        }
     }
 
     function updateTradingSignals() {
+        // Only needed before the first strategy run has published signals over the stream
         fetch('/get_trading_signals')
             .then(response => response.json())
             .then(data => {
-                const signalsContainer = document.getElementById('tradingSignals');
-                signalsContainer.innerHTML = '';
-                for (const [asset, signals] of Object.entries(data)) {
-                    const signalCard = document.createElement('div');
-                    signalCard.className = 'signal-card';
-                    signalCard.innerHTML = `
-                        <h3>${asset}</h3>
-                        <p>SMA: ${signals.sma_signal ? 'Bullish' : 'Bearish'}</p>
-                        <p>RSI: ${signals.rsi_signal}</p>
-                        <p>MACD: ${signals.macd_signal ? 'Bullish' : 'Bearish'}</p>
-                        <p>Sentiment: ${signals.sentiment.toFixed(2)}</p>
-                    `;
-                    signalsContainer.appendChild(signalCard);
-                }
+                if (!signalsReceived) renderTradingSignals(data);
             })
             .catch(error => {
                 console.error('Error updating trading signals:', error);
@@ -247,6 +241,16 @@ document.addEventListener('DOMContentLoaded', function() {
             });
     }
 
+    function updateTrades() {
+        // Fallback for a stream that connected before the bot published its trades
+        fetch('/get_trades')
+            .then(response => response.json())
+            .then(data => {
+                if (!tradesReceived && data.trades) updateTradeList(data.trades);
+            })
+            .catch(error => console.error('Error updating trades:', error));
+    }
+
     document.getElementById('settingsForm').addEventListener('submit', function(e) {
         e.preventDefault();
         const formData = {
@@ -294,26 +298,40 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
-    // Get initial bot status and settings
-    function getInitialBotStatus() {
-        fetch('/get_bot_status')
-            .then(response => response.json())
-            .then(data => {
-                updateTraderStatus(data.status);
-                if (data.status === 'running') {
-                    updateDashboard();
-                    updateTradeList();
-                    updateLogs();
-                    updateTradingSignals();
-                }
-                if (data.current_settings) {
-                    updateSettingsForm(data.current_settings);
-                }
-            })
-            .catch(error => {
-                console.error('Error getting initial bot status:', error);
-                showToast('Failed to get initial bot status. Please check the console for details.', 'error');
-            });
+    // Server-pushed updates. The server replays the latest state of each kind and the
+    // recent log lines on (re)connect, so nothing needs to be fetched up front.
+    function connectStream() {
+        const source = new EventSource('/stream');
+        source.addEventListener('status', event => {
+            const data = JSON.parse(event.data);
+            updateTraderStatus(data.status);
+            startTime = data.start_time;
+            updateUptime();
+            if (data.current_settings) {
+                updateSettingsForm(data.current_settings);
+            }
+            if (data.status === 'running' && !signalsReceived) {
+                updateTradingSignals();
+            }
+            if (data.status === 'running' && !tradesReceived) {
+                updateTrades();
+            }
+        });
+        source.addEventListener('portfolio', event => updateDashboard(JSON.parse(event.data)));
+        source.addEventListener('trades', event => {
+            tradesReceived = true;
+            updateTradeList(JSON.parse(event.data).trades);
+        });
+        source.addEventListener('signals', event => {
+            signalsReceived = true;
+            renderTradingSignals(JSON.parse(event.data));
+        });
+        source.addEventListener('log', event => appendLog(JSON.parse(event.data)));
+        source.onerror = () => {
+            // EventSource reconnects by itself; the replayed state and backlog would be appended again
+            logLines.length = 0;
+            console.warn('Trader stream disconnected, reconnecting');
+        };
     }
 
     function updateSettingsForm(settings) {
@@ -330,23 +348,7 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
-    // Initial setup and periodic updates
-    getInitialBotStatus();
-    setInterval(() => {
-        fetch('/get_bot_status')
-            .then(response => response.json())
-            .then(data => {
-                updateTraderStatus(data.status);
-                if (data.status === 'running') {
-                    updateDashboard();
-                    updateTradeList();
-                    updateLogs();
-                    updateTradingSignals();
-                }
-            })
-            .catch(error => {
-                console.error('Error getting bot status:', error);
-                showToast('Failed to update bot status. Please check the console for details.', 'error');
-            });
-    }, 10000);
+    // Initial setup; the uptime counter ticks locally instead of asking the server
+    connectStream();
+    setInterval(updateUptime, 1000);
 });
\ No newline at end of file
@@ -0,0 +1,43 @@
+import os
+import sys
+from argparse import Namespace
+import pytest
+
+# The bot's modules are imported flat (`from kraken_bot import KrakenBot`), as app.py does.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest import BotFactory  # noqa: E402
+from replay import synthetic_fixtures  # noqa: E402
+from simulator import FakeNews, SimulatedKraken  # noqa: E402
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a scratch directory so the bot's SQLite stores and caches start empty."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def sim_bot(workdir):
+    """Build KrakenBots on a SimulatedKraken account of synthetic pairs, with rate limiting off.
+
+    `sim_bot(pairs, candles=..., news=..., workers=..., **simulator_options)` starts a new account;
+    pass `exchange=bot.kraken` instead to build another bot on the same one. Sharded bots'
+    workers are stopped afterwards.
+    """
+    bots = []
+
+    def make(pairs=1, candles=60, news=None, workers=0, exchange=None, **options):
+        if exchange is None:
+            exchange = SimulatedKraken(synthetic_fixtures(pairs, candles=candles), rate_limits=False, **options)
+        args = Namespace(workers=workers, check_interval=300, rebalance_interval=3600,  # KrakenBot's own cadence
+                         rate_limits=False)
+        bot = BotFactory(exchange, news or FakeNews(), args)()
+        bots.append(bot)
+        return bot
+
+    yield make
+    for bot in bots:
+        if getattr(bot, 'worker_pool', None):
+            bot.worker_pool.stop()
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtest import DEFAULT_PARAMS, round_down, run_backtest, simulate, starting_position
+
+
+def reference_simulate(close, buy, sell, params, cash, units, min_order=0.0, lot_decimals=8):
+    """Per-bar loop that places orders the way the live bot sizes and validates them."""
+    risk, fee = params['max_risk_per_trade'], params['fee']
+    equity, trades = [], []
+    for bar, price in enumerate(close.to_numpy(dtype=np.float64)):
+        side = 1 if buy[bar] else -1 if sell[bar] else 0
+        if side:
+            volume = round_down(units * risk, lot_decimals)
+            notional = volume * price
+            if (volume > 0 and volume >= min_order and notional >= params['min_trade_size']
+                    and (side < 0 or cash >= notional)):
+                units += side * volume
+                cash -= side * notional + notional * fee
+                trades.append((bar, side, volume))
+        equity.append(cash + units * price)
+    return np.array(equity), trades
+
+
+def random_market(bars, seed):
+    rng = np.random.default_rng(seed)
+    close = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars))),
+                      index=pd.date_range('2020-01-01', periods=bars, freq='D'))
+    signal = rng.random(bars)
+    return close, signal < 0.2, signal > 0.75
+
+
+@pytest.mark.parametrize('seed, cash, units, min_order, lot_decimals', [
+    (0, 1000.0, 5.0, 0.0, 8),
+    (1, 50.0, 2.0, 0.05, 2),
+    (2, 10000.0, 7.77, 0.1, 1),
+    (3, 0.0, 100.0, 0.0, 0),
+])
+def test_simulate_matches_per_bar_reference(seed, cash, units, min_order, lot_decimals):
+    close, buy, sell = random_market(2000, seed)
+    params = {**DEFAULT_PARAMS, 'max_risk_per_trade': 0.1}
+    equity, trades = simulate(close, buy, sell, params, cash, units, min_order, lot_decimals)
+    expected_equity, expected_trades = reference_simulate(close, buy, sell, params, cash, units, min_order,
+                                                          lot_decimals)
+
+    np.testing.assert_allclose(equity.to_numpy(), expected_equity, rtol=1e-12)
+    assert list(trades['volume']) == [volume for _, _, volume in expected_trades]
+    assert list(trades['type']) == ['buy' if side > 0 else 'sell' for _, side, _ in expected_trades]
+
+
+def test_lot_rounding_moves_holding_by_the_filled_volume():
+    close = pd.Series([10.0, 10.0, 10.0])
+    sell = np.array([True, True, False])
+    params = {**DEFAULT_PARAMS, 'max_risk_per_trade': 0.1, 'fee': 0.0, 'min_trade_size': 0.0}
+    equity, trades = simulate(close, np.zeros(3, bool), sell, params, 0.0, 7.77, lot_decimals=1)
+
+    assert list(trades['volume']) == [0.7, 0.7]  # 0.777 and 0.707 rounded down, as OrderPlan does
+    assert equity.iloc[-1] == pytest.approx(77.7)  # Sold 1.4 for 14.0 and still holding 6.37
+
+
+def test_default_backtest_starts_with_a_holding_and_trades():
+    close, _, _ = random_market(500, 4)
+    result = run_backtest(pd.DataFrame({'close': close}), cash=1000.0)
+
+    assert result['stats']['start_value'] == pytest.approx(1000.0)
+    assert result['stats']['trades'] > 0
+
+
+def test_starting_position_rejects_an_empty_holding():
+    with pytest.raises(ValueError):
+        starting_position(pd.Series([1.0]), 1000.0, 0.0)
@@ -0,0 +1,62 @@
+from decimal import Decimal
+from event_stream import BotEventPublisher
+from state_store import StateStore
+from workers import Coordinator
+
+
+class StubScheduler:
+    def __init__(self):
+        self.ran = []
+
+    def add(self, name, func, interval, align=None, offset=0):
+        pass
+
+    def run_now(self, name):
+        self.ran.append(name)
+
+
+class StubBot:
+    """Just what the publisher and the coordinator read from a bot."""
+
+    def __init__(self):
+        self.scheduler = StubScheduler()
+        self.listeners = []
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def get_recent_trades(self, limit=10):
+        return [{'txid': 'T1', 'pair': 'XXBTZUSD', 'type': 'buy'}]
+
+    def get_balance(self):
+        return {'ZUSD': Decimal('100'), 'XXBT': Decimal('0.5')}
+
+    def get_portfolio_value(self, prices=None, balance=None):
+        return Decimal('150')
+
+
+def test_fills_publish_trades_and_a_portfolio_snapshot():
+    bot, published = StubBot(), []
+    publisher = BotEventPublisher(bot, lambda event, data: published.append((event, data)))
+
+    publisher('trades')
+    publisher('order', {'txid': 'O1'})
+    publisher('strategy')
+
+    assert published == [('trades', {"trades": bot.get_recent_trades()}), ('order', {'txid': 'O1'})]
+    assert bot.scheduler.ran == ['portfolio_snapshot']
+
+
+def test_coordinator_writes_the_same_events_to_the_store(workdir):
+    bot, store = StubBot(), StateStore('state.db')
+    coordinator = Coordinator(bot, store)
+    (listener,) = bot.listeners
+
+    listener('trades')
+    listener('order', {'txid': 'O1'})
+    coordinator.record_portfolio()
+
+    assert store.get('trades') == {"trades": bot.get_recent_trades()}
+    assert store.get('order') is None  # Orders are only in the event log
+    assert [event for _, event, _ in store.events()] == ['trades', 'order', 'portfolio']
+    assert store.get('portfolio')['total_value'] == 150.0
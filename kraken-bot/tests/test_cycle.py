@@ -0,0 +1,49 @@
+def recording_bot(sim_bot, monkeypatch):
+    """A trading bot on simulated data that records the passes each cycle runs and the plans it submits."""
+    bot = sim_bot(3)
+    bot.is_trading = True
+    bot.passes, bot.submitted = [], []
+    for name in ('rebalance_portfolio', 'trading_strategy'):
+        original = getattr(bot, name)
+        monkeypatch.setattr(bot, name, lambda prices=None, plan=None, name=name, original=original:
+                            bot.passes.append((name, plan)) or original(prices, plan))
+    execute_plan = bot.execute_plan
+    monkeypatch.setattr(bot, 'execute_plan', lambda plan, balance=None:
+                        bot.submitted.append(plan) or execute_plan(plan, balance))
+    return bot
+
+
+def test_scheduled_cycle_submits_one_plan(sim_bot, monkeypatch):
+    bot = recording_bot(sim_bot, monkeypatch)
+    bot.run_scheduled_cycle()
+
+    assert [name for name, _ in bot.passes] == ['rebalance_portfolio', 'trading_strategy']
+    assert len(bot.submitted) == 1
+    assert all(plan is bot.submitted[0] for _, plan in bot.passes)
+
+
+def test_rebalance_joins_one_cycle_per_interval(sim_bot, monkeypatch):
+    bot = recording_bot(sim_bot, monkeypatch)
+    bot.run_scheduled_cycle()
+    bot.passes.clear()
+
+    bot.run_scheduled_cycle()
+    assert [name for name, _ in bot.passes] == ['trading_strategy']
+
+    bot.last_rebalance -= bot.rebalance_interval
+    bot.passes.clear()
+    bot.run_scheduled_cycle()
+    assert [name for name, _ in bot.passes] == ['rebalance_portfolio', 'trading_strategy']
+    assert len(bot.submitted) == 3
+
+
+def test_snapshot_skips_pairs_the_account_does_not_hold(sim_bot, monkeypatch):
+    bot = recording_bot(sim_bot, monkeypatch)
+    listed = bot.kraken.asset_pairs
+    listed['ZZZUSD'] = dict(listed['A000USD'], altname='ZZZUSD', wsname='ZZZ/USD', base='ZZZ')  # No ticker: delisted
+    bot.get_asset_pairs(force=True)
+    assert 'ZZZUSD' in bot.asset_pairs
+
+    prices = bot.run_cycle()
+    assert set(prices) == {'A000USD', 'A001USD', 'A002USD'}
+    assert set(bot.get_ticker_snapshot()) == set(prices)
@@ -0,0 +1,57 @@
+from decimal import Decimal
+from types import MappingProxyType
+import pytest
+from execution import OrderPlan
+from pair_index import PairIndex
+from replay import synthetic_fixtures
+
+PAIR = 'A000USD'
+
+
+@pytest.fixture
+def pair_index(workdir):
+    index = PairIndex('asset_pairs.json')
+    index.refresh(synthetic_fixtures(2, candles=2)['kraken']['AssetPairs']['result'])
+    return index
+
+
+def quote(last, spread=Decimal('0.1')):
+    last = Decimal(last)
+    return MappingProxyType({'last': last, 'bid': last - spread, 'ask': last + spread})
+
+
+def test_opposing_orders_are_netted_per_pair(pair_index):
+    plan = OrderPlan(pair_index)
+    plan.add(PAIR, 'buy', '1.0', 10, 'rebalance')
+    plan.add('A001USD', 'sell', '0.5', 10, 'strategy')
+    plan.add(PAIR, 'sell', '0.4', 10, 'strategy')
+    plan.add(PAIR, 'buy', '0.2', 10, 'strategy')
+
+    assert [(order['pair'], order['type'], order['volume']) for order in plan.net()] == [
+        (PAIR, 'buy', Decimal('0.6')), ('A001USD', 'sell', Decimal('0.5')), (PAIR, 'buy', Decimal('0.2'))]
+
+
+def test_buys_are_capped_at_the_ask_plus_fee(pair_index):
+    plan = OrderPlan(pair_index, {PAIR: quote('10'), 'A001USD': quote('20')})
+    plan.add(PAIR, 'buy', '20', 10)
+    plan.add('A001USD', 'buy', '1', 20)
+
+    (order,) = plan.finalize(quote_balance=Decimal('100'))
+    spent = order['volume'] * Decimal('10.1') * (1 + pair_index.pairs[PAIR]['taker_fee'])
+    assert Decimal('99.99') < spent <= Decimal('100')
+    (rejected,) = plan.rejected
+    assert rejected['pair'] == 'A001USD' and rejected['error'].startswith('insufficient balance')
+
+
+def test_a_plan_spending_all_the_cash_fills_on_the_simulator(sim_bot):
+    bot = sim_bot(3, candles=10, seconds_per_candle=None)
+    exchange = bot.kraken
+    bot.get_asset_pairs()
+    prices = bot.get_ticker_snapshot()
+    plan = bot.new_order_plan(prices)
+    for pair in prices:
+        plan.add(pair, 'buy', 40000 / prices[pair]['last'], prices[pair]['last'])
+
+    results = bot.execute_plan(plan, bot.get_balance())
+    assert len(results) == 3 and not [result['error'] for result in results if result['error']]
+    assert 0 <= exchange.balance['ZUSD'] < 1
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from indicators import IndicatorEngine, macd, rsi, sma
+
+
+def candles(count=120, seed=0):
+    """A random-walk close series indexed by candle time, like get_ohlc_data returns."""
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.cumprod(1 + rng.normal(0, 0.02, count))
+    return pd.DataFrame({'close': closes}, index=pd.RangeIndex(0, count * 60, 60, name='time'))
+
+
+def expected(df):
+    """The latest indicator values computed by the vectorised pandas functions."""
+    close = df['close']
+    macd_line, signal_line, histogram = macd(close)
+    return {'SMA_20': sma(close, 20).iloc[-1], 'SMA_50': sma(close, 50).iloc[-1], 'RSI': rsi(close).iloc[-1],
+            'MACD': macd_line.iloc[-1], 'Signal': signal_line.iloc[-1], 'Hist': histogram.iloc[-1]}
+
+
+def assert_matches(values, df):
+    want = expected(df)
+    for name, value in want.items():
+        assert np.allclose(values[name], value, equal_nan=True), (name, values[name], value)
+
+
+def forming(df, close):
+    """`df` with its last candle still open at `close`."""
+    revised = df.copy()
+    revised.iloc[-1, revised.columns.get_loc('close')] = close
+    return revised
+
+
+def test_update_matches_pandas_through_revisions():
+    df = candles()
+    engine = IndicatorEngine()
+    for position, (time, close) in enumerate(zip(df.index, df['close'])):
+        seen = df.iloc[:position + 1]
+        for partial in (close * 0.97, close * 1.02):
+            assert_matches(engine.update('A000USD', {'time': time, 'close': partial}), forming(seen, partial))
+        assert_matches(engine.update('A000USD', {'time': time, 'close': close}), seen)
+
+
+def test_update_ignores_candles_older_than_the_last():
+    df = candles(60)
+    engine = IndicatorEngine()
+    for time, close in zip(df.index, df['close']):
+        engine.update('A000USD', {'time': time, 'close': close})
+    assert_matches(engine.update('A000USD', {'time': df.index[10], 'close': 1.0}), df)
+
+
+def test_sync_matches_pandas_through_revisions():
+    df = candles()
+    engine = IndicatorEngine()
+    assert_matches(engine.sync('A000USD', df.iloc[:60]), df.iloc[:60])
+    for end in range(61, len(df) + 1, 3):
+        seen = df.iloc[:end]
+        for partial in (seen['close'].iloc[-1] * 1.01, seen['close'].iloc[-1] * 0.99):
+            assert_matches(engine.sync('A000USD', forming(seen, partial)), forming(seen, partial))
+        assert_matches(engine.sync('A000USD', seen), seen)
+
+
+def test_sync_rebuilds_when_the_frame_skips_past_the_state():
+    df = candles()
+    engine = IndicatorEngine()
+    engine.sync('A000USD', df.iloc[:40])
+    later = df.iloc[50:]
+    assert_matches(engine.sync('A000USD', later), later)
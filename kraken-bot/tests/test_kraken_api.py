@@ -0,0 +1,61 @@
+import base64
+import json
+from decimal import Decimal
+import krakenex
+from kraken_api import KrakenAPI, sign
+from execution import OrderExecutor
+
+SECRET = base64.b64encode(b'not a real secret').decode()
+
+
+class CapturingSession:
+    """Records the request krakenex would post."""
+
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.posts.append((url, data, headers))
+        return self
+
+    status_code = 200
+
+    def json(self):
+        return {'error': [], 'result': {'orders': [{'txid': 'O1'}, {'txid': 'O2'}]}}
+
+
+def test_sign_matches_krakenex_for_form_bodies():
+    api = krakenex.API('key', SECRET)
+    data = {'nonce': 1616492376594, 'pair': 'XBTUSD', 'type': 'buy', 'ordertype': 'market', 'volume': '1.25'}
+    body = 'nonce=1616492376594&pair=XBTUSD&type=buy&ordertype=market&volume=1.25'
+    assert sign(SECRET, '/0/private/AddOrder', data['nonce'], body) == api._sign(data, '/0/private/AddOrder')
+
+
+def test_add_order_batch_is_a_signed_json_body():
+    api = KrakenAPI('key', SECRET)
+    api.session = CapturingSession()
+    orders = [{'type': 'buy', 'ordertype': 'market', 'volume': '0.5'},
+              {'type': 'sell', 'ordertype': 'limit', 'volume': '0.2', 'price': '30000.0'}]
+    api.query_private('AddOrderBatch', {'pair': 'XXBTZUSD', 'orders': orders})
+
+    ((url, body, headers),) = api.session.posts
+    payload = json.loads(body)
+    assert url == 'https://api.kraken.com/0/private/AddOrderBatch'
+    assert headers['Content-Type'] == 'application/json'
+    assert payload == {'pair': 'XXBTZUSD', 'orders': orders, 'nonce': payload['nonce']}
+    assert headers['API-Sign'] == sign(SECRET, '/0/private/AddOrderBatch', payload['nonce'], body)
+
+
+def test_executor_sends_one_orders_array_per_pair():
+    calls = []
+    executor = OrderExecutor(lambda method, endpoint, payload: calls.append((endpoint, payload)) or
+                             {'error': [], 'result': {'orders': [{'txid': 'O1'}, {'txid': 'O2'}]}})
+    orders = [{'pair': 'XXBTZUSD', 'type': 'buy', 'ordertype': 'market', 'volume': Decimal('0.5'), 'price': None},
+              {'pair': 'XXBTZUSD', 'type': 'sell', 'ordertype': 'limit', 'volume': Decimal('0.2'),
+               'price': Decimal('30000.0')}]
+
+    results = executor.execute(orders)
+    assert calls == [('AddOrderBatch', {'pair': 'XXBTZUSD', 'orders': [
+        {'type': 'buy', 'ordertype': 'market', 'volume': '0.5'},
+        {'type': 'sell', 'ordertype': 'limit', 'volume': '0.2', 'price': '30000.0'}]})]
+    assert [result['txid'] for result in results] == [['O1'], ['O2']]
@@ -0,0 +1,99 @@
+import time
+from decimal import Decimal
+import pytest
+from fake_kraken_ws import FakeKrakenWebSocketServer
+from market_feed import MarketDataFeed
+
+DAY = 1440 * 60
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail("Timed out waiting for the market data feed")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def server():
+    with FakeKrakenWebSocketServer() as server:
+        yield server
+
+
+@pytest.fixture
+def feed(server):
+    feed = MarketDataFeed({'XXBTZUSD': 'XBT/USD'}, url=server.url)
+    feed.start()
+    assert feed.wait_connected(5)
+    yield feed
+    feed.stop()
+
+
+def test_subscribes_to_ticker_and_ohlc(server, feed):
+    wait_for(lambda: len(server.subscriptions) == 2)
+    assert [request['subscription'] for request in server.subscriptions] == [
+        {'name': 'ticker'}, {'name': 'ohlc', 'interval': 1440}]
+    assert all(request['pair'] == ['XBT/USD'] for request in server.subscriptions)
+
+
+def test_caches_the_latest_ticker(server, feed):
+    assert feed.ticker('XXBTZUSD') is None
+    server.send_ticker('XBT/USD', '100.5', bid='100.4', ask='100.6')
+    server.send_ticker('ETH/USD', '5')  # Not subscribed
+    wait_for(lambda: feed.ticker('XXBTZUSD'))
+
+    assert feed.ticker('XXBTZUSD') == {'last': Decimal('100.5'), 'bid': Decimal('100.4'), 'ask': Decimal('100.6')}
+    assert feed.ticker('XETHZUSD') is None
+
+
+def test_candle_gap_falls_back_to_rest_until_backfilled(server, sim_bot):
+    bot = sim_bot(seconds_per_candle=None)
+    exchange = bot.kraken
+    bot.get_asset_pairs()
+    (pair, info), = bot.asset_pairs.items()
+    bot.market_feed = feed = MarketDataFeed({pair: info['wsname']}, url=server.url)
+    feed.start()
+    try:
+        assert feed.wait_connected(5)
+        assert not feed.is_live(pair)  # Nothing has been backfilled yet
+        bot.get_historical_data(pair)
+        assert exchange.calls['OHLC'] == 1 and feed.is_live(pair)
+
+        start = int(time.time()) // DAY * DAY
+        server.send_candle(info['wsname'], start, 1, 2, 1, 2)
+        server.send_candle(info['wsname'], start + DAY, 2, 3, 2, 3)
+        wait_for(lambda: start + DAY in feed._pending_candles.get(pair, {}))
+        assert bot.get_historical_data(pair).iloc[-1]['close'] == 3
+        assert exchange.calls['OHLC'] == 1  # Served from the stream
+
+        server.send_candle(info['wsname'], start + 3 * DAY, 3, 4, 3, 4)  # The candle in between never came
+        wait_for(lambda: feed.gaps == 1)
+        assert not feed.is_live(pair)
+        bot.get_historical_data(pair)
+        assert exchange.calls['OHLC'] == 2 and feed.is_live(pair)
+    finally:
+        feed.stop()
+
+
+def test_is_not_connected_until_both_channels_are_subscribed():
+    feed = MarketDataFeed({'XXBTZUSD': 'XBT/USD'})
+    feed._handle({'event': 'subscriptionStatus', 'status': 'subscribed', 'pair': 'XBT/USD',
+                  'subscription': {'name': 'ticker'}})
+    assert not feed.wait_connected(0)
+    feed._handle({'event': 'subscriptionStatus', 'status': 'subscribed', 'pair': 'XBT/USD',
+                  'subscription': {'name': 'ohlc', 'interval': 1440}})
+    assert feed.wait_connected(0)
+
+
+def test_reconnects_and_resubscribes_after_the_server_drops(server, feed):
+    feed.mark_backfilled('XXBTZUSD')
+    server.drop_connections()
+    wait_for(lambda: feed.reconnects == 1)
+    assert feed.wait_connected(5)
+
+    wait_for(lambda: len(server.subscriptions) == 4)
+    assert not feed.is_live('XXBTZUSD')  # Updates may have been missed while disconnected
+    server.send_ticker('XBT/USD', '101')
+    wait_for(lambda: feed.ticker('XXBTZUSD'))
+    assert feed.ticker('XXBTZUSD')['last'] == Decimal('101')
@@ -0,0 +1,35 @@
+import pytest
+from simulator import FakeNews
+
+
+class FailingNews(FakeNews):
+    """FakeNews that raises once `fail` is set, like a GNews timeout."""
+
+    fail = False
+
+    def search(self, asset):
+        if self.fail:
+            self.calls['failed'] += 1
+            raise ConnectionError('read timed out')
+        return super().search(asset)
+
+
+def test_failed_refresh_keeps_the_stored_sentiment(sim_bot):
+    news = FailingNews(seed=1)
+    bot = sim_bot(candles=10, news=news)
+    cached = bot.get_news_sentiment('BTC')
+    assert cached != 0
+
+    news.fail = True
+    bot.news_ttl = 0  # Every call is due a refresh
+    assert bot.get_news_sentiment('BTC') == pytest.approx(cached)  # Decay weights move on with the clock
+    assert news.calls['failed'] == 1
+
+
+def test_failed_refresh_waits_for_the_ttl(sim_bot):
+    news = FailingNews()
+    news.fail = True
+    bot = sim_bot(candles=10, news=news)
+    bot.get_news_sentiment('BTC')
+    bot.get_news_sentiment('BTC')
+    assert news.calls['failed'] == 1
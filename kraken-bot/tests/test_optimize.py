@@ -0,0 +1,51 @@
+import io
+import os
+import subprocess
+import sys
+import pandas as pd
+from optimize import degenerate
+
+
+def rows(*metrics):
+    return pd.DataFrame([{'rsi_period': 7 + i, 'return': r, 'end_value': 2000 * (1 + r), 'max_drawdown': d,
+                          'trades': t, 'fees': f} for i, (r, d, t, f) in enumerate(metrics)])
+
+
+def test_sweep_without_trades_is_degenerate():
+    assert degenerate(rows((0.0, 0.0, 0, 0.0), (0.0, 0.0, 0, 0.0))) == "No configuration placed a trade"
+
+
+def test_identical_results_are_degenerate():
+    assert degenerate(rows((0.1, -0.2, 4, 1.5), (0.1, -0.2, 4, 1.5))) == \
+        "Every configuration produced identical results"
+
+
+def test_distinct_results_can_be_ranked():
+    assert degenerate(rows((0.1, -0.2, 4, 1.5), (0.05, -0.1, 6, 2.0))) is None
+
+
+SWEEP_SCRIPT = """
+import sys
+import numpy as np
+from optimize import grid_configs, sweep
+
+rng = np.random.default_rng(0)
+closes = {pair: 100 * np.cumprod(1 + rng.normal(0, 0.02, 400)) for pair in ('AUSD', 'BUSD')}
+settings = {'cash': 1000.0, 'units': None, 'sentiment': 0.0, 'sentiment_threshold': 0.2, 'fee': 0.0026, 'min_trade_size': 1.0, 'rules': {}}
+space = {'moving_average_periods': [(10, 30), (20, 50)], 'rsi_period': [7, 14], 'max_risk_per_trade': [0.05]}
+results = sweep(closes, list(grid_configs(space)), settings, workers=2, chunksize=1)
+results.to_csv(sys.stdout, index=False)
+"""
+
+
+def test_sweep_end_to_end():
+    # In a fresh interpreter, so the resource tracker's complaints (on stderr) belong to this sweep
+    completed = subprocess.run([sys.executable, '-c', SWEEP_SCRIPT], capture_output=True, text=True, timeout=120,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert completed.returncode == 0, completed.stderr
+    assert 'resource_tracker' not in completed.stderr and 'KeyError' not in completed.stderr
+
+    results = pd.read_csv(io.StringIO(completed.stdout))
+    assert len(results) == 4
+    assert list(results['return']) == sorted(results['return'], reverse=True)
+    assert results['trades'].gt(0).all() and degenerate(results) is None
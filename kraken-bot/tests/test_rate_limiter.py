@@ -0,0 +1,21 @@
+import pytest
+from rate_limiter import KrakenRateLimiter
+
+
+def test_public_calls_burst_two_then_one_per_second():
+    limiter = KrakenRateLimiter()
+    assert limiter.try_acquire('public', 'OHLC') and limiter.try_acquire('public', 'Ticker')
+    assert not limiter.try_acquire('public', 'OHLC')
+    assert limiter.wait_time('public', 'OHLC') == pytest.approx(1.0, abs=0.05)
+
+
+def test_dashboard_can_use_a_pool_smaller_than_the_reserve():
+    limiter = KrakenRateLimiter()
+    assert limiter.try_acquire('public', 'Ticker', lane='dashboard')
+    assert not limiter.try_acquire('public', 'Ticker', lane='dashboard')
+    assert limiter.try_acquire('public', 'Ticker')  # The trading lane keeps the last point
+
+    private = KrakenRateLimiter()
+    for _ in range(13):
+        assert private.try_acquire('private', 'Balance', lane='dashboard')
+    assert not private.try_acquire('private', 'Balance', lane='dashboard')
@@ -0,0 +1,47 @@
+from replay import trades_page
+from kraken_bot import KrakenBot
+
+
+class FlakyTradesExchange:
+    """Answers TradesHistory from a fixed set of trades, failing the requests listed in `failures`."""
+
+    def __init__(self, trades, failures=()):
+        self.trades = trades
+        self.failures = list(failures)  # Request numbers (from 1) that return EService:Unavailable
+        self.requests = 0
+
+    def query_public(self, method, data=None, timeout=None):
+        return {'error': ['EGeneral:Unknown method'], 'result': {}}
+
+    def query_private(self, method, data=None, timeout=None):
+        self.requests += 1
+        if self.requests in self.failures:
+            return {'error': ['EService:Unavailable'], 'result': {}}
+        return trades_page(self.trades, data or {})
+
+
+def make_trades(count, start=1_600_000_000):
+    return {f"T{i:04d}": {'ordertxid': f"O{i:04d}", 'pair': 'XXBTZUSD', 'time': start + i * 60, 'type': 'buy',
+                          'ordertype': 'market', 'price': '100.0', 'cost': '1.0', 'fee': '0.01', 'vol': '0.01'}
+            for i in range(count)}
+
+
+def test_interrupted_sync_recovers_older_pages(workdir):
+    exchange = FlakyTradesExchange(make_trades(150), failures=[2])
+    bot = KrakenBot(exchange=exchange)
+
+    assert bot.sync_trades() == 50  # The newest page, then the error on page 2
+    assert bot.trade_ledger.synced_until() is None
+    bot.sync_trades()
+    assert len(bot.trade_ledger.recent(1000)) == 150
+    assert bot.trade_ledger.synced_until() is not None
+
+
+def test_sync_only_fetches_trades_after_the_watermark(workdir):
+    exchange = FlakyTradesExchange(make_trades(120))
+    bot = KrakenBot(exchange=exchange)
+    assert bot.sync_trades() == 120
+    requests = exchange.requests
+
+    assert bot.sync_trades() == 0
+    assert exchange.requests == requests + 1  # One (nearly empty) page after a complete sync
@@ -0,0 +1,22 @@
+import os
+import signal
+
+
+def evaluation_key(evaluation):
+    return (evaluation['asset'], evaluation['pair'], evaluation['sma_signal'], evaluation['macd_signal'],
+            round(float(evaluation['rsi']), 6))
+
+
+def test_spawned_workers_match_in_process_evaluation(sim_bot):
+    plain = sim_bot(8, candles=80, seconds_per_candle=None)
+    sharded = sim_bot(exchange=plain.kraken, workers=2)
+    balance, prices = plain.get_balance(), plain.get_ticker_snapshot()
+    expected = [evaluation_key(e) for e in plain.evaluate_assets(balance, prices)]
+    assert [evaluation_key(e) for e in sharded.evaluate_assets(balance, prices)] == expected
+
+    # A worker that dies is restarted on the next evaluation
+    os.kill(sharded.worker_pool.status()[0]['pid'], signal.SIGKILL)
+    sharded.worker_pool._processes[0].join()
+    sharded.evaluate_assets(balance, prices)
+    assert [e['asset'] for e in sharded.evaluate_assets(balance, prices)] == [key[0] for key in expected]
+    assert sharded.worker_pool.status()[0]['restarts'] == 1
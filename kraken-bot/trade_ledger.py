@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+from decimal import Decimal
+
+TRADE_FIELDS = ['ordertxid', 'pair', 'time', 'type', 'ordertype', 'price', 'cost', 'fee', 'vol']
+
+
+class TradeLedger:
+    """Local copy of the account's trade history, synced incrementally from Kraken's TradesHistory."""
+
+    def __init__(self, path='trades.db'):
+        """Open (or create) the SQLite trade ledger at the given path."""
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Read by the dashboard process in worker mode
+        with self._conn:
+            # Amounts are kept as Kraken's decimal strings so nothing is lost to float rounding.
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS trades ("
+                "txid TEXT PRIMARY KEY, ordertxid TEXT, pair TEXT, time REAL, type TEXT, ordertype TEXT, "
+                "price TEXT, cost TEXT, fee TEXT, vol TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS trades_time ON trades (time)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS trades_pair_time ON trades (pair, time)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sync (name TEXT PRIMARY KEY, until REAL)")
+
+    def latest_time(self):
+        """Return the time of the newest stored trade, or None for an empty ledger."""
+        with self._lock:
+            return self._conn.execute("SELECT MAX(time) FROM trades").fetchone()[0]
+
+    def synced_until(self):
+        """Return the `end` of the last sync that paged through all of TradesHistory, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT until FROM sync WHERE name = 'trades'").fetchone()
+        return row[0] if row else None
+
+    def mark_synced(self, until):
+        """Record that every trade up to `until` is in the ledger."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sync VALUES ('trades', ?)", (until,))
+
+    def record(self, trades):
+        """Store a page of TradesHistory results ({txid: trade}); returns how many were new."""
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((txid, *(trade.get(field) for field in TRADE_FIELDS)) for txid, trade in trades.items()),
+            )
+            return self._conn.total_changes - before
+
+    def recent(self, limit=10, pair=None):
+        """Return the newest trades, most recent first."""
+        query = "SELECT txid, time, pair, type, price, vol, cost, fee FROM trades"
+        params = ()
+        if pair:
+            query += " WHERE pair = ?"
+            params = (pair,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY time DESC LIMIT ?", params + (limit,)).fetchall()
+        return [{
+            'txid': txid,
+            'time': time,
+            'pair': pair,
+            'type': type,
+            'price': price,
+            'amount': vol,
+            'cost': cost,
+            'fee': fee,
+        } for txid, time, pair, type, price, vol, cost, fee in rows]
+
+    def realized_pnl(self, pair=None, since=None):
+        """Realised profit per pair in its quote currency, using average cost and counting fees.
+
+        Sells of holdings bought before the ledger's history (or deposited) have no known cost,
+        so only the part of a sell covered by recorded buys is realised; the rest is reported
+        as `unmatched_volume`. `since` only limits which sells are counted; buys before it still
+        set the cost basis.
+        """
+        query = "SELECT pair, time, type, vol, cost, fee FROM trades"
+        params = ()
+        if pair:
+            query += " WHERE pair = ?"
+            params = (pair,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY time", params).fetchall()
+
+        positions = {}
+        for pair, time, type, vol, cost, fee in rows:
+            position = positions.setdefault(pair, {
+                'realized': Decimal('0'), 'fees': Decimal('0'), 'open_volume': Decimal('0'),
+                'open_cost': Decimal('0'), 'unmatched_volume': Decimal('0'), 'trades': 0,
+            })
+            vol, cost, fee = Decimal(vol), Decimal(cost), Decimal(fee)
+            counted = since is None or time >= since
+            if type == 'buy':
+                position['open_volume'] += vol
+                position['open_cost'] += cost + fee
+            else:
+                matched = min(vol, position['open_volume'])
+                basis = position['open_cost'] * matched / position['open_volume'] if matched else Decimal('0')
+                position['open_volume'] -= matched
+                position['open_cost'] -= basis
+                if counted:
+                    position['realized'] += cost * matched / vol - fee - basis
+                    position['unmatched_volume'] += vol - matched
+            if counted:
+                position['fees'] += fee
+                position['trades'] += 1
+        return positions
@@ -0,0 +1,343 @@
+"""Run the bot as a coordinator with shard worker processes, for a dashboard started in worker mode.
+
+Assets are split across worker processes by a stable hash of their pair. Each worker
+fetches news and OHLC and computes indicators for its own shard only. This process stays
+the coordinator: it owns the account's rate limiter, the balance and price snapshots and
+the single order plan each cycle submits. Signals, portfolio snapshots, status and log
+lines go to a StateStore, which app.py serves when KRAKEN_WORKER_MODE is set.
+
+Usage:
+    python workers.py --workers 4
+    python workers.py --workers 8 --shard-hash md5 --state-db bot_state.db --start
+"""
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import zlib
+from datetime import datetime
+from event_stream import BotEventPublisher
+from kraken_bot import KrakenBot
+from metrics import REGISTRY
+from rate_limiter import TokenBucket
+from state_store import StateStore, StateLogHandler
+
+logger = logging.getLogger(__name__)
+
+
+def shard_for(pair, shards, hash_name='crc32'):
+    """Return the shard (0 to shards - 1) a pair belongs to.
+
+    `hash_name` is 'crc32' or any hashlib algorithm. Python's own hash() is salted per
+    process, so it would put a pair on a different shard in every worker.
+    """
+    data = pair.encode('utf-8')
+    if hash_name == 'crc32':
+        value = zlib.crc32(data)
+    else:
+        value = int.from_bytes(hashlib.new(hash_name, data).digest()[:8], 'big')
+    return value % shards
+
+
+def _share_limits(bot, shards):
+    """Give a worker its share of the per-IP public API budget and of the news quota."""
+    # Never below one call, or a pool could not fit a single request
+    public = bot.rate_limiter.pools['public']
+    public['max'] = max(public['max'] / shards, 1)
+    public['decay'] /= shards
+    news = bot.news_rate_limiter
+    bot.news_rate_limiter = TokenBucket(max(news.capacity / shards, 1), news.refill_rate / shards)
+
+
+def _worker_main(index, shards, bot_factory, inbox, outbox):
+    """Worker process: evaluate the assets of one shard whenever the coordinator asks."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The coordinator shuts workers down on Ctrl+C
+    bot = bot_factory()
+    _share_limits(bot, shards)
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        job, balance, prices = message
+        started = time.perf_counter()
+        try:
+            if bot.pair_index.is_stale():
+                bot.pair_index.load()  # The coordinator keeps the shared asset_pairs.json fresh
+                bot.asset_pairs = bot.pair_index.pairs
+            evaluations, error = bot.evaluate_assets(balance, prices), None
+        except Exception as e:
+            evaluations, error = [], str(e)
+        outbox.put((job, index, evaluations, error, time.perf_counter() - started))
+
+
+class WorkerPool:
+    """Processes that each evaluate one shard of the asset universe.
+
+    A pair always hashes to the same worker, so its streaming indicator state stays warm
+    there between cycles. Workers make only public calls and news searches, each within
+    its share of those budgets. Dead workers are restarted on the next evaluation, and a
+    shard that fails or times out contributes no evaluations to that cycle.
+    """
+
+    def __init__(self, workers, bot_factory=KrakenBot, hash_name='crc32', timeout=900):
+        """`bot_factory` builds each worker's bot inside the worker, so it must be picklable."""
+        self.shards = workers
+        self.bot_factory = bot_factory
+        self.hash_name = hash_name
+        self.timeout = timeout  # Seconds to wait for every shard's evaluations
+        # Never fork: workers are (re)started from the scheduler's threads, and a forked child
+        # inherits whatever locks those threads held at that moment
+        self._context = multiprocessing.get_context('spawn')
+        self._processes = [None] * workers
+        self._inboxes = [None] * workers
+        self._outbox = None
+        self._job = 0
+        self._stats = [{'pid': None, 'jobs': 0, 'assets': 0, 'last_duration': None, 'last_error': None,
+                        'restarts': 0} for _ in range(workers)]
+        self._lock = threading.Lock()
+
+    def shard_for(self, pair):
+        return shard_for(pair, self.shards, self.hash_name)
+
+    def start(self):
+        """Start any worker that is not running."""
+        with self._lock:
+            self._start_workers()
+
+    def _start_workers(self):
+        if self._outbox is None:
+            self._outbox = self._context.Queue()
+        for index, process in enumerate(self._processes):
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                logger.warning(f"Restarting shard worker {index}, which exited with code {process.exitcode}")
+                self._stats[index]['restarts'] += 1
+            inbox = self._context.Queue()
+            process = self._context.Process(target=_worker_main, name=f'shard-worker-{index}', daemon=True,
+                                            args=(index, self.shards, self.bot_factory, inbox, self._outbox))
+            process.start()
+            self._processes[index], self._inboxes[index] = process, inbox
+            self._stats[index]['pid'] = process.pid
+
+    def evaluate(self, parts):
+        """Send each shard its {index: (balance, prices)} part and return all the evaluations that came back."""
+        with self._lock:
+            self._start_workers()
+            self._job += 1
+            job = self._job
+            for index, (balance, prices) in parts.items():
+                self._inboxes[index].put((job, balance, prices))
+
+            evaluations, pending = [], set(parts)
+            deadline = time.monotonic() + self.timeout
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.error(f"Shard workers {sorted(pending)} did not answer within {self.timeout}s")
+                    break
+                try:
+                    reply, index, shard_evaluations, error, duration = self._outbox.get(timeout=min(remaining, 1.0))
+                except queue.Empty:
+                    for index in sorted(pending):
+                        process = self._processes[index]
+                        if process is None or not process.is_alive():
+                            logger.error(f"Shard worker {index} exited before answering")
+                            self._stats[index]['last_error'] = 'exited'
+                            pending.discard(index)
+                    continue
+                if reply != job:
+                    continue  # A late answer to a job that already timed out
+                pending.discard(index)
+                self._stats[index].update(jobs=self._stats[index]['jobs'] + 1, assets=len(parts[index][0]),
+                                          last_duration=duration, last_error=error)
+                if error:
+                    logger.error(f"Shard worker {index} failed: {error}")
+                evaluations.extend(shard_evaluations)
+            return evaluations
+
+    def stop(self, timeout=5):
+        """Ask the workers to exit, terminating any that are still busy after `timeout` seconds."""
+        # Not under the lock: an evaluation in progress would hold it until its timeout
+        running = [(process, inbox) for process, inbox in zip(self._processes, self._inboxes)
+                   if process is not None and process.is_alive()]
+        for _, inbox in running:
+            inbox.put(None)
+        for process, _ in running:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._processes = [None] * self.shards
+
+    def status(self):
+        return [{**stats, 'alive': process is not None and process.is_alive()}
+                for stats, process in zip(self._stats, self._processes)]
+
+
+class ShardedKrakenBot(KrakenBot):
+    """KrakenBot that fans the per-asset news, OHLC and indicator work out to a WorkerPool.
+
+    Everything that touches the account still happens here: balances, tickers, the order
+    plan and its submission all go through this process's rate limiter and trade lock.
+    """
+
+    def __init__(self, exchange=None, news_source=None, workers=None, bot_factory=KrakenBot, hash_name=None):
+        super().__init__(exchange, news_source)
+        workers = workers or int(os.getenv('KRAKEN_WORKERS', os.cpu_count() or 1))
+        hash_name = hash_name or os.getenv('KRAKEN_SHARD_HASH', 'crc32')
+        self.worker_pool = WorkerPool(workers, bot_factory, hash_name)
+
+    def evaluate_assets(self, balance, prices=None):
+        """Evaluate every held asset on the worker owning its pair, in the balance's order."""
+        parts = {}
+        for asset, amount in balance.items():
+            if self.pair_index.is_quote_asset(asset):
+                continue
+            pair = self.pair_index.pair_for_asset(asset)
+            if pair is None:
+                logger.debug(f"No {self.base_currency} pair for {asset}.")
+                continue
+            shard_balance, shard_prices = parts.setdefault(self.worker_pool.shard_for(pair), ({}, {}))
+            shard_balance[asset] = amount
+            if prices and pair in prices:
+                shard_prices[pair] = dict(prices[pair])  # The snapshot's read-only proxies don't pickle
+        order = {asset: i for i, asset in enumerate(balance)}
+        evaluations = self.worker_pool.evaluate(parts)
+        return sorted(evaluations, key=lambda evaluation: order[evaluation['asset']])
+
+
+class Coordinator:
+    """Run a ShardedKrakenBot for a dashboard in another process, with a StateStore between them.
+
+    The bot's signals, orders, trades, portfolio snapshots, status and log lines are
+    written to the store for app.py to serve and stream. Requests come back the same way:
+    the desired run state is kept under 'control', and settings changes and profiling
+    requests arrive as 'command' events.
+    """
+
+    def __init__(self, bot, store, portfolio_interval=300, heartbeat=5):
+        self.bot = bot
+        self.store = store
+        self.heartbeat = heartbeat  # Seconds between status refreshes; app.py shows the bot offline without them
+        self.start_time = None
+        self._seen = store.last_seq()  # Commands sent before the coordinator started are stale
+        self.events = BotEventPublisher(bot, self.publish)
+        bot.add_listener(self.events)
+        bot.scheduler.add('portfolio_snapshot', self.record_portfolio, portfolio_interval)
+
+    def publish(self, event, data):
+        # Orders are a stream of their own; everything else is the latest state of its kind
+        if event == 'order':
+            self.store.append(event, data)
+        else:
+            self.store.put(event, data)
+
+    def record_portfolio(self):
+        portfolio, portfolio_value = self.events.portfolio()
+        self.store.put('portfolio', {
+            "portfolio": {k: float(v) for k, v in portfolio.items()},
+            "total_value": float(portfolio_value),
+            "time": time.time()
+        })
+
+    def status(self):
+        running = self.bot.is_trading
+        return {
+            "status": "running" if running else "stopped",
+            "start_time": self.start_time,
+            "current_settings": self.bot.get_settings() if running else None,
+            "jobs": self.bot.scheduler.status() if running else None,
+            "workers": self.bot.worker_pool.status()
+        }
+
+    def publish_status(self, publish=True):
+        self.store.put('status', self.status(), publish)
+        self.store.put('metrics', REGISTRY.render(), publish=False)
+
+    def start(self):
+        self.start_time = datetime.now().isoformat()
+        self.bot.start_trading()
+        self.events.refresh()
+        self.publish_status()
+        logger.info("Bot started successfully")
+
+    def stop(self):
+        self.bot.stop_trading()
+        self.start_time = None
+        self.publish_status()
+        logger.info("Bot stopped successfully")
+
+    def poll(self):
+        """Apply what the dashboard asked for: the desired run state, then any new commands."""
+        trading = self.store.get('control', {}).get('trading', False)
+        if trading and not self.bot.is_trading:
+            self.start()
+        elif not trading and self.bot.is_trading:
+            self.stop()
+
+        changed = False
+        for seq, _, command in self.store.events(self._seen, names=('command',)):
+            self._seen = seq
+            try:
+                if command.get('settings'):
+                    self.bot.apply_settings(command['settings'])
+                    changed = True
+                    logger.info("Settings updated successfully")
+                if command.get('profile'):
+                    self.bot.profile_next_cycle = True
+                    logger.info("The next strategy cycle will be profiled")
+            except Exception as e:
+                logger.error(f"Error applying dashboard command: {str(e)}")
+        if changed:
+            self.publish_status()
+
+    def run(self, poll_interval=1.0):
+        """Follow the dashboard's requests until interrupted, refreshing the status heartbeat."""
+        self.bot.worker_pool.start()
+        self.publish_status()
+        last_heartbeat = time.monotonic()
+        try:
+            while True:
+                self.poll()
+                if time.monotonic() - last_heartbeat >= self.heartbeat:
+                    self.publish_status(publish=False)
+                    last_heartbeat = time.monotonic()
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            logger.info("Shutting down the coordinator")
+        finally:
+            if self.bot.is_trading:
+                self.bot.stop_trading()
+            self.bot.worker_pool.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the trading bot as a coordinator with shard worker processes.")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('KRAKEN_WORKERS', os.cpu_count() or 1)),
+                        help="Number of shard worker processes (default: KRAKEN_WORKERS or the CPU count)")
+    parser.add_argument('--shard-hash', default=os.getenv('KRAKEN_SHARD_HASH', 'crc32'),
+                        help="Hash that assigns pairs to workers: crc32 or any hashlib algorithm")
+    parser.add_argument('--state-db', default=os.getenv('KRAKEN_STATE_DB', 'bot_state.db'),
+                        help="State store shared with the dashboard")
+    parser.add_argument('--start', action='store_true', help="Start trading now instead of waiting for the dashboard")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    shard_for('XXBTZUSD', args.workers, args.shard_hash)  # Fail fast on an unknown hash name
+    store = StateStore(args.state_db)
+    logger.addHandler(StateLogHandler(store))
+    if args.start:
+        store.put('control', {'trading': True}, publish=False)
+    bot = ShardedKrakenBot(workers=args.workers, hash_name=args.shard_hash)
+    logger.info(f"Coordinating {args.workers} shard workers using {args.shard_hash}")
+    Coordinator(bot, store).run()
+
+
+if __name__ == "__main__":
+    main()